@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Measure peak client memory and throughput of writing and reading BLOB
+values of --sizes megabytes, inline in the SQL string and streamed, against
+the MAPI stand-in of mapi_server.py.
+
+    $ ./bench/bench_blob.py --sizes 1 10 100 500
+
+Reading a value of N megabytes through the DBAPI takes some 4N of memory
+in the client and 6N in the stand-in, so mind the largest sizes.
+
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import registry
+
+from bench_suite import start_server
+from sqlalchemy_monetdb.base import BLOB
+
+
+registry.register("monetdb", "sqlalchemy_monetdb.base", "MDBDialect")
+
+
+MB = 1 << 20
+
+
+def blob_table(size, **type_kwargs):
+    return sa.Table('bench_blob_%d' % size, sa.MetaData(),
+                    sa.Column('value', BLOB(**type_kwargs)))
+
+
+def measure(fn):
+    """Return the seconds taken by `fn` and the peak of the memory it
+    allocates, measured in a second run."""
+
+    start = time.time()
+    fn()
+    elapsed = time.time() - start
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def write(engine, size, streamed):
+    table = blob_table(size, stream_threshold=streamed and MB or None)
+    value = os.urandom(size)
+
+    def run():
+        with engine.begin() as conn:
+            conn.execute(table.insert(), value=value)
+    return measure(run)
+
+
+def read(engine, size, streamed):
+    table = blob_table(size, stream=streamed)
+
+    def run():
+        with engine.connect() as conn:
+            value = conn.execute(sa.select([table.c.value])).scalar()
+            if streamed:
+                with io.open(os.devnull, 'wb') as devnull:
+                    value.copy_to(devnull)
+            assert len(value) == size, len(value)
+    return measure(run)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1, 10, 100, 500],
+                        help='value sizes in megabytes')
+    args = parser.parse_args()
+
+    process, uri = start_server(1, 1)
+    engine = sa.create_engine(uri)
+    print('%-6s %8s %-8s %10s %12s' % ('', 'MB', '', 'MB/s', 'peak MB'))
+    try:
+        for size in args.sizes:
+            for name, fn in (('write', write), ('read', read)):
+                for streamed in (False, True):
+                    elapsed, peak = fn(engine, size * MB, streamed)
+                    print('%-6s %8d %-8s %10.1f %12.1f' % (
+                        name, size, streamed and 'streamed' or 'inline',
+                        size / elapsed, float(peak) / MB))
+    finally:
+        engine.dispose()
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
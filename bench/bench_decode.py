@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Compare fetching --rows rows decoded by the DBAPI and with the fast_decode
+execution option, for a table of 20 columns of mixed types and for a single
+column of every type, against the MAPI stand-in of mapi_server.py.
+
+    $ ./bench/bench_decode.py --rows 100000
+
+"""
+import argparse
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import registry
+
+from bench_suite import FETCH_TYPES, best, start_server
+from mapi_server import TYPES, WIDE_TYPES
+
+
+registry.register("monetdb", "sqlalchemy_monetdb.base", "MDBDialect")
+
+
+def tables():
+    yield 'wide', sa.Table('bench_wide', sa.MetaData(), *[
+        sa.Column('value_%d' % i, FETCH_TYPES[type_name])
+        for i, type_name in enumerate(WIDE_TYPES)])
+    for type_name in TYPES:
+        yield type_name, sa.Table('bench_%s' % type_name, sa.MetaData(),
+                                  sa.Column('value', FETCH_TYPES[type_name]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    process, uri = start_server(1, args.rows)
+    engine = sa.create_engine(uri)
+    print('%-10s%12s%12s%8s' % ('rows/sec', 'dbapi', 'fast', 'ratio'))
+    try:
+        with engine.connect() as conn:
+            for name, table in tables():
+                query = sa.select([table])
+                line = '%-10s' % name
+                speeds = []
+                for fast_decode in (False, True):
+                    options = conn.execution_options(fast_decode=fast_decode)
+
+                    def fetch():
+                        rows = options.execute(query).fetchall()
+                        assert len(rows) == args.rows, len(rows)
+                    speeds.append(args.rows / best(args.repeat, fetch))
+                    line += '%12.0f' % speeds[-1]
+                print(line + '%8.1f' % (speeds[1] / speeds[0]))
+    finally:
+        engine.dispose()
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Compare reading --rows rows of every column type with fetchall() and with
+the export execution option, written to a file as is or parsed into column
+batches, against the MAPI stand-in of mapi_server.py.
+
+    $ ./bench/bench_export.py --rows 200000
+
+"""
+import argparse
+import io
+import os
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import registry
+
+from bench_suite import FETCH_TYPES, start_server
+from mapi_server import TYPES
+
+
+registry.register("monetdb", "sqlalchemy_monetdb.base", "MDBDialect")
+
+
+def fetchall(conn, query):
+    return len(conn.execute(query).fetchall())
+
+
+def copy_to(conn, query):
+    with io.open(os.devnull, 'wb') as devnull:
+        return conn.execution_options(export=True).execute(query).copy_to(
+            devnull)
+
+
+def batches(conn, query):
+    result = conn.execution_options(export=True).execute(query)
+    return sum(len(columns['value']) for columns in result.batches())
+
+
+METHODS = [('fetchall', fetchall), ('copy_to', copy_to),
+           ('batches', batches)]
+
+
+def best(repeat, fn):
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        fn()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    process, uri = start_server(1, args.rows)
+    engine = sa.create_engine(uri)
+    print('%-10s' % 'rows/sec' + ''.join('%12s' % name
+                                         for name, fn in METHODS))
+    try:
+        with engine.connect() as conn:
+            for type_name in TYPES:
+                table = sa.Table('bench_%s' % type_name, sa.MetaData(),
+                                 sa.Column('value', FETCH_TYPES[type_name]))
+                query = sa.select([table.c.value])
+                line = '%-10s' % type_name
+                for name, fn in METHODS:
+                    assert fn(conn, query) == args.rows
+                    elapsed = best(args.repeat, lambda: fn(conn, query))
+                    line += '%12.0f' % (args.rows / elapsed)
+                print(line)
+    finally:
+        engine.dispose()
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
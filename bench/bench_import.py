@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Measure the startup cost of the dialect in fresh interpreters with
+``python -X importtime``: importing SQLAlchemy, importing the dialect on
+top of it, and creating a first engine that renders SQL without connecting.
+Lists the modules the dialect imports in the fastest run.
+
+    $ ./bench/bench_import.py --repeat 10
+
+Requires Python 3.7 or later.
+
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+# run in a fresh interpreter; the dialect is imported by create_engine()
+CODE = """
+from timeit import default_timer
+import sys
+import sqlalchemy as sa
+from sqlalchemy.dialects import registry
+registry.register('monetdb', 'sqlalchemy_monetdb.base', 'MDBDialect')
+start = default_timer()
+engine = sa.create_engine('monetdb://', strategy='mock',
+                          executor=lambda *args, **kwargs: None)
+str(sa.select([sa.literal_column('1')]).compile(engine))
+print(default_timer() - start)
+print('monetdb' in sys.modules)
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+DIALECT = 'sqlalchemy_monetdb.base'
+
+
+def run():
+    """Run CODE once, returning the seconds to the first engine, whether
+    the DBAPI was imported and the (self, cumulative, depth, name) of every
+    module imported."""
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [p for p in [env.get('PYTHONPATH')] if p])
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', CODE], env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    out, err = process.communicate()
+    if process.returncode:
+        raise RuntimeError(err)
+    elapsed, dbapi = out.split()
+    modules = []
+    for line in err.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((int(match.group(1)), int(match.group(2)),
+                            len(match.group(3)) // 2, match.group(4)))
+    return float(elapsed), dbapi == 'True', modules
+
+
+def cumulative(modules, name):
+    """Return the cumulative microseconds of importing `name`, or 0 if it
+    was imported before the interpreter ran the code."""
+
+    for self_time, total, depth, module in modules:
+        if module == name:
+            return total
+    return 0
+
+
+def subtree(modules, name):
+    """Return the modules imported by the import of `name`, itself last."""
+
+    for i, (self_time, total, depth, module) in enumerate(modules):
+        if module == name:
+            start = i
+            while start and modules[start - 1][2] > depth:
+                start -= 1
+            return modules[start:i + 1]
+    return []
+
+
+def bench_import(results, repeat):
+    runs = [run() for i in range(repeat)]
+    results['import.sqlalchemy'] = (
+        min(cumulative(modules, 'sqlalchemy') for e, d, modules in runs)
+        / 1000.0, 'ms')
+    results['import.dialect'] = (
+        min(cumulative(modules, DIALECT) for e, d, modules in runs)
+        / 1000.0, 'ms')
+    results['import.first_engine'] = (
+        min(elapsed for elapsed, d, modules in runs) * 1000, 'ms')
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    runs = bench_import(results, args.repeat)
+    elapsed, dbapi, modules = min(
+        runs, key=lambda r: cumulative(r[2], DIALECT))
+
+    print('%10s %10s  %s' % ('self ms', 'total ms', 'module'))
+    for self_time, total, depth, module in subtree(modules, DIALECT):
+        print('%10.2f %10.2f  %s%s' % (self_time / 1000.0, total / 1000.0,
+                                       '  ' * depth, module))
+    print('')
+    for name in sorted(results):
+        print('%-22s %8.2f %s' % ((name,) + results[name]))
+    print('DBAPI imported: %s' % dbapi)
+
+
+if __name__ == '__main__':
+    main()
@@ -28,7 +28,11 @@ setup_params = dict(
     test_suite="nose.collector",
     zip_safe=False,
     entry_points={
-        "sqlalchemy.dialects": ["monetdb = sqlalchemy_monetdb:dialect"]
+        "sqlalchemy.dialects": [
+            "monetdb = sqlalchemy_monetdb.base:MDBDialect",
+            "monetdb.offline = sqlalchemy_monetdb.offline:MDBOfflineDialect",
+            "monetdb.async = sqlalchemy_monetdb.aio:MDBAsyncDialect",
+        ]
     },
     license="MIT",
 )
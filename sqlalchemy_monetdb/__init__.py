@@ -6,4 +6,9 @@ http://www.monetdb.org/Documentation/SQLcatalog
 MonetDB is similar to Oracle: case sensitive; unquoted identifiers are made
 lowercase; case is preserved in quoted identifiers.
 
+The dialect is registered by the ``sqlalchemy_monetdb.base:MDBDialect``
+entry point, so importing this package loads nothing; the dialect and its
+modules are imported when the first engine is created. Mock engines, which
+only render SQL, don't import the DBAPI.
+
 """
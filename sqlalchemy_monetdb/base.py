@@ -1,12 +1,24 @@
+import binascii
+import collections
+import copy
+import datetime
+import decimal
+import functools
+import re
 import warnings
-from sqlalchemy import pool, exc
-from sqlalchemy.engine import default, reflection
+from timeit import default_timer
+from sqlalchemy import pool, exc, event
+from sqlalchemy.engine import default, reflection, ResultProxy
 from sqlalchemy import schema, util
 from sqlalchemy import types as sqltypes
-from sqlalchemy.sql import compiler
+from sqlalchemy.sql import compiler, visitors
 from sqlalchemy.sql import expression as sql
 from sqlalchemy.types import INTEGER, BIGINT, SMALLINT, VARCHAR, \
-        CHAR, TEXT, FLOAT, DATE, BOOLEAN, DECIMAL, TIMESTAMP, TIME, BLOB
+        CHAR, TEXT, FLOAT, DATE, BOOLEAN, DECIMAL, TIMESTAMP, TIME
+from sqlalchemy_monetdb import blob, bulk, ddl, dml, instrument
+from sqlalchemy_monetdb.cache import CompiledCache, PreparedStatements, \
+        ReflectionCache, statement_key
+from sqlalchemy_monetdb.pipeline import Pipeline
 
 
 class INET(sqltypes.TypeEngine):
@@ -28,6 +40,49 @@ class DOUBLE_PRECISION(sqltypes.Float):
     __visit_name__ = 'DOUBLE PRECISION'
 
 
+class BLOB(sqltypes.LargeBinary):
+    """MonetDB BLOB, bound from buffers or file-like objects and returned
+    as ``bytes``.
+
+    Values of at least `stream_threshold` bytes, and file-like objects of
+    any size, are sent to the server in chunks while the statement is
+    written, instead of as part of the SQL string. With `stream` set,
+    values are returned as a :class:`~sqlalchemy_monetdb.blob.BlobReader`
+    decoding them a chunk at a time.
+    """
+
+    __visit_name__ = "BLOB"
+
+    def __init__(self, length=None, stream_threshold=1 << 20, stream=False):
+        super(BLOB, self).__init__(length)
+        self.stream_threshold = stream_threshold
+        self.stream = stream
+
+    def bind_processor(self, dialect):
+        threshold = self.stream_threshold
+
+        def process(value):
+            if value is None:
+                return None
+            if hasattr(value, "read") or \
+                    threshold is not None and len(value) >= threshold:
+                return blob.BlobParameter(value)
+            return binascii.hexlify(value).decode("ascii")
+        return process
+
+    def result_processor(self, dialect, coltype):
+        if self.stream:
+            reader = blob.BlobReader
+        else:
+            reader = binascii.unhexlify
+
+        def process(value):
+            if value is not None:
+                value = reader(value)
+            return value
+        return process
+
+
 # Map from MonetDB internal type name to SQLAlchemy type
 MONETDB_TYPE_MAP = {
     # oid
@@ -55,9 +110,173 @@ MONETDB_TYPE_MAP = {
 }
 
 
-class MDBCompiler(compiler.SQLCompiler):
-    def visit_mod(self, binary, **kw):
-        return self.process(binary.left) + " %% " + self.process(binary.right)
+# keywords of the literals of date and time values, subclasses first
+LITERAL_TYPES = [
+    (datetime.datetime, "TIMESTAMP"),
+    (datetime.date, "DATE"),
+    (datetime.time, "TIME"),
+]
+
+
+def reflected_type(type_name, digits, scale):
+    """Return the SQL type of a column of MonetDB type `type_name`, or None
+    if the type isn't known."""
+
+    col_type = MONETDB_TYPE_MAP.get(type_name)
+    if col_type is None:
+        return None
+    if type_name in ("char", "varchar"):
+        return col_type(digits)
+    elif type_name == "decimal":
+        return col_type(digits, scale)
+    return col_type()
+
+
+class CachedCompilerType(type):
+    """Metaclass of MDBCompiler, taking the compiled statements of a dialect
+    from its compiled_cache when there is one."""
+
+    def __call__(cls, dialect, statement, column_keys=None, inline=False,
+                 bind=None, **kwargs):
+        start = default_timer()
+        cache = getattr(dialect, "compiled_cache", None)
+        if statement is None or kwargs or cache is None:
+            compiled = type.__call__(cls, dialect, statement,
+                                     column_keys=column_keys, inline=inline,
+                                     bind=bind, **kwargs)
+        else:
+            key = (cls, statement_key(statement),
+                   column_keys is not None and frozenset(column_keys), inline)
+            # the cached statement is shared between threads, each gets a
+            # copy to record its own compile time on
+            compiled = cache.get(key, lambda: type.__call__(
+                cls, dialect, statement, column_keys=column_keys,
+                inline=inline)).with_statement(statement)
+        compiled.compile_time = default_timer() - start
+        return compiled
+
+
+class MDBCompiler(util.with_metaclass(CachedCompilerType,
+                                      compiler.SQLCompiler)):
+    # values of a plain INSERT that can be sent in bulk, see _get_bulk_values
+    bulk_values = None
+    # seconds taken to compile the statement or find it in the cache, set
+    # on the copy returned to the caller
+    compile_time = None
+    # (head, [(key, label)], tail) of a merge of parameters, the statement
+    # being head + a SELECT of the parameters + tail; see visit_merge
+    merge_parts = None
+
+    def __init__(self, *args, **kwargs):
+        # bound parameters rendered for the LIMIT and OFFSET of the
+        # statement, by attribute name
+        self.limit_binds = {}
+        # primary key columns of an executemany() INSERT whose Sequence is
+        # fired by the execution context, see _prefetch_sequences
+        self.sequence_prefetch = []
+        super(MDBCompiler, self).__init__(*args, **kwargs)
+
+    def _get_colparams(self, stmt, **kw):
+        colparams = super(MDBCompiler, self)._get_colparams(stmt, **kw)
+        if self.isinsert:
+            colparams = self._prefetch_sequences(stmt, colparams)
+            self.bulk_values = self._get_bulk_values(stmt, colparams)
+        return colparams
+
+    def _prefetch_sequences(self, stmt, colparams):
+        """Bind the primary key columns whose Sequence reserves its values
+        in blocks, so that the values are fired before the statement is
+        executed instead of the inline NEXT VALUE FOR."""
+
+        # an executemany() is compiled inline, but an INSERT made inline
+        # by its caller keeps the Sequence in the statement
+        if stmt.inline or stmt.select is not None or stmt._returning or \
+                stmt._has_multi_parameters:
+            return colparams
+        result = []
+        for column, value in colparams:
+            seq = column.default
+            if column.primary_key and isinstance(seq, schema.Sequence) and \
+                    self.dialect._sequence_block_size(seq) > 1 and \
+                    value == self.process(seq):
+                value = self._create_crud_bind_param(column, None)
+                if self.inline:
+                    # SQLAlchemy only prefetches the Sequences of
+                    # executemany() with Python side defaults
+                    self.sequence_prefetch.append(column)
+                else:
+                    self.prefetch.append(column)
+            result.append((column, value))
+        return result
+
+    def _get_bulk_values(self, stmt, colparams):
+        """Return the values of the INSERT as (column, sql) pairs, where sql
+        is None for a bind parameter named after the column and the inline
+        NEXT VALUE FOR of a column's Sequence otherwise.
+
+        Returns None if any other SQL expression is involved.
+        """
+
+        if stmt.select is not None or stmt._returning or \
+                stmt._has_multi_parameters:
+            return None
+        values = []
+        for column, value in colparams:
+            if value == self.bindtemplate % {"name": column.key}:
+                values.append((column, None))
+            elif isinstance(column.default, schema.Sequence) and \
+                    value == self.process(column.default):
+                values.append((column, value))
+            else:
+                return None
+        return values or None
+
+    def render_literal_value(self, value, type_):
+        """Render `value` as a MonetDB literal, whatever its type; values
+        of types unknown to MonetDB are left to the literal processor of
+        `type_`."""
+
+        # converted by TypeDecorators as by their literal_processor()
+        while isinstance(type_, sqltypes.TypeDecorator):
+            if type_._has_literal_processor:
+                value = type_.process_literal_param(value, self.dialect)
+            elif type_._has_bind_processor:
+                value = type_.process_bind_param(value, self.dialect)
+            type_ = type_.impl
+        if value is None:
+            return "NULL"
+        if hasattr(value, "read"):
+            value = value.read()
+        if isinstance(type_, sqltypes.LargeBinary) or \
+                isinstance(value, (bytearray, memoryview)) or \
+                isinstance(value, bytes) and bytes is not str:
+            return "BLOB '%s'" % binascii.hexlify(value).decode("ascii")
+        if isinstance(value, bool) or isinstance(type_, sqltypes.Boolean):
+            return value and "true" or "false"
+        if isinstance(value, util.string_types):
+            # backslashes are escapes in MonetDB strings, as for the DBAPI
+            return "'%s'" % value.replace("\\", "\\\\").replace("'", "''")
+        if isinstance(value, util.int_types + (decimal.Decimal,)):
+            return str(value)
+        if isinstance(value, float):
+            return repr(value)
+        for cls, name in LITERAL_TYPES:
+            if isinstance(value, cls):
+                if getattr(value, "tzinfo", None) is not None:
+                    name += " WITH TIME ZONE"
+                return "%s '%s'" % (name, value)
+        if isinstance(value, datetime.timedelta):
+            microseconds = (value.days * 86400 + value.seconds) * 1000000 + \
+                value.microseconds
+            return "INTERVAL '%s%d.%06d' SECOND" % (
+                microseconds < 0 and "-" or "",
+                abs(microseconds) // 1000000, abs(microseconds) % 1000000)
+        return super(MDBCompiler, self).render_literal_value(value, type_)
+
+    def visit_mod_binary(self, binary, operator, **kw):
+        # escaped for the interpolation of the parameters
+        return self.process(binary.left, **kw) + " %% " + \
+            self.process(binary.right, **kw)
 
     def visit_sequence(self, seq):
         exc = "(SELECT NEXT VALUE FOR %s)" \
@@ -65,14 +284,167 @@ class MDBCompiler(compiler.SQLCompiler):
         return exc
 
     def limit_clause(self, select):
+        # bound rather than literal, so that the pages of a query share
+        # their compiled statement
         text = ""
         if select._limit is not None:
-            text +=  "\nLIMIT " + str(select._limit)
+            text += "\nLIMIT " + self._limit_bind(select, "_limit")
         if select._offset is not None:
-            text += " OFFSET " + str(select._offset)
+            text += " OFFSET " + self._limit_bind(select, "_offset")
         return text
 
-    def visit_column(self, column, result_map=None, **kwargs):
+    def sample_clause(self, select):
+        # bound like LIMIT and OFFSET; a fraction takes the type of its value
+        text = "\nSAMPLE " + self._limit_bind(select, "_sample", None)
+        if select._seed is not None:
+            text += " SEED " + self._limit_bind(select, "_seed")
+        return text
+
+    def _limit_bind(self, select, attribute, type_=sqltypes.Integer):
+        bind = sql.bindparam("monetdb" + attribute, getattr(select, attribute),
+                             type_=type_, unique=True)
+        if select is self.statement:
+            self.limit_binds[attribute] = bind
+        return self.process(bind)
+
+    def visit_select(self, select, asfrom=False, parens=True, **kw):
+        if getattr(select, "_sample", None) is None:
+            return super(MDBCompiler, self).visit_select(
+                select, asfrom=asfrom, parens=parens, **kw)
+        # SAMPLE ends the statement, within its parentheses
+        text = super(MDBCompiler, self).visit_select(
+            select, asfrom=asfrom, parens=False, **kw)
+        text += self.sample_clause(select)
+        if asfrom and parens:
+            return "(" + text + ")"
+        return text
+
+    def visit_over(self, over, **kw):
+        clauses = ["%s BY %s" % (word, self.process(clause, **kw))
+                   for word, clause in (("PARTITION", over.partition_by),
+                                        ("ORDER", over.order_by))
+                   if clause is not None and len(clause)]
+        frame = getattr(over, "frame", None)
+        if frame is not None:
+            unit, start, end = frame
+            clauses.append("%s BETWEEN %s AND %s" % (
+                unit, self._frame_bound(start, "PRECEDING"),
+                self._frame_bound(end, "FOLLOWING")))
+        return "%s OVER (%s)" % (self.process(over.func, **kw),
+                                 " ".join(clauses))
+
+    def _frame_bound(self, value, unbounded):
+        if value is None:
+            return "UNBOUNDED " + unbounded
+        elif value == 0:
+            return "CURRENT ROW"
+        elif value < 0:
+            return "%d PRECEDING" % -value
+        return "%d FOLLOWING" % value
+
+    def visit_rollup(self, element, **kw):
+        return "ROLLUP" + self.process(element.clause_expr, **kw)
+
+    def visit_cube(self, element, **kw):
+        return "CUBE" + self.process(element.clause_expr, **kw)
+
+    def visit_grouping_sets(self, element, **kw):
+        return "GROUPING SETS" + self.process(element.clause_expr, **kw)
+
+    def with_statement(self, statement):
+        """Return a copy of this compiled statement for `statement`, which
+        is made of the same parts but may have another LIMIT and OFFSET."""
+
+        compiled = copy.copy(self)
+        compiled.statement = statement
+        if self.limit_binds:
+            compiled.bind_names = dict(self.bind_names)
+            for attribute, bind in self.limit_binds.items():
+                value = bind._clone()
+                value.value = getattr(statement, attribute)
+                compiled.bind_names[value] = compiled.bind_names.pop(bind)
+        return compiled
+
+    def visit_merge(self, merge, **kw):
+        preparer = self.preparer
+        table = merge.table
+        head = "MERGE INTO %s USING " % preparer.format_table(table)
+        if merge.parameter_source:
+            keys = self._merge_keys(merge)
+            labels = [preparer.format_column(merge.source.c[key])
+                      for key in keys]
+            source = "SELECT " + ", ".join(
+                "%s AS %s" % (self.process(sql.bindparam(
+                    key, type_=table.c[key].type)), label)
+                for key, label in zip(keys, labels))
+            head += "("
+            tail = ") AS %s" % preparer.quote(dml.SOURCE_NAME)
+        else:
+            keys = list(merge.source.c.keys())
+            source = self.process(merge.source, asfrom=True, **kw)
+            tail = ""
+
+        tail += " ON " + self.process(merge.on)
+        when = merge.when
+        if when is None:
+            when = {"matched": ("update", None),
+                    "not_matched": ("insert", None)}
+        action, values = when.get("matched", (None, None))
+        if action == "delete":
+            tail += " WHEN MATCHED THEN DELETE"
+        elif action == "update":
+            if values is None:
+                on_keys = set(c.key for c in visitors.iterate(merge.on, {})
+                              if isinstance(c, sql.ColumnClause))
+                values = [(key, merge.source.c[key]) for key in keys
+                          if key in table.c and key not in on_keys]
+            values = self._merge_values(table, values)
+            if values:
+                tail += " WHEN MATCHED THEN UPDATE SET " + ", ".join(
+                    "%s = %s" % (preparer.format_column(column), value)
+                    for column, value in values)
+        if "not_matched" in when:
+            values = when["not_matched"][1]
+            if values is None:
+                values = [(key, merge.source.c[key]) for key in keys
+                          if key in table.c]
+            values = self._merge_values(table, values)
+            tail += " WHEN NOT MATCHED THEN INSERT (%s) VALUES (%s)" % (
+                ", ".join(preparer.format_column(c) for c, v in values),
+                ", ".join(v for c, v in values))
+
+        if merge.parameter_source:
+            self.merge_parts = (head, list(zip(keys, labels)), tail)
+        return head + source + tail
+
+    def _merge_keys(self, merge):
+        """Return the keys of the columns of a merge of parameters."""
+
+        if self.column_keys is None:
+            return list(merge.table.c.keys())
+        unknown = [key for key in self.column_keys
+                   if key not in merge.table.c]
+        if unknown:
+            raise exc.CompileError("Unconsumed column names: %s" %
+                                   ", ".join(unknown))
+        return [c.key for c in merge.table.c if c.key in self.column_keys]
+
+    def _merge_values(self, table, values):
+        """Return (column, sql) pairs of the SET or VALUES of a merge."""
+
+        if isinstance(values, dict):
+            values = values.items()
+        result = []
+        for column, value in values:
+            if not isinstance(column, sql.ColumnElement):
+                column = table.c[column]
+            if not isinstance(value, sql.ClauseElement):
+                value = sql.literal(value, column.type)
+            result.append((column, self.process(value.self_group())))
+        return result
+
+    def visit_column(self, column, result_map=None, add_to_result_map=None,
+                     include_table=True, **kwargs):
         # MonetDB does not currently support column references that include
         # a schema name. This could cause problems when selecting from two
         # identically named tables; this would have to be manually remedied
@@ -91,21 +463,29 @@ class MDBCompiler(compiler.SQLCompiler):
             result_map[name.lower()] = (orig_name,
                                         (column, name, column.key),
                                         column.type)
+        elif add_to_result_map is not None:
+            # SQLAlchemy 0.9 and later; without it results of columns
+            # aren't converted by their types
+            add_to_result_map(name, orig_name, (column, name, column.key),
+                              column.type)
 
         if is_literal:
             name = self.escape_literal_column(name)
         else:
-            name = self.preparer.quote(name, column.quote)
+            # the quote attribute is gone from lightweight columns and
+            # aliases since SQLAlchemy 0.9, where quoting is part of the name
+            name = self.preparer.quote(name, getattr(column, "quote", None))
 
         table = column.table
-        if table is None or not table.named_with_column:
+        if table is None or not include_table or not table.named_with_column:
             return name
         else:
             tablename = table.name
             if isinstance(tablename, sql._truncated_label):
                 tablename = self._truncated_identifier("alias", tablename)
 
-            return self.preparer.quote(tablename, table.quote) + \
+            return self.preparer.quote(tablename,
+                                       getattr(table, "quote", None)) + \
                 "." + name
 
     def visit_extended_join(self, join, asfrom=False, **kwargs):
@@ -143,14 +523,71 @@ class MDBDDLCompiler(compiler.DDLCompiler):
             text += " INCREMENT BY %d" % create.element.increment
         return text
 
-    def visit_drop_sequence(self, sequence):
-        if not self.checkfirst or self.dialect.has_sequence(self.connection, sequence.name):
-            self.append("DROP SEQUENCE %s" % self.preparer.format_sequence(sequence))
-            self.execute()
+    def visit_drop_sequence(self, drop):
+        # whether it exists is checked by the SchemaDropper
+        return "DROP SEQUENCE %s" % self.preparer.format_sequence(drop.element)
 
     def visit_check_constraint(self, constraint):
         util.warn("Skipped unsupported check constraint %s" % constraint.name)
 
+    def visit_create_table(self, create):
+        text = super(MDBDDLCompiler, self).visit_create_table(create)
+        kind = create.element.dialect_options["monetdb"]["kind"]
+        if kind is None:
+            return text
+        if kind not in TABLE_KINDS.values():
+            raise exc.CompileError("Unknown table kind %r of table %s" % (
+                kind, create.element.name))
+        if create.element._prefixes:
+            raise exc.CompileError(
+                "A %s table takes no prefixes" % kind)
+        return text.replace("CREATE TABLE", "CREATE %s TABLE" % kind.upper(),
+                            1)
+
+    def post_create_table(self, table):
+        options = table.dialect_options["monetdb"]
+        text = ""
+        if options["kind"] == "remote":
+            if options["remote"] is None:
+                raise exc.CompileError(
+                    "Remote table %s needs the URI of its server in "
+                    "monetdb_remote" % table.name)
+            text += " ON %s" % self.sql_compiler.render_literal_value(
+                options["remote"], sqltypes.String())
+        if options["on_commit"] is not None:
+            if options["on_commit"] not in ON_COMMIT:
+                raise exc.CompileError(
+                    "monetdb_on_commit must be one of %s" %
+                    ", ".join(sorted(ON_COMMIT)))
+            text += " ON COMMIT %s" % ON_COMMIT[options["on_commit"]]
+        return text
+
+    def visit_create_index(self, create, **kw):
+        index = create.element
+        index_type = index.dialect_options["monetdb"]["type"]
+        text = super(MDBDDLCompiler, self).visit_create_index(create, **kw)
+        if index_type is None:
+            return text
+        if index_type not in INDEX_TYPES.values():
+            raise exc.CompileError("Unknown index type %r of index %s" % (
+                index_type, index.name))
+        if index.unique or len(index.expressions) != 1:
+            raise exc.CompileError(
+                "A %s index covers a single column and can't be unique" %
+                index_type)
+        return text.replace("CREATE INDEX", "CREATE %s INDEX" %
+                            index_type.upper(), 1)
+
+    def visit_add_partition(self, add):
+        return "ALTER TABLE %s ADD TABLE %s" % (
+            self.preparer.format_table(add.element),
+            self.preparer.format_table(add.partition))
+
+    def visit_drop_partition(self, drop):
+        return "ALTER TABLE %s DROP TABLE %s" % (
+            self.preparer.format_table(drop.element),
+            self.preparer.format_table(drop.partition))
+
 
 def use_sequence(column):
     """logic from postgres"""
@@ -161,7 +598,185 @@ def use_sequence(column):
                      and column.default.optional)))
 
 
+class ColumnarResultProxy(ResultProxy):
+    """Result of a statement executed with the ``columnar`` execution
+    option, fetched with fetchcolumns() instead of as rows."""
+
+    def _cursor_description(self):
+        return self.context.columnar_result.description
+
+    def fetchcolumns(self):
+        """Fetch all remaining rows as a dictionary of NumPy arrays, one
+        for every column name."""
+
+        try:
+            return self.context.columnar_result.fetch_columns()
+        finally:
+            self.close()
+
+    def close(self, *args, **kwargs):
+        if not self.closed:
+            self.context.columnar_result.close()
+        super(ColumnarResultProxy, self).close(*args, **kwargs)
+
+    def _fetchone_impl(self):
+        raise exc.InvalidRequestError(
+            "Columnar results are fetched with fetchcolumns()")
+
+    _fetchmany_impl = _fetchall_impl = _fetchone_impl
+
+
+class ExportResultProxy(ResultProxy):
+    """Result of a select executed with the ``export`` execution option,
+    sent by the server as the records of ``COPY ... INTO STDOUT`` and read
+    with copy_to() or batches() instead of as rows."""
+
+    def _cursor_description(self):
+        return [(c.key, None, None, None, None, None, None)
+                for c in self.context.compiled.statement.c]
+
+    def copy_to(self, target):
+        """Write the records in their delimited text format, as bytes, to
+        `target`, a file opened in binary mode or a function called with
+        every chunk of whole records, and return the number of rows."""
+
+        write = getattr(target, "write", target)
+        try:
+            for chunk in self.context.export_output.chunks():
+                write(chunk)
+        finally:
+            self.close()
+        return self.context.export_output.rowcount
+
+    def batches(self, size=10000):
+        """Yield dictionaries of lists of at most `size` values, one for
+        every column key, converted by the types of the columns."""
+
+        keys = [c.key for c in self.context.compiled.statement.c]
+        try:
+            for columns in self.context.export_output.batches(size):
+                yield dict(zip(keys, columns))
+        finally:
+            self.close()
+
+    def close(self, *args, **kwargs):
+        if not self.closed:
+            self.context.export_output.close()
+        super(ExportResultProxy, self).close(*args, **kwargs)
+
+    def _fetchone_impl(self):
+        raise exc.InvalidRequestError(
+            "Exported results are read with copy_to() or batches()")
+
+    _fetchmany_impl = _fetchall_impl = _fetchone_impl
+
+
+class StreamingResultProxy(ResultProxy):
+    """Result of a statement executed with the ``stream_results`` execution
+    option, holding a single reply of the server in memory at a time."""
+
+    def batches(self, size=None):
+        """Yield lists of at most `size` rows until the result is exhausted,
+        by default as many rows as the server sends in one reply."""
+
+        size = size or self.context.reply_size
+        while True:
+            rows = self.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+
+
 class MDBExecutionContext(default.DefaultExecutionContext):
+    # rows per reply of a streamed result, None if not streaming
+    reply_size = None
+    # seconds spent in the DBAPI's execute() or executemany()
+    execute_time = None
+    # rows affected by a statement with streamed BLOB parameters, which
+    # isn't executed through the cursor, or sent in several batches, of
+    # which the cursor only counts the last
+    streamed_rowcount = None
+    # whether the statement was queued in the pipeline of its connection
+    pipelined = False
+    # result of statements without the columnar, export or stream_results
+    # execution options
+    result_class = ResultProxy
+
+    @property
+    def rowcount(self):
+        if self.streamed_rowcount is not None:
+            return self.streamed_rowcount
+        if self.pipelined:
+            # not known until the pipeline is sent
+            return -1
+        return self.cursor.rowcount
+
+    def create_cursor(self):
+        cursor = self._dbapi_connection.cursor()
+        if self.execution_options.get("stream_results", False):
+            # the DBAPI cursor keeps only the block of rows of the last
+            # reply, the first one sized by Xreply_size and the following
+            # ones by the cursor's arraysize
+            self.reply_size = self.execution_options.get(
+                "reply_size", self.dialect.stream_reply_size)
+            self._default_reply_size = self._dbapi_connection.replysize
+            self._dbapi_connection.set_replysize(self.reply_size)
+            cursor.arraysize = self.reply_size
+        return cursor
+
+    def get_result_proxy(self):
+        if self.execution_options.get("columnar", False):
+            result_class = ColumnarResultProxy
+        elif self.execution_options.get("export", False):
+            result_class = ExportResultProxy
+        elif self.reply_size is not None:
+            self._restore_reply_size()
+            result_class = StreamingResultProxy
+        else:
+            result_class = self.result_class
+        if self.dialect.instrumentation is not None:
+            result_class = instrument.instrumented(result_class)
+        return result_class(self)
+
+    def handle_dbapi_exception(self, e):
+        if self.reply_size is not None and not self.is_disconnect:
+            # the pooled connection would keep the reply size of the
+            # failed statement
+            self._restore_reply_size()
+
+    def _restore_reply_size(self):
+        # Xreply_size only sizes the first reply to a query
+        self._dbapi_connection.set_replysize(self._default_reply_size)
+
+    def pre_exec(self):
+        if self.execution_options.get("export", False) and \
+                not isinstance(getattr(self.compiled, "statement", None),
+                               sql.SelectBase):
+            raise exc.InvalidRequestError(
+                "The export execution option takes select() constructs")
+        if self.isddl:
+            # reflected information shared on this connection is outdated
+            self.root_connection.info.pop("monetdb_inspector", None)
+            self.dialect._track_existence(self.root_connection,
+                                          self.compiled.statement)
+        if getattr(self.compiled, "sequence_prefetch", None):
+            self._fire_prefetched_sequences()
+
+    def _fire_prefetched_sequences(self):
+        """Fire the Sequences of the compiled statement's sequence_prefetch
+        for every parameter set, before the statement is executed."""
+
+        processors = self.compiled._bind_processors
+        for column in self.compiled.sequence_prefetch:
+            key = column.key
+            for compiled_params, params in zip(self.compiled_parameters,
+                                               self.parameters):
+                value = self.fire_sequence(column.default, column.type)
+                compiled_params[key] = value
+                if key in processors:
+                    value = processors[key](value)
+                params[key] = value
+
     def get_column_default(self, column, isinsert=True):
         """from postgres"""
         if column.primary_key:
@@ -170,17 +785,46 @@ class MDBExecutionContext(default.DefaultExecutionContext):
                 return self.execute_string("SELECT %s" % column.default.arg)
             elif isinstance(column.type, sqltypes.Integer) and isinstance(column.default, schema.Sequence):
             #elif use_sequence(column):
-                exc = "SELECT NEXT VALUE FOR %s" \
-                      % self.dialect.identifier_preparer.format_sequence(column.sequence)
-                next_value = self.execute_string(exc.encode(self.dialect.encoding))
-                return next_value
+                return self.fire_sequence(column.default, column.type)
         default_value = super(MDBExecutionContext, self).get_column_default(column)
         return default_value
 
+    def _exec_default(self, default, type_):
+        if default.is_clause_element:
+            # the SELECT of the default is executed in a context of its own,
+            # kept out of the connection's prepared statements
+            conn = self.connection.execution_options(prepare=False)
+            c = sql.select([default.arg]).compile(bind=conn)
+            return conn._execute_compiled(c, (), {}).scalar()
+        return super(MDBExecutionContext, self)._exec_default(default, type_)
+
     def fire_sequence(self, seq, type_):
+        block_size = self.dialect._sequence_block_size(seq)
+        if block_size > 1:
+            # values reserved earlier on this DBAPI connection
+            blocks = self.root_connection.info.setdefault(
+                "monetdb_sequence_blocks", {})
+            name = self.dialect.identifier_preparer.format_sequence(seq)
+            block = blocks.setdefault(name, collections.deque())
+            if not block:
+                block.extend(self._reserve_sequence_values(seq, block_size))
+            return block.popleft()
         return self._execute_scalar(("SELECT NEXT VALUE FOR %s" %
                                      self.dialect.identifier_preparer.format_sequence(seq)), type_)
 
+    def _reserve_sequence_values(self, seq, count):
+        """Fetch the next `count` values of `seq` in a single query.
+
+        The server generates every value, so the values follow the INCREMENT
+        of the sequence and are never handed out to another connection.
+        """
+
+        stmt = "SELECT NEXT VALUE FOR %s FROM sys.generate_series(0, %d)" % (
+            self.dialect.identifier_preparer.format_sequence(seq), count)
+        self.root_connection._cursor_execute(self.cursor, stmt, {},
+                                             context=self)
+        return [row[0] for row in self.cursor.fetchall()]
+
 
 RESERVED_WORDS = set(
     ["action", "add", "admin", "after", "aggregate", "all", "alter",
@@ -214,6 +858,189 @@ RESERVED_WORDS = set(
      "while", "with", "year", "zone"])
 
 
+# Catalog queries used for reflection, each rendered with a WHERE clause
+# selecting either a single table or all tables of a schema
+REFLECTION_QUERIES = {
+    "columns": """
+        SELECT tables.name AS table_name, columns.name, columns.type,
+               columns."default", columns."null", columns.type_digits,
+               columns.type_scale
+        FROM sys.columns
+        JOIN sys.tables ON (tables.id = columns.table_id)
+        WHERE {where}
+        ORDER BY tables.name, columns.number""",
+
+    "primary_keys": """
+        SELECT tables.name AS table_name, objects.name
+        FROM sys.keys
+        JOIN sys.objects USING (id)
+        JOIN sys.tables ON (tables.id = keys.table_id)
+        WHERE keys.type = 0
+          AND {where}
+        ORDER BY tables.name, objects.nr""",
+
+    "foreign_keys": """
+        SELECT
+            tables.name AS table_name,
+            fkkey.name AS name,
+            fkkeycol.name AS fkcolumn_name,
+            pkschema.name AS pktable_schema,
+            pktable.name AS pktable_name,
+            pkkeycol.name AS pkcolumn_name,
+            pkkeycol.nr AS key_seq
+        FROM sys.keys AS fkkey
+        JOIN sys.tables AS tables ON (tables.id = fkkey.table_id)
+        JOIN sys.objects AS fkkeycol ON (fkkey.id = fkkeycol.id)
+        JOIN sys.keys AS pkkey ON (fkkey.rkey = pkkey.id)
+        JOIN sys.objects AS pkkeycol ON (pkkey.id = pkkeycol.id)
+        JOIN sys.tables AS pktable ON (pktable.id = pkkey.table_id)
+        JOIN sys.schemas AS pkschema ON (pkschema.id = pktable.schema_id)
+        WHERE fkkey.rkey > -1
+          AND fkkeycol.nr = pkkeycol.nr
+          AND {where}
+        ORDER BY tables.name, name, key_seq""",
+
+    "indexes": """
+        SELECT tables.name AS table_name, idxs.name,
+               objects.name AS column_name, idxs.type AS index_type,
+               keys.type AS key_type
+        FROM sys.idxs
+        JOIN sys.objects USING (id)
+        JOIN sys.tables ON (tables.id = idxs.table_id)
+        LEFT JOIN sys.keys ON (keys.table_id = idxs.table_id
+                               AND keys.name = idxs.name)
+        WHERE {where}
+        ORDER BY tables.name, idxs.name, objects.nr""",
+
+    "table_kinds": """
+        SELECT tables.name AS table_name, tables.type, tables.query
+        FROM sys.tables
+        WHERE {where}""",
+
+    "statistics": """
+        SELECT tables.name AS table_name, columns.name, columns.type,
+               columns.type_digits, columns.type_scale,
+               storage."count" AS row_count, storage.columnsize,
+               storage.heapsize, storage.hashes, storage.imprints,
+               storage.sorted, statistics."unique", statistics.nils,
+               statistics.minval, statistics.maxval
+        FROM sys.columns
+        JOIN sys.tables ON (tables.id = columns.table_id)
+        JOIN sys.schemas ON (schemas.id = tables.schema_id)
+        LEFT JOIN sys.storage ON (storage."schema" = schemas.name
+                                  AND storage."table" = tables.name
+                                  AND storage."column" = columns.name)
+        LEFT JOIN sys.statistics ON (statistics.column_id = columns.id)
+        WHERE {where}
+        ORDER BY tables.name, columns.number""",
+}
+
+
+# Kinds of the tables of sys.tables.type, as given by the monetdb_kind
+# argument of Table; views, stream and system tables are left out
+TABLE_KINDS = {
+    0: None,
+    3: "merge",
+    5: "remote",
+    6: "replica",
+    7: "unlogged",
+}
+
+TABLE_TYPES = ", ".join(str(t) for t in sorted(TABLE_KINDS))
+
+# Temporary tables, in the tmp schema
+TEMPORARY_TABLE_TYPES = "20, 30"
+
+# Index types of sys.idxs.type, as given by the monetdb_type argument of
+# Index; hash and join indexes have no type of their own
+INDEX_TYPES = {
+    4: "imprints",
+    5: "ordered",
+}
+
+# Types of sys.keys.type of primary keys and unique constraints
+UNIQUE_KEY_TYPES = (0, 1)
+
+# Values of the monetdb_on_commit argument of temporary tables
+ON_COMMIT = {
+    "preserve_rows": "PRESERVE ROWS",
+    "delete_rows": "DELETE ROWS",
+    "drop": "DROP",
+}
+
+
+# A pyformat parameter of a compiled statement, or an escaped percent sign
+PYFORMAT_PARAMETER = re.compile(r"%\(([^)]+)\)s|%%")
+
+# The id in the reply to PREPARE
+PREPARED_ID = re.compile(r"^&5 (\d+)", re.M)
+
+
+# Names of the tables and sequences of a schema, for existence checks
+EXISTENCE_QUERIES = {
+    "tables": """
+        SELECT name FROM sys.tables
+        WHERE system = false AND type IN (%s)
+          AND schema_id = (SELECT id FROM sys.schemas WHERE name = {schema})"""
+        % TABLE_TYPES,
+
+    "sequences": """
+        SELECT name FROM sys.sequences
+        WHERE schema_id = (SELECT id FROM sys.schemas WHERE name = {schema})""",
+}
+
+# DDL changing what existence checks answer: kind, created
+EXISTENCE_DDL = {
+    schema.CreateTable: ("tables", True),
+    schema.DropTable: ("tables", False),
+    schema.CreateSequence: ("sequences", True),
+    schema.DropSequence: ("sequences", False),
+}
+
+# DDL leaving the names of tables and sequences as they are
+EXISTENCE_UNCHANGED = (schema.CreateIndex, schema.DropIndex,
+                       schema.AddConstraint, schema.DropConstraint,
+                       schema.CreateSchema, ddl.AddPartition,
+                       ddl.DropPartition)
+
+
+# Cheap summary of the catalog, changing whenever a table, column, key or
+# index is created or dropped, as object ids are never reused, and when the
+# type, default or nullability of a column changes. Renames are only seen
+# when they change the length of the name.
+CATALOG_FINGERPRINT = """
+    SELECT
+        (SELECT COUNT(*) FROM sys.tables),
+        (SELECT MAX(id) FROM sys.tables),
+        (SELECT SUM(LENGTH(name)) FROM sys.tables),
+        (SELECT COUNT(*) FROM sys.columns),
+        (SELECT MAX(id) FROM sys.columns),
+        (SELECT SUM(LENGTH(name)) FROM sys.columns),
+        (SELECT SUM(type_digits + type_scale) FROM sys.columns),
+        (SELECT COUNT("default") FROM sys.columns),
+        (SELECT SUM(CASE WHEN "null" THEN 1 ELSE 0 END) FROM sys.columns),
+        (SELECT COUNT(*) FROM sys.keys),
+        (SELECT MAX(id) FROM sys.keys),
+        (SELECT COUNT(*) FROM sys.idxs),
+        (SELECT MAX(id) FROM sys.idxs)"""
+
+
+def persistent_cache(fn):
+    """Serve the results of a per table reflection method from the
+    dialect's reflection cache file, if it has one."""
+
+    @functools.wraps(fn)
+    def go(self, connection, table_name, schema=None, **kw):
+        if self.reflection_cache is None:
+            return fn(self, connection, table_name, schema, **kw)
+        key = (fn.__name__, schema or self.default_schema_name, table_name)
+        return self.reflection_cache.get(
+            self._database(connection),
+            self._catalog_fingerprint(connection, **kw), key,
+            lambda: fn(self, connection, table_name, schema, **kw))
+    return go
+
+
 class MDBTypeCompiler(compiler.GenericTypeCompiler):
     def visit_DOUBLE_PRECISION(self, type_):
         return "DOUBLE PRECISION"
@@ -247,6 +1074,78 @@ class MDBIdentifierPreparer(compiler.IdentifierPreparer):
         super(MDBIdentifierPreparer, self).__init__(*args, **kwargs)
 
 
+def ping_connection(dbapi_connection, connection_record, connection_proxy):
+    """Check a connection on checkout with a MAPI command, which the server
+    answers without going through the SQL layer."""
+
+    try:
+        dbapi_connection.set_replysize(dbapi_connection.replysize)
+    except Exception:
+        raise exc.DisconnectionError()
+
+
+def begin_ddl_run(metadata, connection, **kw):
+    """Keep the names fetched by the existence checks of create_all() or
+    drop_all() across the commits of the DDL they execute."""
+
+    info = getattr(connection, "info", None)
+    if info is not None and isinstance(connection.dialect, MDBDialect):
+        info["monetdb_ddl_run"] = True
+
+
+def end_ddl_run(metadata, connection, **kw):
+    info = getattr(connection, "info", None)
+    if info is not None and isinstance(connection.dialect, MDBDialect):
+        info.pop("monetdb_ddl_run", None)
+        info.pop("monetdb_existence", None)
+
+
+# the checks of which tables and sequences to create or drop are made
+# before these events, within the transaction
+event.listen(schema.MetaData, "before_create", begin_ddl_run)
+event.listen(schema.MetaData, "before_drop", begin_ddl_run)
+event.listen(schema.MetaData, "after_create", end_ddl_run)
+event.listen(schema.MetaData, "after_drop", end_ddl_run)
+
+
+class MDBQueuePool(pool.QueuePool):
+    """QueuePool pinging connections on checkout and recycling them after
+    an hour by default.
+
+    The ping is turned off with ``monetdb_pre_ping=False``, which is named
+    apart from the ``pre_ping`` SQLAlchemy 1.2 gave its own pools.
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, recycle=3600,
+                 monetdb_pre_ping=True, **kw):
+        pool.QueuePool.__init__(self, creator, pool_size=pool_size,
+                                max_overflow=max_overflow, recycle=recycle,
+                                **kw)
+        # recreate() hands the listeners of the old pool over in _dispatch
+        if monetdb_pre_ping and kw.get("_dispatch") is None:
+            event.listen(self, "checkout", ping_connection)
+
+
+class MDBInspector(reflection.Inspector):
+    """Inspector adding the table and column statistics of MonetDB, which
+    like the other catalog information are fetched for a whole schema at
+    once and kept for the life of the inspector."""
+
+    def get_table_statistics(self, table_name, schema=None):
+        """Return the row count and storage sizes of `table_name`, see
+        :meth:`.MDBDialect.get_table_statistics`."""
+
+        return self.dialect.get_table_statistics(
+            self.bind, table_name, schema, info_cache=self.info_cache)
+
+    def get_column_statistics(self, table_name, schema=None):
+        """Return the storage sizes and value statistics of the columns of
+        `table_name`, see :meth:`.MDBDialect.get_column_statistics`."""
+
+        return self.dialect.get_column_statistics(
+            self.bind, table_name, schema, info_cache=self.info_cache)
+
+
 class MDBDialect(default.DefaultDialect):
     name = "monetdb"
     # preexecute_pk_sequences = True
@@ -256,17 +1155,134 @@ class MDBDialect(default.DefaultDialect):
     supports_native_decimal = True
     supports_default_values = True
     supports_native_boolean = True
-    poolclass = pool.SingletonThreadPool
+    poolclass = MDBQueuePool
+
+    colspecs = {
+        sqltypes.LargeBinary: BLOB,
+    }
 
     statement_compiler = MDBCompiler
     ddl_compiler = MDBDDLCompiler
     execution_ctx_cls = MDBExecutionContext
     preparer = MDBIdentifierPreparer
     type_compiler = MDBTypeCompiler
+    inspector = MDBInspector
     default_paramstyle = 'pyformat'
 
-    def __init__(self, **kwargs):
+    construct_arguments = [
+        (schema.Index, {
+            "type": None,
+        }),
+        (schema.Table, {
+            "kind": None,
+            "remote": None,
+            "on_commit": None,
+        }),
+    ]
+
+    def __init__(self, copy_threshold=1000, copy_batch_size=10000,
+                 insert_batch_mode=None, insert_batch_size=1000,
+                 insert_batch_bytes=1 << 20, sequence_block_size=1,
+                 reflection_cache_path=None, stream_reply_size=1000,
+                 compiled_cache_size=500, instrumentation=None,
+                 prepared_cache_size=None, fast_decode=False,
+                 pipeline_size=None, **kwargs):
+        """Construct a MonetDB dialect.
+
+        copy_threshold:
+          Minimum number of parameter sets for which an executemany()
+          INSERT is sent as COPY INTO instead; None disables COPY INTO.
+
+        copy_batch_size:
+          Maximum number of records sent in a single COPY INTO statement.
+
+        insert_batch_mode:
+          Set to "values" to send every executemany() INSERT as multi-row
+          INSERT ... VALUES statements rather than COPY INTO.
+
+        insert_batch_size:
+          Maximum number of rows in a single multi-row INSERT statement.
+
+        insert_batch_bytes:
+          Maximum size in bytes of the VALUES of a single multi-row INSERT
+          statement, once the parameters are interpolated.
+
+        sequence_block_size:
+          Number of values reserved at once when a Sequence is fired; the
+          values are handed out from a per-connection pool. Overridden for
+          a single Sequence by its ``info["monetdb_block_size"]``. The
+          values of a primary key Sequence reserving more than one are
+          fired before an INSERT rather than inline.
+
+        reflection_cache_path:
+          File in which reflected columns, keys and indexes are kept for
+          other processes, per database, for as long as its catalog doesn't
+          change. The file is loaded with pickle, which can run any code:
+          it must be trusted, in a directory only writable by the
+          application.
+
+        stream_reply_size:
+          Number of rows the server sends per reply for statements executed
+          with the ``stream_results`` execution option, unless overridden
+          by the ``reply_size`` execution option.
+
+        compiled_cache_size:
+          Number of compiled statements kept for constructs built again
+          from the same parts; None disables the cache.
+
+        instrumentation:
+          An ``instrument.Instrumentation`` receiving the timings and row
+          count of every statement.
+
+        prepared_cache_size:
+          Number of statements kept prepared on the server per connection,
+          executed by id instead of being sent in full; None disables
+          prepared statements.
+
+        fast_decode:
+          Decode the rows of selects with a table of converters built per
+          result instead of through the DBAPI, unless overridden by the
+          ``fast_decode`` execution option.
+
+        pipeline_size:
+          Maximum number of INSERT, UPDATE, DELETE and MERGE statements
+          queued per connection and sent in a single message, see
+          ``pipeline``; None disables pipelining. The rows matched by
+          pipelined statements aren't known, so the dialect then doesn't
+          claim a sane rowcount.
+        """
         default.DefaultDialect.__init__(self, **kwargs)
+        if insert_batch_mode not in (None, "values"):
+            raise exc.ArgumentError(
+                "insert_batch_mode must be None or 'values', got %r" %
+                insert_batch_mode)
+        self.copy_threshold = copy_threshold
+        self.copy_batch_size = copy_batch_size
+        self.insert_batch_mode = insert_batch_mode
+        self.insert_batch_size = insert_batch_size
+        self.insert_batch_bytes = insert_batch_bytes
+        self.sequence_block_size = sequence_block_size
+        self.stream_reply_size = stream_reply_size
+        self.instrumentation = instrumentation
+        self.prepared_cache_size = prepared_cache_size
+        self.fast_decode = fast_decode
+        self.pipeline_size = pipeline_size
+        if pipeline_size:
+            self.supports_sane_rowcount = False
+            self.supports_sane_multi_rowcount = False
+        if compiled_cache_size:
+            self.compiled_cache = CompiledCache(compiled_cache_size)
+        else:
+            self.compiled_cache = None
+        if reflection_cache_path is not None:
+            self.reflection_cache = ReflectionCache(reflection_cache_path)
+        else:
+            self.reflection_cache = None
+
+    def _sequence_block_size(self, seq):
+        """Return the number of values of `seq` reserved at once."""
+
+        return seq.info.get("monetdb_block_size", self.sequence_block_size)
 
     @classmethod
     def dbapi(cls):
@@ -284,22 +1300,78 @@ class MDBDialect(default.DefaultDialect):
         """Return a list of table names for `schema`."""
 
         query = """SELECT name FROM sys.tables
-               WHERE system = false AND type = 0 AND schema_id = %(schema_id)s"""
+               WHERE system = false AND type IN (%s)
+               AND schema_id = %%(schema_id)s""" % TABLE_TYPES
         return [row[0] for row in connection.execute(query, {
             "schema_id": self._schema_id(connection, schema)})]
 
+    def get_temp_table_names(self, connection, **kw):
+        """Return a list of the temporary tables of the session."""
+
+        query = """SELECT name FROM sys.tables
+               WHERE type IN (%s)
+               AND schema_id = %%(schema_id)s""" % TEMPORARY_TABLE_TYPES
+        return [row[0] for row in connection.execute(query, {
+            "schema_id": self._schema_id(connection, "tmp")})]
+
     def has_table(self, connection, table_name, schema=None):
-        return table_name in self.get_table_names(connection, schema)
+        return self._exists(connection, "tables", table_name, schema)
 
     def has_sequence(self, connection, sequence_name, schema=None):
-        cursor = connection.execute(
-            """SELECT * FROM sys.sequences WHERE name = %(name)s AND schema_id = %(schema_id)s""",
-                                    {"name": sequence_name.encode(self.encoding),
-                                     "schema_id": self._schema_id(connection, schema)})
-        return bool(cursor.first())
+        return self._exists(connection, "sequences", sequence_name, schema)
+
+    def _exists(self, connection, kind, name, schema=None):
+        """Check whether a table or sequence exists.
+
+        The first check of a kind in a transaction looks up the single name.
+        Further checks, such as those of create_all() and drop_all(), are
+        answered from the names of all tables or sequences of the schema,
+        fetched with one query and kept up to date with the DDL executed on
+        the connection until the transaction ends, or the create_all() or
+        drop_all() committing its DDL does.
+        """
+
+        info = getattr(connection, "info", None)
+        if info is None:
+            checked = {}
+        else:
+            checked = info.setdefault("monetdb_existence", {})
+        query = EXISTENCE_QUERIES[kind].format(
+            schema="%(schema)s" if schema is not None else "CURRENT_SCHEMA")
+        params = {"schema": schema}
+        if (kind, schema) not in checked:
+            checked[(kind, schema)] = None
+            return connection.execute(query + " AND name = %(name)s", dict(
+                params, name=name)).first() is not None
+
+        names = checked[(kind, schema)]
+        if names is None:
+            names = set(row[0] for row in
+                        connection.execute(query, params).fetchall())
+            checked[(kind, schema)] = names
+        return name in names
+
+    def _track_existence(self, connection, ddl):
+        """Keep the names fetched for existence checks on `connection` in
+        line with the DDL statement `ddl`."""
+
+        checked = connection.info.get("monetdb_existence")
+        if not checked or isinstance(ddl, EXISTENCE_UNCHANGED):
+            return
+        if type(ddl) not in EXISTENCE_DDL:
+            # any other DDL could rename or drop tables
+            del connection.info["monetdb_existence"]
+            return
+        kind, created = EXISTENCE_DDL[type(ddl)]
+        names = checked.get((kind, ddl.element.schema))
+        if names is not None:
+            if created:
+                names.add(ddl.element.name)
+            else:
+                names.discard(ddl.element.name)
 
     @reflection.cache
-    def _schema_id(self, connection, schema_name):
+    def _schema_id(self, connection, schema_name, **kw):
         """Fetch the id for schema"""
 
         if schema_name is None:
@@ -313,7 +1385,7 @@ class MDBDialect(default.DefaultDialect):
         return schema_id
 
     @reflection.cache
-    def _table_id(self, connection, table_name, schema_name=None):
+    def _table_id(self, connection, table_name, schema_name=None, **kw):
         """Fetch the id for schema.table_name, defaulting to current schema if schema is None"""
 
         query = """
@@ -323,7 +1395,7 @@ class MDBDialect(default.DefaultDialect):
             AND schema_id = %(schema_id)s"""
 
         c = connection.execute(query, {"name": table_name,
-                                       "schema_id": self._schema_id(connection, schema_name)})
+                                       "schema_id": self._schema_id(connection, schema_name, **kw)})
 
         table_id = c.scalar()
         if table_id is None:
@@ -331,6 +1403,64 @@ class MDBDialect(default.DefaultDialect):
 
         return table_id
 
+    @reflection.cache
+    def _database(self, connection):
+        """Return the host, port and name of the database of `connection`,
+        whose catalog fingerprints are only comparable with each other."""
+
+        url = connection.engine.url
+        return url.host, url.port, url.database
+
+    def _catalog_fingerprint(self, connection, **kw):
+        return tuple(connection.execute(CATALOG_FINGERPRINT).first())
+
+    def reflecttable(self, connection, table, include_columns,
+                     exclude_columns=None):
+        # share one Inspector, and with it the schema wide catalog queries,
+        # between the tables reflected on a connection until its transaction
+        # ends, as those of MetaData.reflect()
+        insp = connection.info.get("monetdb_inspector")
+        if insp is None or insp.bind is not connection:
+            insp = connection.info["monetdb_inspector"] = \
+                reflection.Inspector.from_engine(connection)
+        return insp.reflecttable(table, include_columns, exclude_columns)
+
+    @reflection.cache
+    def _schema_rows(self, connection, kind, schema=None, **kw):
+        """Fetch the catalog rows of `kind` for all tables in `schema` with a
+        single query, returning them grouped by table name."""
+
+        query = REFLECTION_QUERIES[kind].format(
+            where="tables.schema_id = %(schema_id)s")
+        c = connection.execute(query, {
+            "schema_id": self._schema_id(connection, schema, **kw)})
+
+        result = {}
+        for row in c:
+            result.setdefault(row.table_name, []).append(row)
+        return result
+
+    def _table_rows(self, connection, kind, table_name, schema=None, **kw):
+        """Return the catalog rows of `kind` for `table_name`.
+
+        When called from an Inspector the rows are taken from the schema
+        wide result of _schema_rows; tables unknown to that result are
+        queried on their own.
+        """
+
+        if kw.get("info_cache") is not None:
+            tables = self._schema_rows(connection, "columns", schema, **kw)
+            if table_name in tables:
+                rows = self._schema_rows(connection, kind, schema, **kw)
+                return rows.get(table_name, [])
+
+        query = REFLECTION_QUERIES[kind].format(
+            where="tables.id = %(table_id)s")
+        return list(connection.execute(query, {
+            "table_id": self._table_id(connection, table_name, schema,
+                                       **kw)}))
+
+    @persistent_cache
     def get_primary_keys(self, connection, table_name, schema=None, **kw):
         """Return information about primary keys in `table_name`.
 
@@ -339,37 +1469,20 @@ class MDBDialect(default.DefaultDialect):
         key information as a list of column names.
 
         """
-        query = """
-            SELECT objects.name
-            FROM sys.keys
-            JOIN sys.objects USING (id)
-            WHERE keys.table_id = %(table_id)s
-        """
-        c = connection.execute(query,
-                               {"table_id": self._table_id(connection, table_name, schema)})
-        return [row.name for row in c]
+        return [row.name for row in self._table_rows(
+            connection, "primary_keys", table_name, schema, **kw)]
 
+    @persistent_cache
     def get_columns(self, connection, table_name, schema=None, **kw):
-        query = """
-            SELECT id, name, type, "default", "null", type_digits, type_scale
-            FROM sys.columns
-            WHERE columns.table_id = %(table_id)s"""
-        c = connection.execute(query, {"table_id": self._table_id(connection, table_name, schema)})
-
         result = []
-        for row in c:
-            args = ()
+        for row in self._table_rows(connection, "columns", table_name,
+                                    schema, **kw):
             name = row.name
-            if row.type in ("char", "varchar"):
-                args = (row.type_digits,)
-            elif row.type == "decimal":
-                args = (row.type_digits, row.type_scale)
-            col_type = MONETDB_TYPE_MAP.get(row.type, None)
+            col_type = reflected_type(row.type, row.type_digits,
+                                      row.type_scale)
             if col_type is None:
                 warnings.warn(RuntimeWarning("Did not recognize type '%s' of column '%s', setting to nulltype" % (row.type, name)))
                 col_type = sqltypes.NULLTYPE
-            if col_type:
-                col_type = col_type(*args)
 
             column = {
                 "name": name,
@@ -382,37 +1495,84 @@ class MDBDialect(default.DefaultDialect):
             result.append(column)
         return result
 
-    def get_foreign_keys(self, connection, table_name, schema=None, **kw):
-        """Return information about foreign_keys in `table_name`."""
+    def get_column_statistics(self, connection, table_name, schema=None,
+                              **kw):
+        """Return the size and value statistics of the columns of
+        `table_name`, from ``sys.storage`` and ``sys.statistics``.
 
-        query = """
-            SELECT
-                fkkey.name AS name,
-                fkschema.name AS fktable_schema,
-                fktable.name AS fktable_name,
-                fkkeycol.name AS fkcolumn_name,
-                fktable.id AS fktable_id,
-                pkschema.name AS pktable_schema,
-                pktable.name AS pktable_name,
-                pkkeycol.name AS pkcolumn_name,
-                pktable.id AS pktable_id,
-                pkkeycol.nr AS key_seq
-            FROM sys.keys AS fkkey
-            JOIN sys.tables AS fktable ON (fktable.id = fkkey.table_id)
-            JOIN sys.objects AS fkkeycol ON (fkkey.id = fkkeycol.id)
-            JOIN sys.keys AS pkkey ON (fkkey.rkey = pkkey.id)
-            JOIN sys.objects AS pkkeycol ON (pkkey.id = pkkeycol.id)
-            JOIN sys.tables AS pktable ON (pktable.id = pkkey.table_id)
-            JOIN sys.schemas AS fkschema ON (fkschema.id = fktable.schema_id)
-            JOIN sys.schemas AS pkschema ON (pkschema.id = pktable.schema_id)
-            JOIN sys.tables AS pktable ON (pktable.id = pkkey.table_id)
-            WHERE fkkey.rkey > -1
-              AND fkkeycol.nr = pkkeycol.nr
-              AND fktable.id = %(table_id)s
-            ORDER BY name, key_seq
+        Every column is a dict of its name, the number of rows, the bytes
+        taken by its values, hash index and imprints, whether it is sorted,
+        and the number of unique values, NULLs and the smallest and largest
+        value found by the last ``ANALYZE``, which are None before one.
         """
-        c = connection.execute(query,
-                               {"table_id": self._table_id(connection, table_name, schema)})
+
+        result = []
+        for row in self._table_rows(connection, "statistics", table_name,
+                                    schema, **kw):
+            convert = None
+            col_type = reflected_type(row.type, row.type_digits,
+                                      row.type_scale)
+            if col_type is not None:
+                convert = bulk.export_converter(col_type)
+            bounds = []
+            for value in (row.minval, row.maxval):
+                if value is not None and convert is not None:
+                    try:
+                        value = convert(value)
+                    except ValueError:
+                        value = None
+                bounds.append(value)
+
+            result.append({
+                "name": row.name,
+                "rows": row.row_count,
+                "size": (row.columnsize or 0) + (row.heapsize or 0),
+                "hash_size": row.hashes or 0,
+                "imprints_size": row.imprints or 0,
+                "sorted": bool(row.sorted),
+                "unique": row.unique,
+                "nils": row.nils,
+                "min": bounds[0],
+                "max": bounds[1],
+            })
+        return result
+
+    def get_table_statistics(self, connection, table_name, schema=None,
+                             **kw):
+        """Return the number of rows of `table_name`, the bytes taken by
+        its columns, hash indexes and imprints, and the names of the columns
+        having a hash index or imprints."""
+
+        columns = self.get_column_statistics(connection, table_name, schema,
+                                             **kw)
+        return {
+            "rows": max([c["rows"] or 0 for c in columns] or [0]),
+            "size": sum(c["size"] for c in columns),
+            "hash_size": sum(c["hash_size"] for c in columns),
+            "imprints_size": sum(c["imprints_size"] for c in columns),
+            "hashed_columns": [c["name"] for c in columns if c["hash_size"]],
+            "imprinted_columns": [c["name"] for c in columns
+                                  if c["imprints_size"]],
+        }
+
+    @persistent_cache
+    def get_table_options(self, connection, table_name, schema=None, **kw):
+        """Return the monetdb_kind of merge, remote, replica and unlogged
+        tables, and the monetdb_remote URI of remote tables."""
+
+        options = {}
+        for row in self._table_rows(connection, "table_kinds", table_name,
+                                    schema, **kw):
+            kind = TABLE_KINDS.get(row.type)
+            if kind is not None:
+                options["monetdb_kind"] = kind
+            if kind == "remote":
+                options["monetdb_remote"] = row.query
+        return options
+
+    @persistent_cache
+    def get_foreign_keys(self, connection, table_name, schema=None, **kw):
+        """Return information about foreign_keys in `table_name`."""
 
         results = []
         key_data = {}
@@ -420,7 +1580,8 @@ class MDBDialect(default.DefaultDialect):
         referred_columns = []
         last_name = None
 
-        for row in c:
+        for row in self._table_rows(connection, "foreign_keys", table_name,
+                                    schema, **kw):
             if last_name is not None and last_name != row.name:
                 key_data["constrained_columns"] = constrained_columns
                 key_data["referred_columns"] = referred_columns
@@ -446,21 +1607,15 @@ class MDBDialect(default.DefaultDialect):
 
         return results
 
+    @persistent_cache
     def get_indexes(self, connection, table_name, schema=None, **kw):
-        query = """SELECT idxs.name, objects.name AS "column_name"
-                   FROM sys.idxs
-                   JOIN sys.objects USING (id)
-                   WHERE table_id = %(table_id)s
-                   ORDER BY idxs.name, objects.nr"""
-        c = connection.execute(query, {
-            "table_id": self._table_id(connection, table_name, schema)})
-
         results = []
         last_name = None
         column_names = []
         index_data = {}
 
-        for row in c:
+        for row in self._table_rows(connection, "indexes", table_name,
+                                    schema, **kw):
             if last_name is not None and last_name != row.name:
                 index_data["column_names"] = column_names
                 results.append(index_data)
@@ -469,8 +1624,11 @@ class MDBDialect(default.DefaultDialect):
             if last_name is None or last_name != row.name:
                 index_data = {
                     "name": row.name,
-                    "unique": False,
+                    "unique": row.key_type in UNIQUE_KEY_TYPES,
                 }
+                if row.index_type in INDEX_TYPES:
+                    index_data["dialect_options"] = {
+                        "monetdb_type": INDEX_TYPES[row.index_type]}
 
             last_name = row.name
             column_names.append(row.column_name)
@@ -481,11 +1639,298 @@ class MDBDialect(default.DefaultDialect):
 
         return results
 
+    def do_execute(self, cursor, statement, parameters, context=None):
+        start = default_timer()
+        pipeline = self._context_pipeline(context)
+        if pipeline is not None and not blob.streamed(parameters) and \
+                self._use_pipeline(context, statement):
+            if self._use_prepared(context, statement):
+                statement = self._prepared(cursor, statement, context)
+            pipeline.add(statement, parameters)
+            context.pipelined = True
+            if len(pipeline) >= self.pipeline_size:
+                pipeline.flush()
+            context.execute_time = default_timer() - start
+            return
+        if pipeline is not None:
+            # executed after the statements queued before it
+            pipeline.flush()
+        if context is not None and \
+                context.execution_options.get("columnar", False):
+            from sqlalchemy_monetdb import columnar
+            context.columnar_result = columnar.execute(
+                cursor.connection, statement, parameters, MONETDB_TYPE_MAP)
+        elif context is not None and \
+                context.execution_options.get("export", False):
+            context.export_output = bulk.CopyOutput(
+                cursor.connection, bulk.COPY_SELECT % statement, parameters,
+                [c.type for c in context.compiled.statement.c])
+        else:
+            if self._use_prepared(context, statement):
+                statement = self._prepared(cursor, statement, context)
+            if blob.streamed(parameters):
+                rowcount = blob.execute(cursor.connection, statement,
+                                        parameters)
+                if context is not None:
+                    context.streamed_rowcount = rowcount
+            elif self._use_fast_decode(context):
+                # the result stands in for the cursor, which is left unused
+                from sqlalchemy_monetdb import decode
+                context.cursor = decode.execute(cursor.connection,
+                                                statement, parameters)
+                cursor.close()
+            else:
+                cursor.execute(statement, parameters)
+        if context is not None:
+            context.execute_time = default_timer() - start
+
+    def do_executemany(self, cursor, statement, parameters, context=None):
+        start = default_timer()
+        values = context is not None and \
+            getattr(context.compiled, "bulk_values", None)
+        merge_parts = context is not None and \
+            getattr(context.compiled, "merge_parts", None)
+        streamed = any(blob.streamed(params) for params in parameters)
+        batching = self._insert_batching(values, parameters)
+        pipeline = self._context_pipeline(context)
+        pipelined = pipeline is not None and not streamed and \
+            not merge_parts and batching is None and \
+            self._use_pipeline(context, statement)
+        if pipeline is not None and not pipelined:
+            pipeline.flush()
+        if streamed:
+            rowcount = self._streamed_executemany(cursor, statement,
+                                                  parameters, context)
+            if context is not None:
+                context.streamed_rowcount = rowcount
+        elif merge_parts:
+            context.streamed_rowcount = self._merge_batches(
+                cursor, merge_parts, parameters)
+        elif batching == "values":
+            context.streamed_rowcount = self._values_insert(
+                cursor, context.compiled.statement.table, values, parameters)
+        elif batching == "copy":
+            context.streamed_rowcount = self._copy_insert(
+                cursor, context.compiled.statement.table,
+                [column for column, sql in values], parameters)
+        else:
+            if self._use_prepared(context, statement):
+                statement = self._prepared(cursor, statement, context)
+            if pipelined:
+                for params in parameters:
+                    pipeline.add(statement, params)
+                    if len(pipeline) >= self.pipeline_size:
+                        pipeline.flush()
+                context.pipelined = True
+            else:
+                cursor.executemany(statement, parameters)
+        if context is not None:
+            context.execute_time = default_timer() - start
+
+    def _insert_batching(self, values, parameters):
+        """Return how an executemany() INSERT of `values` is batched:
+        "values", "copy" or None."""
+
+        if not values:
+            return None
+        if self.insert_batch_mode == "values":
+            return "values"
+        if self.copy_threshold is not None and \
+                len(parameters) >= self.copy_threshold and \
+                not [sql for column, sql in values if sql is not None]:
+            return "copy"
+        return None
+
+    def do_execute_no_params(self, cursor, statement, context=None):
+        pipeline = self._context_pipeline(context)
+        if pipeline is not None:
+            pipeline.flush()
+        cursor.execute(statement)
+
+    def _streamed_executemany(self, cursor, statement, parameters, context):
+        """Execute `statement` once per parameter set, as some have BLOB
+        values to stream, and return the number of rows affected."""
+
+        if self._use_prepared(context, statement):
+            statement = self._prepared(cursor, statement, context)
+        rowcount = 0
+        for params in parameters:
+            if blob.streamed(params):
+                rowcount += blob.execute(cursor.connection, statement, params)
+            else:
+                cursor.execute(statement, params)
+                rowcount += cursor.rowcount
+        return rowcount
+
+    def _use_fast_decode(self, context):
+        return context is not None and \
+            context.execution_options.get("fast_decode", self.fast_decode) \
+            and context.reply_size is None and \
+            isinstance(getattr(context.compiled, "statement", None),
+                       sql.SelectBase)
+
+    def _context_pipeline(self, context):
+        """Return the pipeline of the connection of `context`, or None if
+        statements aren't pipelined."""
+
+        if not self.pipeline_size or context is None or \
+                context.root_connection is None:
+            return None
+        # the dialect's first connection is set up with a bare DBAPI
+        # connection, without the info of a pool record
+        info = getattr(context._dbapi_connection, "info", None)
+        if info is None:
+            return None
+        return self._pipeline(info, context._dbapi_connection.connection)
+
+    def _pipeline(self, info, connection):
+        """Return the Pipeline of the DBAPI `connection`, kept in the info
+        of its pool record."""
+
+        pipeline = info.get("monetdb_pipeline")
+        if pipeline is None or pipeline.connection is not connection:
+            # new or replaced by the pool since
+            pipeline = info["monetdb_pipeline"] = Pipeline(connection)
+        return pipeline
+
+    def _use_pipeline(self, context, statement):
+        """Whether `statement` is queued rather than executed: the compiled
+        INSERT, UPDATE, DELETE or MERGE of `context` needing nothing from
+        its execution."""
+
+        compiled = context.compiled
+        if compiled is None or statement != context.statement or \
+                not context.execution_options.get("pipeline", True):
+            # statements of the context's defaults among others
+            return False
+        if not (context.isinsert or context.isupdate or context.isdelete or
+                isinstance(compiled.statement, dml.Merge)):
+            return False
+        if compiled.returning:
+            return False
+        # the primary key generated by the server is read from the cursor
+        return not (context.isinsert and not context.executemany and
+                    None in context.inserted_primary_key)
+
+    def _use_prepared(self, context, statement):
+        """Whether `statement` is executed as a prepared statement: the
+        compiled statement of `context`, rather than one of its defaults."""
+
+        return self.prepared_cache_size and context is not None and \
+            context.compiled is not None and not context.isddl and \
+            statement == context.statement and \
+            context.execution_options.get("prepare", True)
+
+    def _prepared(self, cursor, statement, context):
+        """Return the EXEC of `statement`, prepared on the connection of
+        `context` if it isn't yet."""
+
+        info = context.root_connection.info
+        connection = context._dbapi_connection.connection
+        prepared = info.get("monetdb_prepared")
+        if prepared is None or prepared.connection is not connection:
+            # new or replaced by the pool since
+            prepared = info["monetdb_prepared"] = PreparedStatements(
+                connection, self.prepared_cache_size)
+
+        entry = prepared.get(statement)
+        if entry is None:
+            names = []
+
+            def placeholder(match):
+                if match.group(1) is None:
+                    return "%"
+                names.append(match.group(1))
+                return "?"
+            reply = cursor.connection.execute(
+                "PREPARE " + PYFORMAT_PARAMETER.sub(placeholder, statement))
+            statement_id = int(PREPARED_ID.search(reply).group(1))
+            entry = statement_id, "EXEC %d(%s)" % (statement_id, ", ".join(
+                "%%(%s)s" % name for name in names))
+            for evicted_id, exec_statement in prepared.add(statement, entry):
+                cursor.connection.execute("DEALLOCATE PREPARE %d" %
+                                          evicted_id)
+        return entry[1]
+
+    def _values_insert(self, cursor, table, values, parameters):
+        """Insert `parameters` into `table` with multi-row INSERT statements
+        of at most `insert_batch_size` rows and `insert_batch_bytes` bytes
+        of values each, and return the number of rows inserted."""
+
+        rowcount = 0
+        for batch in bulk.values_batches(values, parameters,
+                                         self.insert_batch_size,
+                                         self.insert_batch_bytes):
+            cursor.execute(*bulk.values_insert(self.identifier_preparer,
+                                               table, values, batch))
+            rowcount += cursor.rowcount
+        return rowcount
+
+    def _merge_batches(self, cursor, merge_parts, parameters):
+        """Merge `parameters` with MERGE statements of at most
+        `insert_batch_size` source rows each, and return the number of rows
+        merged."""
+
+        head, fields, tail = merge_parts
+        rowcount = 0
+        for start in range(0, len(parameters), self.insert_batch_size):
+            batch = parameters[start:start + self.insert_batch_size]
+            source, params = bulk.merge_source(fields, batch)
+            # the other parameters of the statement are the same for all
+            # rows
+            params.update(batch[0])
+            cursor.execute(head + source + tail, params)
+            rowcount += cursor.rowcount
+        return rowcount
+
+    def _copy_insert(self, cursor, table, columns, parameters):
+        """Load `parameters` into `table` with COPY INTO, sending at most
+        `copy_batch_size` records per statement, and return the number of
+        rows inserted."""
+
+        rowcount = 0
+        for start in range(0, len(parameters), self.copy_batch_size):
+            batch = parameters[start:start + self.copy_batch_size]
+            cursor.execute(bulk.copy_into(self.identifier_preparer, table,
+                                          columns, batch))
+            rowcount += cursor.rowcount
+        return rowcount
+
+    def is_disconnect(self, e, connection, cursor):
+        if isinstance(e, self.dbapi.Error):
+            msg = str(e)
+            return "Server closed connection" in msg or \
+                "connection closed" in msg
+        return False
+
     def do_commit(self, connection):
+        info = getattr(connection, "info", None)
+        if info and "monetdb_pipeline" in info:
+            # the queued statements are part of the transaction
+            self._pipeline(info, connection.connection).flush()
         connection.commit()
+        if info:
+            # other sessions' changes to the catalog are seen from now on
+            info.pop("monetdb_inspector", None)
+            if "monetdb_ddl_run" not in info:
+                info.pop("monetdb_existence", None)
+            if "monetdb_prepared" in info:
+                info["monetdb_prepared"].commit()
 
     def do_rollback(self, connection):
+        info = getattr(connection, "info", None)
+        if info and "monetdb_pipeline" in info:
+            info["monetdb_pipeline"].discard()
         connection.rollback()
+        # don't hand out sequence values reserved by the rolled back work
+        if info:
+            info.pop("monetdb_sequence_blocks", None)
+            # nor statements prepared by it
+            if "monetdb_prepared" in info:
+                info["monetdb_prepared"].rollback()
+            info.pop("monetdb_inspector", None)
+            info.pop("monetdb_existence", None)
+            info.pop("monetdb_ddl_run", None)
 
     @reflection.cache
     def get_schema_names(self, connection, **kw):
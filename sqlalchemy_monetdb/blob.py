@@ -0,0 +1,168 @@
+"""
+Streaming BLOB values for MonetDB
+
+MAPI is a text protocol: a BLOB travels as a string of hex digits, twice
+the size of the value. Rendered into the SQL string by the DBAPI, a value is
+copied several times over before it is sent.
+
+A large value bound to a :class:`~sqlalchemy_monetdb.base.BLOB` column is
+instead sent as the statement is written to the MAPI socket, hex encoding a
+chunk of the buffer or file at a time, so that no copy of the whole value is
+made. Results are decoded from the hex string of the DBAPI into ``bytes`` in
+one step, or read from it a chunk at a time through :class:`BlobReader`.
+
+"""
+import binascii
+import io
+import re
+import struct
+
+
+# bytes of a value read and hex encoded at a time
+CHUNK_SIZE = 1 << 16
+
+# largest payload of a MAPI block
+BLOCK_SIZE = 8190
+
+HEADER = struct.Struct("<H")
+
+PARAMETER = re.compile(r"%\(([^)]+)\)s|%%")
+
+
+class BlobParameter(object):
+    """A BLOB parameter value sent in chunks from a buffer or a file-like
+    object with a ``read()`` method, from its current position on."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def chunks(self):
+        """Yield the hex digits of the value as bytes, a chunk at a time."""
+
+        value = self.value
+        if hasattr(value, "readinto"):
+            buffer = bytearray(CHUNK_SIZE)
+            view = memoryview(buffer)
+            count = value.readinto(buffer)
+            while count:
+                yield binascii.hexlify(view[:count])
+                count = value.readinto(buffer)
+        elif hasattr(value, "read"):
+            chunk = value.read(CHUNK_SIZE)
+            while chunk:
+                yield binascii.hexlify(chunk)
+                chunk = value.read(CHUNK_SIZE)
+        else:
+            view = memoryview(value)
+            for start in range(0, len(view), CHUNK_SIZE):
+                yield binascii.hexlify(view[start:start + CHUNK_SIZE])
+
+
+def streamed(parameters):
+    """Return whether any value of `parameters` is a :class:`BlobParameter`.
+    """
+
+    return bool(parameters) and any(
+        isinstance(value, BlobParameter) for value in parameters.values())
+
+
+class BlockWriter(object):
+    """Writes a MAPI message to a socket in blocks of at most BLOCK_SIZE
+    bytes, the last one flagged."""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) > BLOCK_SIZE:
+            # keep the last bytes, which may end the message
+            end = (len(self.buffer) - 1) // BLOCK_SIZE * BLOCK_SIZE
+            blocks = bytearray()
+            for start in range(0, end, BLOCK_SIZE):
+                blocks += HEADER.pack(BLOCK_SIZE << 1)
+                blocks += self.buffer[start:start + BLOCK_SIZE]
+            self.socket.sendall(blocks)
+            del self.buffer[:end]
+
+    def close(self):
+        self.socket.sendall(HEADER.pack(len(self.buffer) << 1 | 1) +
+                            bytes(self.buffer))
+        self.buffer = bytearray()
+
+
+def execute(connection, statement, parameters):
+    """Execute `statement` on the DBAPI `connection`, writing the other
+    parameters the way the DBAPI cursor does and the :class:`BlobParameter`
+    values as hex strings, and return the number of rows affected."""
+
+    from monetdb.sql import monetize
+
+    writer = BlockWriter(connection.mapi.socket)
+    writer.write(b"s")
+    position = 0
+    for match in PARAMETER.finditer(statement):
+        writer.write(statement[position:match.start()].encode("utf-8"))
+        position = match.end()
+        name = match.group(1)
+        if name is None:
+            writer.write(b"%")
+            continue
+        value = parameters[name]
+        if isinstance(value, BlobParameter):
+            writer.write(b"'")
+            for chunk in value.chunks():
+                writer.write(chunk)
+            writer.write(b"'")
+        else:
+            writer.write(monetize.convert(value).encode("utf-8"))
+    writer.write(statement[position:].encode("utf-8") + b";")
+    writer.close()
+
+    block = connection.mapi._getblock()
+    if block.startswith("!"):
+        raise connection.OperationalError(block[1:].strip())
+    if block.startswith("&2 "):
+        return int(block.split()[1])
+    if block.startswith(("&3", "&4")) or not block.strip():
+        return -1
+    raise connection.ProgrammingError(
+        "Statements returning rows can't have streamed BLOB parameters")
+
+
+class BlobReader(io.RawIOBase):
+    """A read-only binary file of a BLOB value, decoded from the hex string
+    of a result a chunk at a time."""
+
+    def __init__(self, hex_value):
+        self.hex_value = hex_value
+        self.position = 0
+
+    def __len__(self):
+        return len(self.hex_value) // 2
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = self.position * 2
+        end = start + len(buffer) * 2
+        data = binascii.unhexlify(self.hex_value[start:end])
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def copy_to(self, fileobj, chunk_size=CHUNK_SIZE):
+        """Write the rest of the value to `fileobj` and return the number
+        of bytes written."""
+
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        total = 0
+        count = self.readinto(buffer)
+        while count:
+            fileobj.write(view[:count])
+            total += count
+            count = self.readinto(buffer)
+        return total
@@ -0,0 +1,396 @@
+"""
+Bulk loading support for MonetDB
+
+http://www.monetdb.org/Documentation/Manuals/SQLreference/CopyInto
+
+Loading rows through ``COPY n RECORDS INTO table FROM STDIN`` sends a whole
+batch in a single MAPI message instead of one INSERT round trip per row. The
+records follow the statement inline, so they are rendered here in the
+delimited text format the COPY parser expects.
+
+A multi-row ``INSERT ... VALUES (...), (...)`` statement is the lighter
+alternative, leaving the quoting of the values to the DBAPI. MERGE
+statements of parameters take their rows from a ``UNION ALL`` of one
+``SELECT`` per row in the same way.
+
+Exporting goes the other way: ``COPY SELECT ... INTO STDOUT`` makes the
+server send the records of a query in the same format, read here a MAPI
+block at a time and parsed into columns by the types of the query.
+
+"""
+import binascii
+import datetime
+import decimal
+import re
+
+from sqlalchemy import exc
+from sqlalchemy import types as sqltypes
+
+from sqlalchemy_monetdb.blob import HEADER
+
+
+FIELD_DELIMITER = "|"
+RECORD_DELIMITER = "\n"
+QUOTE = '"'
+NULL = ""
+
+COPY_INTO = "COPY %d RECORDS INTO %s (%s) FROM STDIN " \
+            "USING DELIMITERS '|', '\\n', '\"' NULL AS ''"
+
+COPY_SELECT = "COPY %s INTO STDOUT " \
+              "USING DELIMITERS '|', '\\n', '\"' NULL AS ''"
+
+# a field of an exported record, followed by its delimiter
+RECORD_FIELD = re.compile(r'(?:"((?:[^"\\]|\\.)*)"|([^|"]*))\|')
+
+FIELD_ESCAPE = re.compile(r"\\(.)")
+
+# a field of a tuple of a MAPI result, followed by its delimiter
+TUPLE_FIELD = re.compile(r'("(?:[^"\\]|\\.)*"|[^,\t"]*)(?:,\t|$)')
+
+FIELD_ESCAPES = {"n": "\n", "t": "\t", "r": "\r"}
+
+try:
+    text_types = (str, unicode)
+    binary_types = (bytearray, buffer)
+except NameError:
+    text_types = (str,)
+    binary_types = (bytes, bytearray, memoryview)
+
+
+def copy_text(value):
+    """returns a quoted field with backslash escapes"""
+    value = value.replace("\\", "\\\\").replace(QUOTE, "\\" + QUOTE)
+    value = value.replace("\n", "\\n").replace("\r", "\\r")
+    return QUOTE + value + QUOTE
+
+
+def copy_binary(value):
+    """returns the hex representation MonetDB uses for BLOB values"""
+    return binascii.hexlify(bytes(value)).decode("ascii").upper()
+
+
+def copy_bool(value):
+    return value and "true" or "false"
+
+
+def copy_datetime(value):
+    return value.isoformat(" ")
+
+
+def copy_isoformat(value):
+    return value.isoformat()
+
+
+mapping = [
+    (bool, copy_bool),
+    (int, str),
+    (float, repr),
+    (decimal.Decimal, str),
+    (datetime.datetime, copy_datetime),
+    (datetime.date, copy_isoformat),
+    (datetime.time, copy_isoformat),
+]
+mapping.extend((type_, copy_text) for type_ in text_types)
+mapping.extend((type_, copy_binary) for type_ in binary_types)
+
+try:
+    mapping.append((long, str))
+except NameError:
+    pass
+
+mapping_dict = dict(mapping)
+
+
+def copy_field(value):
+    """Render a single DBAPI parameter value as a COPY INTO field."""
+
+    if value is None:
+        return NULL
+    try:
+        return mapping_dict[type(value)](value)
+    except KeyError:
+        for type_, func in mapping:
+            if isinstance(value, type_):
+                return func(value)
+    raise exc.ArgumentError("Can't load value %r of type %s through COPY INTO"
+                            % (value, type(value)))
+
+
+def copy_records(keys, parameters):
+    """Render a list of parameter dictionaries as COPY INTO records, taking
+    the fields in the order given by `keys`."""
+
+    return "".join(
+        FIELD_DELIMITER.join([copy_field(params[key]) for key in keys]) +
+        RECORD_DELIMITER for params in parameters)
+
+
+def copy_into(preparer, table, columns, parameters):
+    """Return a ``COPY INTO ... FROM STDIN`` statement loading `parameters`
+    into `columns` of `table`, with the records following inline."""
+
+    statement = COPY_INTO % (
+        len(parameters),
+        preparer.format_table(table),
+        ", ".join([preparer.format_column(c) for c in columns]))
+    return statement + ";\n" + copy_records([c.key for c in columns],
+                                            parameters)
+
+
+def values_insert(preparer, table, values, parameters):
+    """Return a multi-row ``INSERT ... VALUES`` statement and its parameter
+    dictionary inserting `parameters` into `table`.
+
+    `values` holds (column, sql) pairs; the parameter named after the column
+    is bound where sql is None, otherwise sql is repeated in every row.
+    """
+
+    rows = []
+    params = {}
+    for index, row in enumerate(parameters):
+        fields = []
+        for column, sql in values:
+            if sql is None:
+                name = "%s_%d" % (column.key, index)
+                params[name] = row[column.key]
+                sql = "%%(%s)s" % name
+            fields.append(sql)
+        rows.append("(%s)" % ", ".join(fields))
+
+    statement = "INSERT INTO %s (%s) VALUES %s" % (
+        preparer.format_table(table),
+        ", ".join([preparer.format_column(c) for c, sql in values]),
+        ", ".join(rows))
+    return statement, params
+
+
+def values_batches(values, parameters, max_rows, max_bytes):
+    """Split `parameters` into batches for values_insert() of at most
+    `max_rows` rows, whose VALUES lists take at most `max_bytes` bytes once
+    the DBAPI has interpolated the parameters. A row larger than that is
+    sent in a batch of its own."""
+
+    from monetdb.sql import monetize
+
+    batch, size = [], 0
+    for row in parameters:
+        # "(", the fields separated by ", ", and ")"
+        row_size = 2 * len(values)
+        for column, sql in values:
+            if sql is None:
+                sql = monetize.convert(row[column.key])
+            row_size += len(sql.encode("utf-8"))
+        if batch and (len(batch) == max_rows or size + row_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(row)
+        size += row_size
+    if batch:
+        yield batch
+
+
+def merge_source(fields, parameters):
+    """Return a ``SELECT ... UNION ALL SELECT ...`` of `parameters`, one
+    row per parameter dictionary, and its parameter dictionary.
+
+    `fields` holds (key, label) pairs; the columns of the first row are
+    labeled, naming the columns of the result.
+    """
+
+    rows = []
+    params = {}
+    for index, row in enumerate(parameters):
+        columns = []
+        for key, label in fields:
+            name = "merge_%d_%s" % (index, key)
+            params[name] = row[key]
+            columns.append(index and "%%(%s)s" % name or
+                           "%%(%s)s AS %s" % (name, label))
+        rows.append("SELECT " + ", ".join(columns))
+    return " UNION ALL ".join(rows), params
+
+
+def split_record(line):
+    """Return the fields of an exported record, None for NULL."""
+
+    if QUOTE not in line:
+        return [field or None for field in line.split(FIELD_DELIMITER)]
+    fields = []
+    for match in RECORD_FIELD.finditer(line + FIELD_DELIMITER):
+        quoted = match.group(1)
+        if quoted is None:
+            fields.append(match.group(2) or None)
+        elif "\\" in quoted:
+            fields.append(FIELD_ESCAPE.sub(
+                lambda m: FIELD_ESCAPES.get(m.group(1), m.group(1)), quoted))
+        else:
+            fields.append(quoted)
+    return fields
+
+
+def split_tuple(line, width=None):
+    """Return the fields of a ``[ value,\tvalue\t]`` tuple of a MAPI
+    result as sent, strings still quoted and escaped, splitting only on the
+    delimiters outside of strings.
+
+    A tuple split on every delimiter into the `width` fields of its result
+    has none in its strings, and is returned as is. Raises ValueError if a
+    string isn't terminated.
+    """
+
+    line = line[1:-1].strip()
+    fields = line.split(",\t")
+    if len(fields) == width or QUOTE not in line:
+        return fields
+    fields, position = [], 0
+    while True:
+        match = TUPLE_FIELD.match(line, position)
+        if match is None:
+            raise ValueError("unterminated string in row")
+        fields.append(match.group(1))
+        position = match.end()
+        if position >= len(line):
+            return fields
+
+
+def parse_bool(value):
+    return value == "true"
+
+
+def parse_date(value):
+    return datetime.date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+
+
+def parse_time(value):
+    microsecond = value[9:15]
+    return datetime.time(int(value[:2]), int(value[3:5]), int(value[6:8]),
+                         int(microsecond.ljust(6, "0")) if microsecond else 0)
+
+
+def parse_datetime(value):
+    date, time = value[:10], parse_time(value[11:])
+    return datetime.datetime(int(date[:4]), int(date[5:7]), int(date[8:10]),
+                             time.hour, time.minute, time.second,
+                             time.microsecond)
+
+
+def parse_float(value):
+    return float(value)
+
+
+# conversion of exported fields by the type of their column, in order of
+# lookup; fields of other types are left as strings
+export_mapping = [
+    (sqltypes.Boolean, parse_bool),
+    (sqltypes.Integer, int),
+    (sqltypes.Float, parse_float),
+    (sqltypes.Numeric, decimal.Decimal),
+    (sqltypes.DateTime, parse_datetime),
+    (sqltypes.Date, parse_date),
+    (sqltypes.Time, parse_time),
+    (sqltypes.LargeBinary, binascii.unhexlify),
+]
+
+
+def export_converter(type_):
+    """Return the function converting exported fields of SQL type `type_`,
+    or None for strings."""
+
+    if isinstance(type_, sqltypes.Numeric) and \
+            not isinstance(type_, sqltypes.Float) and not type_.asdecimal:
+        return parse_float
+    for sql_type, func in export_mapping:
+        if isinstance(type_, sql_type):
+            return func
+    return None
+
+
+class CopyOutput(object):
+    """The records of a ``COPY ... INTO STDOUT`` statement sent on the DBAPI
+    `connection`, read a MAPI block at a time."""
+
+    def __init__(self, connection, statement, parameters, types):
+        from monetdb.sql import monetize
+
+        if parameters:
+            statement = statement % dict(
+                (k, monetize.convert(v)) for k, v in parameters.items())
+        self.connection = connection
+        self.mapi = connection.mapi
+        self.converters = [export_converter(t) for t in types]
+        self.rowcount = -1
+        self.done = False
+        self.rest = b""
+        self.mapi._putblock("s" + statement + ";")
+
+    def _read_block(self):
+        header = HEADER.unpack(self.mapi._getbytes(2))[0]
+        self.done = bool(header & 1)
+        return self.mapi._getbytes(header >> 1)
+
+    def _records(self, data):
+        """Return `data` without the lines of the MAPI protocol, which are
+        the only ones to start with "&" or "!"."""
+
+        if not (data.startswith((b"&", b"!")) or b"\n&" in data or
+                b"\n!" in data):
+            return data
+        records = []
+        for line in data.split(b"\n"):
+            if line.startswith(b"!"):
+                self.close()
+                raise self.connection.OperationalError(
+                    line[1:].decode("utf-8"))
+            elif line.startswith(b"&2 "):
+                self.rowcount = int(line.split()[1])
+            elif line and not line.startswith(b"&"):
+                records.append(line + b"\n")
+        return b"".join(records)
+
+    def chunks(self):
+        """Yield the records as bytes, each chunk ending with a complete
+        record."""
+
+        while not self.done:
+            data = self.rest + self._read_block()
+            if self.done:
+                end = len(data)
+            else:
+                end = data.rfind(b"\n") + 1
+            self.rest = data[end:]
+            data = self._records(data[:end])
+            if data:
+                yield data
+
+    def batches(self, size):
+        """Yield lists of the values of at most `size` records, one list per
+        column, converted by the types of the columns."""
+
+        columns = [[] for c in self.converters]
+        count = 0
+        for chunk in self.chunks():
+            for line in chunk.decode("utf-8").splitlines():
+                for column, field in zip(columns, split_record(line)):
+                    column.append(field)
+                count += 1
+                if count == size:
+                    yield self._convert(columns)
+                    columns = [[] for c in self.converters]
+                    count = 0
+        if count:
+            yield self._convert(columns)
+
+    def _convert(self, columns):
+        for column, func in zip(columns, self.converters):
+            if func is not None:
+                column[:] = [None if value is None else func(value)
+                             for value in column]
+        return columns
+
+    def close(self):
+        """Read the rest of the output, so that the connection can be used
+        again."""
+
+        while not self.done:
+            self._read_block()
@@ -0,0 +1,234 @@
+"""
+Caches of reflection results and compiled statements
+
+Reflected table information is stored in a file together with a
+fingerprint of the catalog it was read from, per database, so that new
+processes can skip the catalog queries for as long as the schema stays the
+same. The file is a pickle, which runs code when loaded: it must only be
+writable by those trusted to run code in the processes reading it.
+
+Compiled statements are kept in memory, keyed on the parts their construct
+is made of, so that constructs built the same way from the same tables,
+columns and clause objects share a compiled statement.
+
+The ids of server-side prepared statements are kept per connection, so that
+a statement is prepared once and then executed by id.
+
+"""
+import atexit
+import collections
+import copy
+import os
+import pickle
+import threading
+import weakref
+
+from sqlalchemy import schema, util
+
+
+class ReflectionCache(object):
+    """Reflection results kept in memory and saved to `path`, valid for as
+    long as the catalog fingerprint of their database matches the one they
+    were read with."""
+
+    def __init__(self, path):
+        self.path = path
+        # (fingerprint, entries) by database
+        self.databases = {}
+        self.modified = False
+        self._lock = threading.Lock()
+        self._load()
+        _reflection_caches.add(self)
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                self.databases = dict(pickle.load(f)["databases"])
+        except Exception:
+            # missing, unreadable or from an incompatible version; the
+            # entries are simply reflected again
+            self.databases = {}
+
+    def save(self):
+        """Write the entries to the cache file if they have changed."""
+
+        with self._lock:
+            if not self.modified:
+                return
+            # imported here, it adds half of the import time of the dialect
+            import tempfile
+
+            data = {"databases": self.databases}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, name = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+                # replace atomically, other processes may be reading it
+                os.rename(name, self.path)
+            except Exception:
+                os.unlink(name)
+                raise
+            self.modified = False
+
+    def get(self, database, fingerprint, key, create):
+        """Return the entry for `key` in `database`, calling `create` to
+        reflect it if the cache holds no entry for the current catalog
+        `fingerprint` of the database."""
+
+        with self._lock:
+            cached = self.databases.get(database)
+            if cached is None or cached[0] != fingerprint:
+                cached = self.databases[database] = (fingerprint, {})
+                self.modified = True
+            if key in cached[1]:
+                return copy.deepcopy(cached[1][key])
+
+        value = create()
+        with self._lock:
+            if self.databases.get(database) is cached:
+                cached[1][key] = copy.deepcopy(value)
+                self.modified = True
+        return value
+
+
+# reflection caches saved when the process exits, for as long as their
+# dialect is alive
+_reflection_caches = weakref.WeakSet()
+
+
+@atexit.register
+def _save_reflection_caches():
+    for cache in list(_reflection_caches):
+        cache.save()
+
+
+# attributes of a select rendered as bound parameters; only whether they are
+# set is part of its key
+BOUND_ATTRIBUTES = ("_limit", "_offset", "_sample", "_seed")
+
+# attributes of a construct left out of its key: the bound ones, and those
+# that are derived or don't affect the SQL
+IGNORED_ATTRIBUTES = frozenset(BOUND_ATTRIBUTES + ("_bind", "_columns"))
+
+
+def _object_key(value):
+    if isinstance(value, schema.Table):
+        # selecting a table selects the columns it has when compiled, which
+        # append_column() changes
+        return (id(value),) + tuple(id(column) for column in value.columns)
+    return id(value)
+
+
+def _part_key(value):
+    if value is None or isinstance(value, (bool, float) + util.int_types +
+                                   util.string_types):
+        return value
+    elif isinstance(value, (list, tuple, util.OrderedSet)):
+        return tuple(_object_key(item) for item in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_object_key(item) for item in value)
+    elif isinstance(value, dict):
+        return frozenset((_object_key(k), _object_key(v))
+                         for k, v in value.items())
+    return _object_key(value)
+
+
+def statement_key(statement):
+    """Return a key for `statement` equal to the key of every statement
+    made of the same parts, apart from its LIMIT, OFFSET and SAMPLE.
+
+    Parts are compared by identity, not by the SQL they render: a clause
+    built again, as ``t.c.id == 5`` in a new ``where()``, is another part
+    and gives another key. Tables are compared together with their
+    columns. That is sound as long as the statement the key was made for is
+    alive, which the cached compiled statement ensures.
+    """
+
+    cls = type(statement)
+    return (cls,) + tuple(statement.__dict__.get(name) is None
+                          for name in BOUND_ATTRIBUTES) + tuple(
+        (name, _part_key(value))
+        for name, value in sorted(statement.__dict__.items())
+        if name not in IGNORED_ATTRIBUTES and
+        not isinstance(getattr(cls, name, None), util.memoized_property))
+
+
+class CompiledCache(object):
+    """Least recently used cache of at most `size` compiled statements,
+    counting hits and misses."""
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Return the entry for `key`, calling `create` to make it if the
+        cache holds none."""
+
+        with self._lock:
+            value = self.entries.pop(key, None)
+            if value is not None:
+                self.entries[key] = value
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = create()
+        with self._lock:
+            self.entries[key] = value
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+class PreparedStatements(object):
+    """Ids of at most `size` statements prepared on the DBAPI `connection`,
+    least recently used first.
+
+    Statements prepared since the last commit are pending, and forgotten
+    with the transaction when it is rolled back.
+    """
+
+    def __init__(self, connection, size):
+        self.connection = connection
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.pending = set()
+
+    def get(self, statement):
+        """Return the entry of `statement` or None."""
+
+        entry = self.entries.pop(statement, None)
+        if entry is not None:
+            self.entries[statement] = entry
+        return entry
+
+    def add(self, statement, entry):
+        """Add the entry of `statement`, returning the entries evicted to
+        make room for it."""
+
+        self.entries[statement] = entry
+        self.pending.add(statement)
+        evicted = []
+        while len(self.entries) > self.size:
+            key, value = self.entries.popitem(last=False)
+            self.pending.discard(key)
+            evicted.append(value)
+        return evicted
+
+    def commit(self):
+        self.pending.clear()
+
+    def rollback(self):
+        for statement in self.pending:
+            self.entries.pop(statement, None)
+        self.pending.clear()
@@ -0,0 +1,203 @@
+"""
+Columnar result fetching for MonetDB
+
+A statement executed with the ``columnar`` execution option is sent over
+MAPI directly instead of through a DBAPI cursor. Its result blocks are
+split into columns, and every column is decoded into a NumPy array at once
+rather than value by value into row tuples.
+
+numpy is required to fetch columnar results.
+
+"""
+from sqlalchemy import exc
+from sqlalchemy import types as sqltypes
+
+from sqlalchemy_monetdb import bulk
+
+
+# NumPy dtypes for the SQL types of MONETDB_TYPE_MAP, in order of lookup;
+# columns of other types are decoded by the DBAPI into object arrays
+DTYPES = [
+    (sqltypes.SMALLINT, "int16"),
+    (sqltypes.BIGINT, "int64"),
+    (sqltypes.INTEGER, "int32"),
+    (sqltypes.Integer, "int64"),
+    (sqltypes.FLOAT, "float32"),
+    (sqltypes.Float, "float64"),
+    (sqltypes.Numeric, "float64"),
+    (sqltypes.Boolean, "bool"),
+    (sqltypes.DATE, "datetime64[D]"),
+    (sqltypes.TIMESTAMP, "datetime64[us]"),
+    (sqltypes.TIME, "timedelta64[us]"),
+]
+
+# placeholder for NULL fields, replaced before a column is converted
+NULL_VALUES = {
+    "bool": "false",
+    "datetime64[D]": "1970-01-01",
+    "datetime64[us]": "1970-01-01",
+    "timedelta64[us]": "00:00:00",
+}
+
+
+def get_dtype(type_code, type_map):
+    """Return the NumPy dtype for the MonetDB type `type_code`, or None."""
+
+    type_ = type_map.get(type_code)
+    if type_ is not None:
+        for sql_type, dtype in DTYPES:
+            if issubclass(type_, sql_type):
+                return dtype
+    return None
+
+
+def execute(connection, statement, parameters, type_map):
+    """Execute `statement` on the DBAPI `connection`, interpolating the
+    parameters the way the DBAPI cursor does, and return its result."""
+
+    from monetdb.sql import monetize
+
+    if parameters:
+        statement = statement % dict(
+            (k, monetize.convert(v)) for k, v in parameters.items())
+    return ColumnarResult(connection, connection.execute(statement),
+                          type_map)
+
+
+class ColumnarResult(object):
+    """The result of a statement executed over MAPI, fetched as columns."""
+
+    # number of rows requested per Xexport command
+    export_size = 10000
+
+    def __init__(self, connection, block, type_map):
+        self.connection = connection
+        self.type_map = type_map
+        self.query_id = None
+        self.rowcount = -1
+        self.description = None
+        self.offset = 0
+        self.blocks = []
+
+        names = types = []
+        lines = self._lines(block)
+        for line in lines:
+            if line.startswith("&1 "):
+                query_id, rowcount = line[3:].split()[:2]
+                self.query_id = int(query_id)
+                self.rowcount = int(rowcount)
+            elif line.startswith("%"):
+                values, identity = line[1:].rsplit("#", 1)
+                values = [v.strip() for v in values.split(",\t")]
+                if identity.strip() == "name":
+                    names = values
+                elif identity.strip() == "type":
+                    types = values
+        if self.query_id is not None:
+            self.description = [(name, type_code, None, None, None, None,
+                                 None) for name, type_code in zip(names, types)]
+            self._add_block(lines)
+
+    def _lines(self, block):
+        lines = (block or "").split("\n")
+        for line in lines:
+            if line.startswith("!"):
+                raise self.connection.ProgrammingError(line[1:])
+        return lines
+
+    def _add_block(self, lines):
+        tuples = [line for line in lines if line.startswith("[")]
+        self.offset += len(tuples)
+        self.blocks.append(tuples)
+
+    def _fetch_block(self):
+        """Fetch the next block of rows, returning False if there are no
+        more."""
+
+        if self.query_id is None or self.offset >= self.rowcount:
+            return False
+        amount = min(self.export_size, self.rowcount - self.offset)
+        block = self.connection.command(
+            "Xexport %d %d %d" % (self.query_id, self.offset, amount))
+        self._add_block(self._lines(block))
+        return True
+
+    def _fetch_blocks(self):
+        while self._fetch_block():
+            pass
+
+    def close(self):
+        """Release the result on the server."""
+
+        if self.query_id is not None and self.connection.mapi:
+            self.connection.command("Xclose %d" % self.query_id)
+        self.query_id = None
+
+    def fetch_columns(self):
+        """Fetch all remaining rows, returning a dictionary with an array of
+        values for every column name."""
+
+        try:
+            import numpy
+        except ImportError:
+            raise exc.InvalidRequestError(
+                "Fetching columnar results requires numpy")
+
+        if self.description is None:
+            raise exc.ResourceClosedError(
+                "This result object does not return rows.")
+
+        self._fetch_blocks()
+        blocks, self.blocks = self.blocks, []
+        self.close()
+
+        # split the tuples into fields, then transpose them into columns
+        fields = [self._split(line) for block in blocks for line in block]
+        if fields:
+            columns = list(zip(*fields))
+        else:
+            columns = [()] * len(self.description)
+        del fields
+
+        result = {}
+        for description, values in zip(self.description, columns):
+            name, type_code = description[:2]
+            result[name] = self._convert(numpy, type_code, values)
+        return result
+
+    def _split(self, line):
+        try:
+            fields = bulk.split_tuple(line, len(self.description))
+        except ValueError as e:
+            raise self.connection.InterfaceError(str(e))
+        if len(fields) != len(self.description):
+            raise self.connection.InterfaceError(
+                "length of row doesn't match header")
+        return fields
+
+    def _convert(self, numpy, type_code, values):
+        raw = numpy.char.strip(numpy.array(values, dtype=numpy.str_))
+        mask = raw == "NULL"
+        dtype = get_dtype(type_code, self.type_map)
+
+        if dtype is None:
+            from monetdb.sql import pythonize
+            data = numpy.empty(len(values), dtype=object)
+            data[:] = [None if null else
+                       pythonize.convert(str(value), type_code)
+                       for value, null in zip(raw, mask)]
+            return data
+
+        if mask.any():
+            raw[mask] = NULL_VALUES.get(dtype, "0")
+        if dtype == "bool":
+            data = raw == "true"
+        elif dtype.startswith("timedelta64"):
+            data = numpy.char.add("1970-01-01T", raw).astype(
+                "datetime64[us]") - numpy.datetime64("1970-01-01", "us")
+        else:
+            data = raw.astype(dtype)
+
+        if mask.any():
+            return numpy.ma.masked_array(data, mask=mask)
+        return data
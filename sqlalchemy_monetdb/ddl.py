@@ -0,0 +1,47 @@
+"""
+Merge tables for MonetDB
+
+https://www.monetdb.org/Documentation/SQLReference/DataDefinition/TableDefinitions/DataPartitioning
+
+A merge table, created with ``monetdb_kind="merge"``, holds no rows of its
+own but those of the tables added to it::
+
+    CREATE MERGE TABLE facts (id INTEGER, amount DECIMAL(12, 2))
+    ALTER TABLE facts ADD TABLE facts_2014
+
+``add_partitions(facts, facts_2014, facts_2015)`` makes ``create_all()``
+create the partitions before the merge table and add them to it right
+after, and ``drop_all()`` drop the merge table first.
+
+"""
+from sqlalchemy import event
+from sqlalchemy.schema import DDLElement
+
+
+class AddPartition(DDLElement):
+    """``ALTER TABLE merge_table ADD TABLE partition``"""
+
+    __visit_name__ = "add_partition"
+
+    def __init__(self, element, partition):
+        self.element = element
+        self.partition = partition
+
+
+class DropPartition(DDLElement):
+    """``ALTER TABLE merge_table DROP TABLE partition``"""
+
+    __visit_name__ = "drop_partition"
+
+    def __init__(self, element, partition):
+        self.element = element
+        self.partition = partition
+
+
+def add_partitions(merge_table, *tables):
+    """Add `tables` to `merge_table` whenever it is created."""
+
+    for table in tables:
+        merge_table.add_is_dependent_on(table)
+        event.listen(merge_table, "after_create", AddPartition(
+            merge_table, table).execute_if(dialect="monetdb"))
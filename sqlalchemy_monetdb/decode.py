@@ -0,0 +1,166 @@
+"""
+Row decoding for MonetDB
+
+A select executed with ``fast_decode`` is sent over MAPI directly, like
+columnar ones, instead of through a DBAPI cursor. When the result arrives a
+table of converters is built from the MonetDB types of its columns, and
+the rows of every block are decoded in a single loop over that table rather
+than value by value through the DBAPI's generic conversion.
+
+The rows are the same as those of the DBAPI: dates, times and timestamps
+are read with ``fromisoformat()`` instead of ``strptime()``, DECIMAL values
+go to ``Decimal`` directly from their text, booleans are looked up and
+integers, floats and strings need no more than a call of their type or a
+slice.
+
+"""
+import collections
+import datetime
+import decimal
+
+from sqlalchemy_monetdb import bulk, columnar
+
+
+BOOLEANS = {"true": True, "false": False}
+
+
+def parse_string(value):
+    if "\\" in value:
+        from monetdb.sql import pythonize
+        return pythonize.strip(value)
+    return value[1:-1]
+
+
+def _isoformat_parser(cls, fallback):
+    """Return a parser of ISO values of `cls`, by fromisoformat() where
+    the Python version has it and it takes the value."""
+
+    fromisoformat = getattr(cls, "fromisoformat", None)
+    if fromisoformat is None:
+        return fallback
+
+    def parse(value):
+        try:
+            return fromisoformat(value)
+        except ValueError:
+            # fractions of other than 3 or 6 digits before Python 3.11
+            return fallback(value)
+    return parse
+
+
+parse_date = _isoformat_parser(datetime.date, bulk.parse_date)
+parse_time = _isoformat_parser(datetime.time, bulk.parse_time)
+parse_datetime = _isoformat_parser(datetime.datetime, bulk.parse_datetime)
+
+
+# converters of the values of the MonetDB types; values of other types are
+# converted by the DBAPI
+CONVERTERS = {
+    "tinyint": int,
+    "smallint": int,
+    "int": int,
+    "bigint": int,
+    "hugeint": int,
+    "wrd": int,
+    "oid": int,
+    "serial": int,
+    "real": float,
+    "double": float,
+    "float": float,
+    "decimal": decimal.Decimal,
+    "boolean": BOOLEANS.__getitem__,
+    "date": parse_date,
+    "time": parse_time,
+    "timestamp": parse_datetime,
+    "char": parse_string,
+    "varchar": parse_string,
+    "clob": parse_string,
+    "url": parse_string,
+    "blob": str,
+    "inet": str,
+}
+
+
+def converters(description):
+    """Return the converter of every column of a result."""
+
+    result = []
+    for column in description:
+        type_code = column[1]
+        converter = CONVERTERS.get(type_code)
+        if converter is None:
+            from monetdb.sql import pythonize
+
+            def converter(value, type_code=type_code):
+                return pythonize.convert(value, type_code)
+        result.append(converter)
+    return result
+
+
+def decode_rows(lines, converters):
+    """Decode the tuple lines of a result into row tuples."""
+
+    width = len(converters)
+    rows = []
+    for line in lines:
+        values = bulk.split_tuple(line, width)
+        if len(values) != width:
+            raise ValueError("length of row doesn't match header")
+        rows.append(tuple([None if value == "NULL" else convert(value)
+                           for convert, value in zip(converters, values)]))
+    return rows
+
+
+def execute(connection, statement, parameters):
+    """Execute `statement` on the DBAPI `connection`, interpolating the
+    parameters the way the DBAPI cursor does, and return its result."""
+
+    from monetdb.sql import monetize
+
+    if parameters:
+        statement = statement % dict(
+            (k, monetize.convert(v)) for k, v in parameters.items())
+    return RowResult(connection, connection.execute(statement))
+
+
+class RowResult(columnar.ColumnarResult):
+    """The result of a select executed over MAPI, fetched as rows through
+    the methods of a DBAPI cursor."""
+
+    arraysize = 1
+
+    def __init__(self, connection, block):
+        self.rows = collections.deque()
+        columnar.ColumnarResult.__init__(self, connection, block, None)
+        if self.description is not None:
+            self.converters = converters(self.description)
+
+    def _fill(self, size=None):
+        """Decode blocks until `size` rows, or all of them, are ready."""
+
+        while size is None or len(self.rows) < size:
+            if not self.blocks and not self._fetch_block():
+                break
+            try:
+                self.rows.extend(decode_rows(self.blocks.pop(0),
+                                             self.converters))
+            except ValueError as e:
+                raise self.connection.InterfaceError(str(e))
+
+    def fetchone(self):
+        self._fill(1)
+        if self.rows:
+            return self.rows.popleft()
+        return None
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        self._fill(size)
+        return [self.rows.popleft() for i in range(min(size, len(self.rows)))]
+
+    def fetchall(self):
+        self._fill()
+        rows = list(self.rows)
+        self.rows.clear()
+        return rows
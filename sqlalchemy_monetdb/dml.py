@@ -0,0 +1,104 @@
+"""
+MERGE statements for MonetDB
+
+https://www.monetdb.org/Documentation/SQLReference/DataManipulation/MergeStatements
+
+``merge(table)`` updates the rows of `table` matching a source and inserts
+the others in a single statement::
+
+    MERGE INTO t USING (SELECT ...) AS merge_source ON t.id = merge_source.id
+    WHEN MATCHED THEN UPDATE SET "name" = merge_source."name"
+    WHEN NOT MATCHED THEN INSERT (id, "name")
+        VALUES (merge_source.id, merge_source."name")
+
+The source is a table or ``select()``, or else the parameters the
+statement is executed with, one row per parameter set.
+
+"""
+from sqlalchemy import exc
+from sqlalchemy.sql import expression as sql
+
+
+SOURCE_NAME = "merge_source"
+
+
+class Merge(sql.UpdateBase):
+    """A ``MERGE INTO`` statement, built with :func:`merge`."""
+
+    __visit_name__ = "merge"
+
+    _bind = None
+
+    def __init__(self, table, source=None, on=None):
+        self.table = table
+        if source is None:
+            # rows of the parameters, named like the columns of the table;
+            # the columns rendered are those of the executed parameters
+            self.parameter_source = True
+            source = table.alias(SOURCE_NAME)
+        else:
+            self.parameter_source = False
+            if isinstance(source, sql.Select):
+                source = source.alias(SOURCE_NAME)
+        self.source = source
+        if on is None:
+            if not table.primary_key:
+                raise exc.ArgumentError(
+                    "merge() needs an ON clause for table %s, which has no "
+                    "primary key" % table.name)
+            on = sql.and_(*[c == source.c[c.key]
+                            for c in table.primary_key])
+        self.on = on
+        # (action, values) of the WHEN MATCHED and WHEN NOT MATCHED
+        # clauses; None until one is given, which makes an upsert
+        self.when = None
+
+    def _when(self, clause, action, values):
+        merge = self._clone()
+        merge.when = dict(self.when or {})
+        merge.when[clause] = (action, values)
+        return merge
+
+    def when_matched_update(self, values=None):
+        """Update the matched rows, setting `values`, a dictionary of
+        column or column key to value or SQL expression, or by default the
+        columns of the source not part of the ON clause."""
+
+        return self._when("matched", "update", values)
+
+    def when_matched_delete(self):
+        """Delete the matched rows."""
+
+        return self._when("matched", "delete", None)
+
+    def when_not_matched_insert(self, values=None):
+        """Insert the source rows without a match, with `values`, a
+        dictionary of column or column key to value or SQL expression, or
+        by default the columns of the source."""
+
+        return self._when("not_matched", "insert", values)
+
+
+def merge(table, source=None, on=None):
+    """Return a :class:`Merge` of `source` into `table`.
+
+    `source` is a table, alias or ``select()``, which is aliased as
+    ``merge_source``. Without a source, the statement merges the parameters
+    it is executed with; an ``executemany()`` merges them in batches of at
+    most ``insert_batch_size`` rows. Its columns can be referred to as
+    ``Merge.source.c``.
+
+    `on` defaults to equality of the primary key columns of `table` and the
+    columns of the same keys of the source. Unless ``when_*`` methods are
+    called, matched rows are updated and the others inserted::
+
+        stmt = merge(users)
+        conn.execute(stmt, [{"id": 1, "name": "x"}, {"id": 2, "name": "y"}])
+
+        stmt = merge(totals, select([staging.c.id, staging.c.amount]))
+        stmt = stmt.when_matched_update(
+            {totals.c.amount: totals.c.amount + stmt.source.c.amount})
+        stmt = stmt.when_not_matched_insert()
+    """
+
+    return Merge(table, source, on)
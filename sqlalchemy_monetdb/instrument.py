@@ -0,0 +1,210 @@
+"""
+Per-statement timing and query plan capture
+
+A dialect constructed with an `Instrumentation` makes one `StatementRecord`
+per executed statement: the time spent compiling it, executing it on the
+server and fetching and decoding its rows, and the number of rows. The
+record is passed to every sink when the result is closed, which happens when
+its rows are exhausted. Statements slower than a threshold can have their
+MAL plan fetched with EXPLAIN or TRACE and attached to their record.
+
+"""
+import collections
+import logging
+import random
+from timeit import default_timer
+
+
+class StatementRecord(object):
+    """Timings, in seconds, and row count of an executed statement.
+
+    `compile_time` is None for statements that weren't compiled by the
+    dialect, such as textual SQL. `plan` holds the lines of the plan of a
+    sampled statement.
+    """
+
+    def __init__(self, statement, parameters, compile_time=None,
+                 execute_time=None, fetch_time=0.0, rowcount=None, plan=None):
+        self.statement = statement
+        self.parameters = parameters
+        self.compile_time = compile_time
+        self.execute_time = execute_time
+        self.fetch_time = fetch_time
+        self.rowcount = rowcount
+        self.plan = plan
+
+    @property
+    def duration(self):
+        return sum(t for t in (self.compile_time, self.execute_time,
+                               self.fetch_time) if t is not None)
+
+    def __repr__(self):
+        return "<StatementRecord %.6fs %r rows %r>" % (
+            self.duration, self.rowcount, self.statement)
+
+
+class LogSink(object):
+    """Log every record with `logger` at `level`."""
+
+    def __init__(self, logger="sqlalchemy_monetdb.instrument",
+                 level=logging.INFO):
+        if not isinstance(logger, logging.Logger):
+            logger = logging.getLogger(logger)
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, record):
+        self.logger.log(
+            self.level, "compile %.3fms execute %.3fms fetch %.3fms "
+            "rows %s: %s", (record.compile_time or 0) * 1000,
+            (record.execute_time or 0) * 1000, record.fetch_time * 1000,
+            record.rowcount, record.statement)
+        if record.plan is not None:
+            self.logger.log(self.level, "plan:\n%s", "\n".join(record.plan))
+
+
+class CallbackSink(object):
+    """Pass every record to `callback`."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, record):
+        self.callback(record)
+
+
+class RingBufferSink(object):
+    """Keep the last `size` records in memory."""
+
+    def __init__(self, size=1000):
+        self.records = collections.deque(maxlen=size)
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def __iter__(self):
+        return iter(list(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def clear(self):
+        self.records.clear()
+
+
+class Instrumentation(object):
+    """Pass the record of every statement to `sinks`.
+
+    With `slow_threshold` set, a `sample_rate` fraction of the statements
+    returning rows which took longer than `slow_threshold` seconds have
+    their plan fetched with `plan_statement`, "EXPLAIN" or "TRACE", on the
+    same connection. TRACE executes the statement once more.
+    """
+
+    def __init__(self, sinks=(), slow_threshold=None, plan_statement="EXPLAIN",
+                 sample_rate=1.0):
+        if plan_statement not in ("EXPLAIN", "TRACE"):
+            raise ValueError("plan_statement must be 'EXPLAIN' or 'TRACE', "
+                             "got %r" % plan_statement)
+        self.sinks = list(sinks)
+        self.slow_threshold = slow_threshold
+        self.plan_statement = plan_statement
+        self.sample_rate = sample_rate
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def emit(self, result):
+        """Make the record of `result`, a `InstrumentedResult` about to be
+        closed, and pass it to the sinks."""
+
+        context = result.context
+        if context.executemany:
+            parameters = context.parameters
+        else:
+            parameters = context.parameters[0] if context.parameters else {}
+        record = StatementRecord(
+            context.statement, parameters,
+            getattr(context.compiled, "compile_time", None),
+            context.execute_time, result.fetch_time,
+            result.rows_fetched if result.returns_rows else result.rowcount)
+        if self.slow_threshold is not None and result.returns_rows and \
+                not context.executemany and \
+                record.duration >= self.slow_threshold and \
+                random.random() < self.sample_rate:
+            record.plan = self._plan(context, parameters)
+        for sink in self.sinks:
+            sink(record)
+
+    def _plan(self, context, parameters):
+        cursor = context._dbapi_connection.cursor()
+        try:
+            cursor.execute("%s %s" % (self.plan_statement, context.statement),
+                           parameters)
+            return [row[0] for row in cursor.fetchall()]
+        except context.dialect.dbapi.Error as e:
+            logging.getLogger(__name__).warning(
+                "could not fetch the plan of %r: %s", context.statement, e)
+            return None
+        finally:
+            cursor.close()
+
+
+class InstrumentedResult(object):
+    """Mixed into the result proxy classes of an instrumented dialect to time
+    the fetching and decoding of rows."""
+
+    fetch_time = 0.0
+    rows_fetched = 0
+
+    def _fetchone_impl(self):
+        start = default_timer()
+        try:
+            return super(InstrumentedResult, self)._fetchone_impl()
+        finally:
+            self.fetch_time += default_timer() - start
+
+    def _fetchmany_impl(self, size=None):
+        start = default_timer()
+        try:
+            return super(InstrumentedResult, self)._fetchmany_impl(size)
+        finally:
+            self.fetch_time += default_timer() - start
+
+    def _fetchall_impl(self):
+        start = default_timer()
+        try:
+            return super(InstrumentedResult, self)._fetchall_impl()
+        finally:
+            self.fetch_time += default_timer() - start
+
+    def process_rows(self, rows):
+        start = default_timer()
+        try:
+            rows = super(InstrumentedResult, self).process_rows(rows)
+            self.rows_fetched += len(rows)
+            return rows
+        finally:
+            self.fetch_time += default_timer() - start
+
+    def close(self, _autoclose_connection=True):
+        if not self.closed:
+            # before the connection may go back to the pool
+            self.context.dialect.instrumentation.emit(self)
+        super(InstrumentedResult, self).close(_autoclose_connection)
+
+
+_instrumented_classes = {}
+
+
+def instrumented(result_class):
+    """Return a subclass of `result_class` with `InstrumentedResult`
+    mixed in."""
+
+    try:
+        return _instrumented_classes[result_class]
+    except KeyError:
+        cls = _instrumented_classes[result_class] = type(
+            "Instrumented" + result_class.__name__,
+            (InstrumentedResult, result_class), {})
+        return cls
@@ -0,0 +1,125 @@
+"""
+Rendering MonetDB SQL without a server
+
+The ``monetdb+offline://`` dialect compiles DDL and DML like ``monetdb://``
+but never imports the DBAPI; engines created with it render statements for
+scripts rather than executing them. A :class:`Script` collects them with
+their parameters rendered as literals::
+
+    script = offline.Script()
+    metadata.create_all(script.engine)
+    script.execute(t.insert(), [{"id": 1, "name": "a"}, {"id": 2}])
+    script.execute(t.delete().where(t.c.day < datetime.date(2014, 1, 1)))
+    open("job.sql", "w").write(script.sql)
+
+Statements are compiled through the compiled statement cache of the
+dialect, with their parameters bound, and the literals are rendered into
+the compiled SQL. A statement built once with ``bindparam()`` values, or
+built again from the same parts, is compiled only once however many scripts
+render it, and parameter sets executed together are rendered from a single
+compiled statement.
+
+The dialect also takes the mock strategy of ``create_engine()``::
+
+    engine = create_engine("monetdb+offline://", strategy="mock",
+                           executor=script)
+
+"""
+from sqlalchemy import exc, util
+from sqlalchemy.engine import strategies
+from sqlalchemy.engine.util import _distill_params
+from sqlalchemy.schema import DDLElement
+
+from sqlalchemy_monetdb.base import MDBDialect
+
+
+class Error(Exception):
+    pass
+
+
+class OfflineDBAPI(object):
+    """Stands in for the DBAPI module of offline dialects, which have no
+    connections."""
+
+    paramstyle = "pyformat"
+    Error = Error
+
+    def connect(self, *args, **kwargs):
+        raise Error("monetdb+offline:// engines have no connection; "
+                    "create them with strategy='mock' or use a Script")
+
+
+class MDBOfflineDialect(MDBDialect):
+    driver = "offline"
+
+    @classmethod
+    def dbapi(cls):
+        return OfflineDBAPI()
+
+
+def render(dialect, statement, multiparams=()):
+    """Return the SQL of `statement` with every parameter set of
+    `multiparams` rendered as literals, one string per parameter set."""
+
+    if isinstance(statement, DDLElement):
+        return [statement.compile(dialect=dialect).string]
+    multiparams = list(multiparams) or [{}]
+    # the columns of an INSERT or UPDATE are those of the first parameter
+    # set, as for executemany() on an engine
+    compiled = statement.compile(dialect=dialect,
+                                 column_keys=list(multiparams[0]) or None)
+    result = []
+    for params in multiparams:
+        try:
+            literals = dict(
+                (name, compiled.render_literal_value(
+                    value, compiled.binds[name].type))
+                for name, value in compiled.construct_params(params).items())
+        except NotImplementedError as e:
+            raise exc.CompileError(str(e))
+        result.append(compiled.string % literals)
+    return result
+
+
+class Script(object):
+    """SQL statements rendered by the offline dialect, in the order they
+    were executed.
+
+    Pass the dialect to share its compiled statement cache between scripts;
+    the keyword arguments of a new dialect are those of :class:`.MDBDialect`.
+    The :attr:`engine` takes ``create_all()`` and ``drop_all()``, which
+    don't check for existing tables, and ``execute()``.
+    """
+
+    def __init__(self, dialect=None, **kwargs):
+        if dialect is None:
+            dialect = MDBOfflineDialect(**kwargs)
+        self.dialect = dialect
+        self.statements = []
+        self.engine = strategies.MockEngineStrategy.MockConnection(
+            dialect, self)
+
+    def __call__(self, statement, *multiparams, **params):
+        """Executor of mock engines, see :meth:`execute`."""
+
+        self.execute(statement, *multiparams, **params)
+
+    def execute(self, statement, *multiparams, **params):
+        """Render `statement`, a construct or a string of SQL, once for
+        every parameter set."""
+
+        if isinstance(statement, util.string_types):
+            if multiparams or params:
+                raise exc.ArgumentError(
+                    "Parameters of textual SQL can't be rendered; use "
+                    "text() with bound parameters")
+            self.statements.append(statement)
+            return
+        self.statements.extend(render(
+            self.dialect, statement, _distill_params(multiparams, params)))
+
+    @property
+    def sql(self):
+        """The statements as a script, each ended by a semicolon."""
+
+        return "".join(statement + ";\n" for statement in self.statements)
@@ -0,0 +1,184 @@
+"""
+Partitioned parallel queries for MonetDB
+
+``execute(engine, query, column, count)`` splits a ``select()`` into `count`
+queries on ranges of `column`, runs them at the same time on connections of
+the engine's pool and yields the rows of all of them as they arrive::
+
+    for row in parallel.execute(engine, select([facts]), facts.c.id, 8):
+        process(row)
+
+The ranges are split evenly between the smallest and largest value of the
+column, taken from ``sys.statistics`` when ``ANALYZE`` has filled it and
+from ``min()`` and ``max()`` of the table otherwise. The first and last
+ranges are open ended and the first one holds the NULLs, so every row is
+returned once even if the statistics are out of date.
+
+"""
+import decimal
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from sqlalchemy import exc
+from sqlalchemy import types as sqltypes
+from sqlalchemy.sql import expression as sql
+
+
+# types of the columns queries can be partitioned on
+PARTITION_TYPES = (sqltypes.Integer, sqltypes.Numeric, sqltypes.Date,
+                   sqltypes.DateTime)
+
+# rows fetched from the server at a time by every partition
+BATCH_SIZE = 1000
+
+# batches read ahead of the consumer by every partition
+READ_AHEAD = 4
+
+
+def column_bounds(connection, column):
+    """Return the smallest and largest value of the table `column`, from
+    the statistics of the catalog if there are any."""
+
+    table = column.table
+    for stats in connection.dialect.get_column_statistics(
+            connection, table.name, table.schema):
+        if stats["name"] == column.name and \
+                None not in (stats["min"], stats["max"]):
+            return stats["min"], stats["max"]
+    return tuple(connection.execute(sql.select(
+        [sql.func.min(column), sql.func.max(column)])).first())
+
+
+def split_range(low, high, count):
+    """Return the at most `count` - 1 values splitting [low, high] into
+    ranges of equal size."""
+
+    if isinstance(low, (float, decimal.Decimal)):
+        bounds = [low + (high - low) * i / count for i in range(1, count)]
+    else:
+        # integers, and dates and timestamps by whole timedelta units
+        bounds = [low + (high - low) * i // count for i in range(1, count)]
+    return sorted(set(b for b in bounds if low < b <= high))
+
+
+def partitions(query, column, bounds):
+    """Return the queries selecting the rows of `query` of every range of
+    `column` between `bounds`."""
+
+    if not bounds:
+        return [query]
+    result = [query.where(sql.or_(column < bounds[0], column.is_(None)))]
+    for low, high in zip(bounds, bounds[1:]):
+        result.append(query.where(sql.and_(column >= low, column < high)))
+    result.append(query.where(column >= bounds[-1]))
+    return result
+
+
+class _Partition(threading.Thread):
+    """Runs a partition query on a connection of its own, putting the
+    fetched rows in `batches` a list at a time, then None."""
+
+    daemon = True
+
+    def __init__(self, engine, query, batches, stopped):
+        threading.Thread.__init__(self)
+        self.engine = engine
+        self.query = query
+        self.batches = batches
+        self.stopped = stopped
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def run(self):
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execution_options(
+                    stream_results=True, reply_size=BATCH_SIZE).execute(
+                    self.query)
+                try:
+                    for rows in result.batches():
+                        if self.stopped.is_set():
+                            break
+                        self._put(rows)
+                finally:
+                    result.close()
+        except Exception as e:
+            self._put(e)
+        self._put(None)
+
+
+def _rows(batches, count):
+    """Yield the rows put in `batches` until `count` partitions are done."""
+
+    while count:
+        item = batches.get()
+        if item is None:
+            count -= 1
+        elif isinstance(item, Exception):
+            raise item
+        else:
+            for row in item:
+                yield row
+
+
+def execute(engine, query, column, count=4, ordered=False):
+    """Execute `query` as `count` queries on ranges of `column`, each on its
+    own pooled connection of `engine`, and return an iterator of their rows.
+
+
+    Rows are yielded in the order they arrive, or with `ordered` sorted by
+    `column` and then by the ORDER BY of `query`. The pool must be able to
+    hand out `count` connections at once.
+    """
+
+    if not isinstance(column.type, PARTITION_TYPES):
+        raise exc.ArgumentError(
+            "Can't partition on column %s of type %s" % (column, column.type))
+    if count < 1:
+        raise exc.ArgumentError("count must be at least 1")
+    with engine.connect() as conn:
+        low, high = column_bounds(conn, column)
+    bounds = []
+    if low is not None and high is not None:
+        bounds = split_range(low, high, count)
+    if ordered:
+        query = query.order_by(None).order_by(
+            column, *query._order_by_clause.clauses)
+    return _merged(engine, partitions(query, column, bounds), ordered)
+
+
+def _merged(engine, queries, ordered):
+    """Run `queries` in threads of their own and yield their rows."""
+
+    stopped = threading.Event()
+    if ordered:
+        workers = [_Partition(engine, q, queue.Queue(READ_AHEAD), stopped)
+                   for q in queries]
+    else:
+        batches = queue.Queue(READ_AHEAD * len(queries))
+        workers = [_Partition(engine, q, batches, stopped) for q in queries]
+    for worker in workers:
+        worker.start()
+    try:
+        if ordered:
+            # the ranges follow each other, and each is sorted by column
+            for worker in workers:
+                for row in _rows(worker.batches, 1):
+                    yield row
+        else:
+            for row in _rows(batches, len(workers)):
+                yield row
+    finally:
+        stopped.set()
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,84 @@
+"""
+Pipelined statements for MonetDB
+
+With ``pipeline_size`` set, INSERT, UPDATE, DELETE and MERGE statements
+that need nothing back from the server are queued on their connection
+instead of each waiting for its own reply. The queue is sent as a single
+MAPI message, which the server answers with one reply per statement::
+
+    sINSERT INTO t (id) VALUES (1);
+    UPDATE t SET "name" = 'x' WHERE t.id = 2;
+    DELETE FROM t WHERE t.id = 3;
+
+The queue is sent when it holds ``pipeline_size`` statements, before any
+other statement is executed on the connection and when the transaction is
+committed; a rollback discards it. The server stops at the first statement
+that fails, whose error is raised for that statement by whichever execute
+or commit sent the queue.
+
+"""
+from sqlalchemy import exc
+
+
+class Pipeline(object):
+    """Statements returning no rows queued on the DBAPI `connection`."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        # (statement, parameters, query) in the order of execution
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def add(self, statement, parameters):
+        """Queue `statement`, interpolating the parameters the way the DBAPI
+        cursor does."""
+
+        query = statement
+        if parameters:
+            from monetdb.sql import monetize
+            query = statement % dict(
+                (k, monetize.convert(v)) for k, v in parameters.items())
+        self.statements.append((statement, parameters, query))
+
+    def discard(self):
+        del self.statements[:]
+
+    def flush(self):
+        """Send the queued statements in one message.
+
+        Raises the ``DBAPIError`` of the statement that failed, the
+        statements before it being executed and those after it not.
+        """
+
+        if not self.statements:
+            return
+        statements, self.statements = self.statements, []
+        try:
+            # the DBAPI ends the message with the last semicolon
+            reply = self.connection.execute(
+                ";\n".join(query for statement, parameters, query
+                           in statements))
+        except self.connection.Error as e:
+            # the first statement failed
+            self._raise(statements, 0, e)
+        # one reply per statement executed, up to the error if any
+        done = 0
+        errors = []
+        for line in reply.splitlines():
+            if line.startswith("!"):
+                errors.append(line[1:])
+            elif line.startswith("&") and not errors:
+                done += 1
+        if errors:
+            self._raise(statements, done, self.connection.OperationalError(
+                "\n".join(errors)))
+
+    def _raise(self, statements, index, error):
+        index = min(index, len(statements) - 1)
+        statement, parameters, query = statements[index]
+        error = type(error)("%s (statement %d of %d sent in one message)" % (
+            str(error).strip(), index + 1, len(statements)))
+        raise exc.DBAPIError.instance(statement, parameters, error,
+                                      self.connection.Error)
@@ -0,0 +1,136 @@
+"""
+Analytic queries for MonetDB
+
+https://www.monetdb.org/Documentation/SQLReference/DataManipulation/TableExpressions
+
+Aggregation over several groupings and sampling are done by the server
+rather than on rows fetched into Python::
+
+    select([t.c.region, t.c.year, func.sum(t.c.amount)]).group_by(
+        rollup(t.c.region, t.c.year))
+    GROUP BY ROLLUP(t.region, t.year)
+
+    select([t]).group_by(grouping_sets((t.c.region, t.c.year), t.c.year, ()))
+    GROUP BY GROUPING SETS((t.region, t.year), t.year, ())
+
+    query.select([t]).sample(1000)
+    SELECT ... FROM t SAMPLE 1000
+
+``over()`` adds the ROWS and RANGE frames of MonetDB's window functions to
+those of ``FunctionElement.over()``::
+
+    over(func.sum(t.c.amount), order_by=t.c.day, rows=(-6, 0))
+    sum(t.amount) OVER (ORDER BY t.day
+                        ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)
+
+"""
+from sqlalchemy import exc, util
+from sqlalchemy.sql import expression as sql
+from sqlalchemy.sql import functions
+
+
+class Select(sql.Select):
+    """A ``select()`` that can take a SAMPLE clause."""
+
+    _sample = None
+    _seed = None
+
+    def sample(self, size, seed=None):
+        """Return a copy of this select returning a uniform random sample
+        of its rows, `size` rows if it is an integer or that fraction of the
+        rows if it is a number between 0 and 1. A `seed` makes the sample
+        repeatable."""
+
+        if isinstance(size, util.int_types):
+            valid = size > 0
+        else:
+            valid = 0 < size < 1
+        if not valid:
+            raise exc.ArgumentError(
+                "sample() takes a row count or a fraction between 0 and 1, "
+                "got %r" % (size,))
+        select = self._generate()
+        select._sample = size
+        select._seed = seed
+        return select
+
+
+def select(columns=None, whereclause=None, from_obj=None, **kwargs):
+    """Return a :class:`Select`, taking the arguments of ``select()``."""
+
+    return Select(columns, whereclause, from_obj, **kwargs)
+
+
+class Over(sql.Over):
+    """An OVER clause with a frame, built with :func:`over`."""
+
+    # (unit, start, end) of the frame, see over()
+    frame = None
+
+    def __init__(self, func, partition_by=None, order_by=None, rows=None,
+                 range_=None):
+        sql.Over.__init__(self, func, partition_by, order_by)
+        if rows is not None and range_ is not None:
+            raise exc.ArgumentError("over() takes rows or range_, not both")
+        for unit, bounds in (("ROWS", rows), ("RANGE", range_)):
+            if bounds is not None:
+                start, end = bounds
+                if start is not None and end is not None and start > end:
+                    raise exc.ArgumentError(
+                        "The frame %r of over() ends before it starts" %
+                        (bounds,))
+                self.frame = (unit, start, end)
+
+
+def over(func, partition_by=None, order_by=None, rows=None, range_=None):
+    """Return the window function `func` over the partitions and ordering
+    of ``FunctionElement.over()`` and a frame of `rows` or `range_`.
+
+    A frame is a (start, end) pair relative to the current row: None is
+    unbounded, 0 the current row, negative values preceding and positive
+    values following it. ``rows=(None, 0)`` is every row up to the
+    current one.
+    """
+
+    return Over(func, partition_by, order_by, rows, range_)
+
+
+class GroupingElement(functions.FunctionElement):
+    """An element of GROUP BY made of groupings; a grouping is a column,
+    an expression or a tuple of them."""
+
+    def __init__(self, *groupings):
+        functions.FunctionElement.__init__(self, *[
+            sql.ClauseList(*grouping)
+            if isinstance(grouping, (tuple, list)) else grouping
+            for grouping in groupings])
+
+
+class Rollup(GroupingElement):
+    """``ROLLUP(a, b)``: the groups of (a, b), (a) and ()"""
+
+    __visit_name__ = name = "rollup"
+
+
+class Cube(GroupingElement):
+    """``CUBE(a, b)``: the groups of (a, b), (a), (b) and ()"""
+
+    __visit_name__ = name = "cube"
+
+
+class GroupingSets(GroupingElement):
+    """``GROUPING SETS(a, (b, c))``: the groups of (a) and (b, c)"""
+
+    __visit_name__ = name = "grouping_sets"
+
+
+def rollup(*groupings):
+    return Rollup(*groupings)
+
+
+def cube(*groupings):
+    return Cube(*groupings)
+
+
+def grouping_sets(*groupings):
+    return GroupingSets(*groupings)
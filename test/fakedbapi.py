@@ -0,0 +1,175 @@
+"""
+A stand-in for the DBAPI module of python-monetdb, so that engines of the
+dialect are tested without a server.
+
+Cursors record the statements they execute on their DBAPI and answer them
+with the Reply that ``FakeDBAPI.respond()`` returns: that of the first of
+the `responses` whose text occurs in the statement, or the `default`
+reply. Tests needing more subclass FakeDBAPI, Connection or Cursor.
+"""
+import sqlalchemy
+
+
+class Error(Exception):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class OperationalError(Error):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+class Reply(object):
+    """The answer to a statement: the rows of the columns `names`, or no
+    rows if `names` is None, and the `rowcount`, by default the number of
+    rows."""
+
+    def __init__(self, names=None, rows=(), types=None, rowcount=None,
+                 lastrowid=None):
+        self.names = names
+        self.rows = list(rows)
+        self.types = types or [None] * len(names or ())
+        if rowcount is None:
+            rowcount = len(self.rows) if names is not None else -1
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+    @property
+    def description(self):
+        if self.names is None:
+            return None
+        return [(name, type_code, None, None, None, None, None)
+                for name, type_code in zip(self.names, self.types)]
+
+
+class Cursor(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.arraysize = 100
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self.rows = []
+
+    def execute(self, statement, parameters=None):
+        dbapi = self.connection.dbapi
+        dbapi.executed.append((statement, parameters))
+        reply = dbapi.respond(statement, parameters)
+        self.description = reply.description
+        self.rowcount = reply.rowcount
+        self.lastrowid = reply.lastrowid
+        self.rows = list(reply.rows)
+
+    def executemany(self, statement, seq_of_parameters):
+        rowcount = 0
+        for parameters in seq_of_parameters:
+            self.execute(statement, parameters)
+            rowcount += self.rowcount
+        self.rowcount = rowcount
+
+    def fetchone(self):
+        if self.rows:
+            return self.rows.pop(0)
+        return None
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class Connection(object):
+    Error = Error
+    InterfaceError = InterfaceError
+    OperationalError = OperationalError
+    ProgrammingError = ProgrammingError
+
+    cursor_class = Cursor
+
+    def __init__(self, dbapi):
+        self.dbapi = dbapi
+        self.replysize = 100
+        # the reply sizes set, in order
+        self.replysizes = []
+
+    def set_replysize(self, replysize):
+        self.replysizes.append(replysize)
+        self.replysize = replysize
+
+    def cursor(self):
+        return self.cursor_class(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDBAPI(object):
+    """Stands in for the DBAPI module, answering statements with the Reply
+    of the first (text, reply) of `responses` whose text occurs in them, or
+    the `default` one. A reply may also be a function of the statement and
+    its parameters, or an exception to raise."""
+
+    paramstyle = "pyformat"
+    Error = Error
+    InterfaceError = InterfaceError
+    OperationalError = OperationalError
+    ProgrammingError = ProgrammingError
+
+    connection_class = Connection
+
+    def __init__(self, responses=(), default=None):
+        self.responses = list(responses)
+        self.default = default or Reply()
+        # (statement, parameters) executed by cursors
+        self.executed = []
+        self.connections = []
+
+    @property
+    def statements(self):
+        return [statement for statement, parameters in self.executed]
+
+    def connect(self, *args, **kwargs):
+        connection = self.connection_class(self)
+        self.connections.append(connection)
+        return connection
+
+    def respond(self, statement, parameters):
+        reply = self.default
+        for text, response in self.responses:
+            if text in statement:
+                reply = response
+                break
+        if callable(reply):
+            reply = reply(statement, parameters)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def create_engine(dbapi, **kwargs):
+    """Return an engine of the dialect over `dbapi`, which skips the ping
+    of pooled connections and the queries of its first connection."""
+
+    return sqlalchemy.create_engine("monetdb://", module=dbapi,
+                                    monetdb_pre_ping=False, _initialize=False,
+                                    **kwargs)
@@ -0,0 +1,139 @@
+import binascii
+import io
+import struct
+
+from sqlalchemy import MetaData, Table, Column, Integer, LargeBinary, exc
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import blob
+from sqlalchemy_monetdb.base import BLOB, MDBDialect
+
+import fakedbapi
+
+
+class Socket(object):
+    def __init__(self):
+        self.data = bytearray()
+
+    def sendall(self, data):
+        self.data += data
+
+    def messages(self):
+        """Return the messages sent, checking the size of the blocks."""
+
+        messages, message, position = [], b"", 0
+        while position < len(self.data):
+            header = struct.unpack("<H", bytes(self.data[position:
+                                                         position + 2]))[0]
+            assert header >> 1 <= blob.BLOCK_SIZE
+            position += 2
+            message += bytes(self.data[position:position + (header >> 1)])
+            position += header >> 1
+            if header & 1:
+                messages.append(message.decode("utf-8"))
+                message = b""
+        del self.data[:]
+        return messages
+
+
+class Mapi(object):
+    def __init__(self, dbapi):
+        self.dbapi = dbapi
+        self.socket = dbapi.socket
+
+    def _getblock(self):
+        return self.dbapi.reply
+
+
+class Connection(fakedbapi.Connection):
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.mapi = Mapi(dbapi)
+
+
+class BlobDBAPI(fakedbapi.FakeDBAPI):
+    """Records the statements executed through cursors and the MAPI blocks
+    written to the socket, answering those with `reply`."""
+
+    connection_class = Connection
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(self, default=fakedbapi.Reply(rowcount=1))
+        self.socket = Socket()
+        self.reply = "&2 1 -1\n"
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("payload", BLOB(stream_threshold=100)))
+generic = Table("generic", metadata,
+                Column("payload", LargeBinary))
+
+
+class BlobTest(fixtures.TestBase):
+    def setup(self):
+        self.dbapi = BlobDBAPI()
+        self.engine = fakedbapi.create_engine(self.dbapi)
+
+    def test_inline(self):
+        self.engine.execute(t.insert(), id=1, payload=b"\x00\xffa")
+        eq_(self.dbapi.executed, [
+            ("INSERT INTO t (id, payload) VALUES (%(id)s, %(payload)s)",
+             {"id": 1, "payload": "00ff61"})])
+        eq_(self.dbapi.socket.messages(), [])
+
+    def test_streamed_buffer(self):
+        value = bytearray(range(256)) * 40
+        result = self.engine.execute(t.insert(), id=1,
+                                     payload=memoryview(value))
+        eq_(result.rowcount, 1)
+        eq_(self.dbapi.executed, [])
+        eq_(self.dbapi.socket.messages(), [
+            "sINSERT INTO t (id, payload) VALUES (1, '%s');" %
+            binascii.hexlify(value).decode("ascii")])
+
+    def test_streamed_file(self):
+        self.engine.execute(
+            t.update().values(payload=io.BytesIO(b"\x01\x02")))
+        eq_(self.dbapi.socket.messages(),
+            ["sUPDATE t SET payload='0102';"])
+
+    def test_executemany(self):
+        self.dbapi.reply = "&2 3 -1\n"
+        result = self.engine.execute(t.insert(), [
+            {"id": 1, "payload": b"\x01"},
+            {"id": 2, "payload": io.BytesIO(b"\x02")}])
+        eq_(result.rowcount, 4)
+        eq_(self.dbapi.executed, [
+            ("INSERT INTO t (id, payload) VALUES (%(id)s, %(payload)s)",
+             {"id": 1, "payload": "01"})])
+        eq_(self.dbapi.socket.messages(),
+            ["sINSERT INTO t (id, payload) VALUES (2, '02');"])
+
+    def test_error(self):
+        self.dbapi.reply = "!42000!no such table\n"
+        assert_raises(exc.OperationalError, self.engine.execute,
+                      t.insert(), id=1, payload=io.BytesIO(b"x"))
+
+    def test_result(self):
+        process = BLOB().result_processor(MDBDialect(), "blob")
+        eq_(process("00FF61"), b"\x00\xffa")
+        eq_(process(None), None)
+
+    def test_reader(self):
+        reader = BLOB(stream=True).result_processor(MDBDialect(), "blob")(
+            "00FF6162")
+        eq_(len(reader), 4)
+        eq_(reader.read(1), b"\x00")
+        out = io.BytesIO()
+        eq_(reader.copy_to(out, chunk_size=2), 3)
+        eq_(out.getvalue(), b"\xffab")
+        eq_(reader.read(), b"")
+
+    def test_large_binary(self):
+        dialect = MDBDialect()
+        eq_(type(generic.c.payload.type.dialect_impl(dialect)), BLOB)
+        eq_(str(CreateTable(generic).compile(dialect=dialect)).strip(),
+            "CREATE TABLE generic (\n\tpayload BLOB\n)")
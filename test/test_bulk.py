@@ -0,0 +1,217 @@
+import datetime
+import decimal
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, \
+    Numeric, LargeBinary, Sequence, func, exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import bulk
+from sqlalchemy_monetdb.base import MDBDialect
+
+import fakedbapi
+
+
+class CopyFieldTest(fixtures.TestBase):
+    def test_null(self):
+        eq_(bulk.copy_field(None), "")
+
+    def test_empty_string_is_quoted(self):
+        eq_(bulk.copy_field(""), '""')
+
+    def test_escapes(self):
+        eq_(bulk.copy_field('a|"b"\\\nc'), '"a|\\"b\\"\\\\\\nc"')
+
+    def test_numbers(self):
+        eq_(bulk.copy_field(True), "true")
+        eq_(bulk.copy_field(False), "false")
+        eq_(bulk.copy_field(42), "42")
+        eq_(bulk.copy_field(0.5), "0.5")
+        eq_(bulk.copy_field(decimal.Decimal("10.20")), "10.20")
+
+    def test_dates(self):
+        eq_(bulk.copy_field(datetime.date(2013, 1, 2)), "2013-01-02")
+        eq_(bulk.copy_field(datetime.time(3, 4, 5)), "03:04:05")
+        eq_(bulk.copy_field(datetime.datetime(2013, 1, 2, 3, 4, 5, 6)),
+            "2013-01-02 03:04:05.000006")
+
+    def test_binary(self):
+        eq_(bulk.copy_field(bytearray(b"\x00\xab")), "00AB")
+
+    def test_unsupported(self):
+        assert_raises(exc.ArgumentError, bulk.copy_field, object())
+
+
+def inserted(statement, parameters):
+    # the server counts the records of COPY INTO and the rows of a VALUES
+    # list
+    if statement.startswith("COPY"):
+        return fakedbapi.Reply(rowcount=int(statement.split()[1]))
+    return fakedbapi.Reply(rowcount=statement.count("), (") + 1)
+
+
+class RecordingCursor(object):
+    rowcount = -1
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, operation, parameters=None):
+        self.statements.append(operation)
+        self.parameters = parameters
+
+    def executemany(self, operation, seq_of_parameters):
+        self.statements.extend(operation for p in seq_of_parameters)
+
+
+class CopyIntoTest(fixtures.TestBase):
+    def setup(self):
+        self.dialect = MDBDialect()
+        self.table = Table("t", MetaData(),
+                           Column("id", Integer, Sequence("t_id_seq"),
+                                  primary_key=True),
+                           Column("name", String(20)),
+                           Column("created", DateTime),
+                           Column("amount", Numeric(10, 2)),
+                           Column("data", LargeBinary))
+
+    def test_bulk_values(self):
+        compiled = self.table.insert().compile(
+            dialect=self.dialect, column_keys=["id", "name"])
+        eq_([(c.key, sql) for c, sql in compiled.bulk_values],
+            [("id", None), ("name", None)])
+
+    def test_no_bulk_values_for_sql_expressions(self):
+        compiled = self.table.insert().values(name=func.lower("X")).compile(
+            dialect=self.dialect, column_keys=["id"])
+        eq_(compiled.bulk_values, None)
+
+    def test_no_bulk_values_for_update(self):
+        compiled = self.table.update().compile(dialect=self.dialect)
+        eq_(compiled.bulk_values, None)
+
+    def test_copy_into(self):
+        columns = [self.table.c.id, self.table.c.name]
+        eq_(bulk.copy_into(self.dialect.identifier_preparer, self.table,
+                           columns, [{"id": 1, "name": "a"},
+                                     {"id": 2, "name": None}]),
+            "COPY 2 RECORDS INTO t (id, \"name\") FROM STDIN "
+            "USING DELIMITERS '|', '\\n', '\"' NULL AS '';\n"
+            '1|"a"\n'
+            "2|\n")
+
+    def _executemany(self, dialect, rows):
+        class context(object):
+            compiled = self.table.insert().compile(
+                dialect=dialect, column_keys=["id", "name"])
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, str(context.compiled),
+                               [{"id": i, "name": "x"} for i in range(rows)],
+                               context)
+        return cursor.statements
+
+    def test_executemany_batches(self):
+        dialect = MDBDialect(copy_threshold=10, copy_batch_size=4)
+        statements = self._executemany(dialect, 10)
+        eq_([s.split(" ", 2)[1] for s in statements], ["4", "4", "2"])
+
+    def test_executemany_below_threshold(self):
+        dialect = MDBDialect(copy_threshold=10)
+        statements = self._executemany(dialect, 9)
+        eq_(len(statements), 9)
+        assert statements[0].startswith("INSERT")
+
+    def test_executemany_copy_disabled(self):
+        dialect = MDBDialect(copy_threshold=None)
+        eq_(len(self._executemany(dialect, 2000)), 2000)
+
+    def test_rowcount_of_batches(self):
+        dbapi = fakedbapi.FakeDBAPI(default=inserted)
+        engine = fakedbapi.create_engine(dbapi, copy_threshold=10,
+                                         copy_batch_size=40)
+        result = engine.execute(self.table.insert(),
+                                [{"id": i, "name": "x"} for i in range(100)])
+        eq_([s.split(" ", 2)[1] for s in dbapi.statements],
+            ["40", "40", "20"])
+        eq_(result.rowcount, 100)
+
+
+class ValuesInsertTest(fixtures.TestBase):
+    def setup(self):
+        self.table = Table("t", MetaData(),
+                           Column("id", Integer, Sequence("t_id_seq"),
+                                  primary_key=True),
+                           Column("x", String(20)))
+
+    def test_values_insert(self):
+        dialect = MDBDialect()
+        statement, params = bulk.values_insert(
+            dialect.identifier_preparer, self.table,
+            [(c, None) for c in self.table.c],
+            [{"id": 1, "x": "a"}, {"id": 2, "x": None}])
+        eq_(statement, "INSERT INTO t (id, x) VALUES "
+                       "(%(id_0)s, %(x_0)s), (%(id_1)s, %(x_1)s)")
+        eq_(params, {"id_0": 1, "x_0": "a", "id_1": 2, "x_1": None})
+
+    def test_executemany_batches(self):
+        dialect = MDBDialect(insert_batch_mode="values", insert_batch_size=3)
+
+        class context(object):
+            compiled = self.table.insert().compile(
+                dialect=dialect, column_keys=["id", "x"])
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, str(context.compiled),
+                               [{"id": i, "x": "x"} for i in range(5000)],
+                               context)
+        eq_(len(cursor.statements), 1667)
+        eq_(cursor.statements[-1],
+            "INSERT INTO t (id, x) VALUES (%(id_0)s, %(x_0)s), "
+            "(%(id_1)s, %(x_1)s)")
+        eq_(cursor.parameters, {"id_0": 4998, "x_0": "x",
+                                "id_1": 4999, "x_1": "x"})
+
+    def test_batch_bytes(self):
+        values = [(c, None) for c in self.table.c]
+        rows = [{"id": i, "x": "x" * 100 if i == 2 else "x"}
+                for i in range(6)]
+        # (0, 'x') takes 8 bytes
+        eq_([[row["id"] for row in batch]
+             for batch in bulk.values_batches(values, rows, 3, 30)],
+            [[0, 1], [2], [3, 4, 5]])
+
+    def test_rowcount_of_batches(self):
+        dbapi = fakedbapi.FakeDBAPI(default=inserted)
+        engine = fakedbapi.create_engine(dbapi, insert_batch_mode="values",
+                                         insert_batch_size=40)
+        result = engine.execute(self.table.insert(),
+                                [{"id": i, "x": "x"} for i in range(100)])
+        eq_(len(dbapi.statements), 3)
+        eq_(result.rowcount, 100)
+
+    def test_inline_sequence(self):
+        dialect = MDBDialect(insert_batch_mode="values")
+
+        class context(object):
+            compiled = self.table.insert(inline=True).compile(
+                dialect=dialect, column_keys=["x"])
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, str(context.compiled),
+                               [{"x": "a"}, {"x": "b"}], context)
+        eq_(cursor.statements,
+            ["INSERT INTO t (id, x) VALUES "
+             "((SELECT NEXT VALUE FOR t_id_seq), %(x_0)s), "
+             "((SELECT NEXT VALUE FOR t_id_seq), %(x_1)s)"])
+
+    def test_inline_sequence_not_copied(self):
+        dialect = MDBDialect(copy_threshold=2)
+
+        class context(object):
+            compiled = self.table.insert(inline=True).compile(
+                dialect=dialect, column_keys=["x"])
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, str(context.compiled),
+                               [{"x": "a"}, {"x": "b"}], context)
+        eq_(cursor.statements, [str(context.compiled)] * 2)
+
+    def test_invalid_mode(self):
+        assert_raises(exc.ArgumentError, MDBDialect,
+                      insert_batch_mode="copy")
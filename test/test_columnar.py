@@ -0,0 +1,132 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb.base import MONETDB_TYPE_MAP
+from sqlalchemy_monetdb.columnar import ColumnarResult, get_dtype
+
+
+HEADER = "\n".join([
+    "% sys.t,\tsys.t,\tsys.t,\tsys.t # table_name",
+    "% id,\tprice,\tflag,\tday # name",
+    "% int,\tdouble,\tboolean,\tdate # type",
+])
+
+
+def tuples(start, stop):
+    return ["[ %d,\t%d.5,\t%s,\t%s\t]" % (
+        i, i, "true" if i % 2 else "false",
+        "NULL" if i == 3 else "2014-01-%02d" % (i % 28 + 1))
+        for i in range(start, stop)]
+
+
+class MapiConnection(object):
+    """Stands in for a DBAPI connection, answering Xexport commands from a
+    result of `rowcount` rows of which the first block holds `first`."""
+
+    mapi = True
+
+    class ProgrammingError(Exception):
+        pass
+
+    class InterfaceError(Exception):
+        pass
+
+    def __init__(self, rowcount, first):
+        self.rowcount = rowcount
+        self.first = first
+        self.commands = []
+
+    def execute(self, statement):
+        return "\n".join(["&1 0 %d 4 %d" % (self.rowcount, self.first),
+                          HEADER] + tuples(0, self.first))
+
+    def command(self, command):
+        self.commands.append(command)
+        if command.startswith("Xexport"):
+            offset, amount = [int(v) for v in command.split()[2:]]
+            return "\n".join(["&6 0 4 %d %d" % (amount, offset)] +
+                             tuples(offset, offset + amount))
+        return ""
+
+
+class ColumnarResultTest(fixtures.TestBase):
+    __skip_if__ = (lambda: numpy is None,)
+
+    def _result(self, rowcount, first):
+        connection = MapiConnection(rowcount, first)
+        return connection, ColumnarResult(
+            connection, connection.execute("SELECT * FROM t"),
+            MONETDB_TYPE_MAP)
+
+    def test_dtypes(self):
+        eq_([get_dtype(t, MONETDB_TYPE_MAP) for t in
+             ("int", "bigint", "double", "boolean", "timestamp", "varchar")],
+            ["int32", "int64", "float64", "bool", "datetime64[us]", None])
+
+    def test_description(self):
+        connection, result = self._result(5, 5)
+        eq_([d[:2] for d in result.description],
+            [("id", "int"), ("price", "double"), ("flag", "boolean"),
+             ("day", "date")])
+
+    def test_fetch_columns(self):
+        connection, result = self._result(5, 5)
+        columns = result.fetch_columns()
+        eq_(columns["id"].dtype, numpy.dtype("int32"))
+        eq_(columns["id"].tolist(), [0, 1, 2, 3, 4])
+        eq_(columns["price"].tolist(), [0.5, 1.5, 2.5, 3.5, 4.5])
+        eq_(columns["flag"].tolist(), [False, True, False, True, False])
+        eq_(columns["day"].dtype, numpy.dtype("datetime64[D]"))
+        eq_(columns["day"].mask.tolist(), [False, False, False, True, False])
+        eq_(str(columns["day"][4]), "2014-01-05")
+        eq_(connection.commands, ["Xclose 0"])
+
+    def test_exports_remaining_blocks(self):
+        connection, result = self._result(25000, 100)
+        result.export_size = 10000
+        columns = result.fetch_columns()
+        eq_(columns["id"].tolist(), list(range(25000)))
+        eq_(connection.commands, ["Xexport 0 100 10000",
+                                  "Xexport 0 10100 10000",
+                                  "Xexport 0 20100 4900",
+                                  "Xclose 0"])
+
+    def test_empty(self):
+        connection, result = self._result(0, 0)
+        columns = result.fetch_columns()
+        eq_(sorted(columns), ["day", "flag", "id", "price"])
+        eq_(len(columns["id"]), 0)
+
+    def _names(self, *rows):
+        return ColumnarResult(MapiConnection(0, 0), "\n".join([
+            "&1 0 %d 2 %d" % (len(rows), len(rows)),
+            "% sys.t,\tsys.t # table_name",
+            "% id,\tname # name",
+            "% int,\tvarchar # type"] + list(rows)), MONETDB_TYPE_MAP)
+
+    def test_quoted_delimiter(self):
+        result = self._names('[ 1,\t"a,\tb"\t]',
+                             '[ 2,\t"say \\"hi\\""\t]')
+        eq_(result.fetch_columns()["name"].tolist(),
+            ["a,\tb", 'say "hi"'])
+
+    def test_row_length(self):
+        assert_raises(MapiConnection.InterfaceError,
+                      self._names('[ 1\t]').fetch_columns)
+        assert_raises(MapiConnection.InterfaceError,
+                      self._names('[ 1,\t"a",\t"b"\t]').fetch_columns)
+
+    def test_no_rows(self):
+        result = ColumnarResult(MapiConnection(0, 0), "&2 1 -1",
+                                MONETDB_TYPE_MAP)
+        assert_raises(exc.ResourceClosedError, result.fetch_columns)
+
+    def test_error(self):
+        assert_raises(MapiConnection.ProgrammingError, ColumnarResult,
+                      MapiConnection(0, 0), "!42000!syntax error",
+                      MONETDB_TYPE_MAP)
@@ -0,0 +1,123 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, select
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.base import MDBDialect, MDBCompiler
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)))
+
+
+class CompiledCacheTest(fixtures.TestBase):
+    def setup(self):
+        self.dialect = MDBDialect()
+
+    def _counts(self):
+        cache = self.dialect.compiled_cache
+        return cache.hits, cache.misses
+
+    def test_limit_offset_bound(self):
+        compiled = select([t]).limit(10).offset(20).compile(
+            dialect=self.dialect)
+        eq_(compiled.string, 'SELECT t.id, t."name" \nFROM t\n'
+            'LIMIT %(monetdb_limit_1)s OFFSET %(monetdb_offset_1)s')
+        eq_(compiled.params, {"monetdb_limit_1": 10, "monetdb_offset_1": 20})
+
+    def test_pages_share_entry(self):
+        query = select([t]).where(t.c.name == "x").order_by(t.c.id)
+        params = [query.limit(10).offset(page * 10).compile(
+            dialect=self.dialect).params for page in range(5)]
+        eq_([p["monetdb_offset_1"] for p in params], [0, 10, 20, 30, 40])
+        eq_([p["name_1"] for p in params], ["x"] * 5)
+        eq_(self._counts(), (4, 1))
+
+    def test_rebuilt_construct(self):
+        for i in range(3):
+            t.insert().compile(dialect=self.dialect)
+            select([t]).limit(i + 1).compile(dialect=self.dialect)
+        eq_(self._counts(), (4, 2))
+
+    def test_limit_presence_in_key(self):
+        query = select([t])
+        eq_(query.compile(dialect=self.dialect).params, {})
+        eq_(query.limit(5).compile(dialect=self.dialect).params,
+            {"monetdb_limit_1": 5})
+        eq_(self._counts(), (0, 2))
+
+    def test_different_clauses(self):
+        compiled = [select([t]).where(t.c.id == i).compile(
+            dialect=self.dialect) for i in range(3)]
+        eq_([c.params["id_1"] for c in compiled], [0, 1, 2])
+        eq_(self._counts(), (0, 3))
+
+    def test_rebuilt_clause(self):
+        # clauses are parts compared by identity
+        for i in range(2):
+            select([t]).where(t.c.id == 5).compile(dialect=self.dialect)
+        eq_(self._counts(), (0, 2))
+        clause = t.c.id == 5
+        for i in range(2):
+            select([t]).where(clause).compile(dialect=self.dialect)
+        eq_(self._counts(), (1, 3))
+
+    def test_appended_column(self):
+        u = Table("u", MetaData(), Column("id", Integer))
+        eq_(select([u]).compile(dialect=self.dialect).string,
+            "SELECT u.id \nFROM u")
+        u.append_column(Column("name", String(40)))
+        eq_(select([u]).compile(dialect=self.dialect).string,
+            'SELECT u.id, u."name" \nFROM u')
+        eq_(self._counts(), (0, 2))
+
+    def test_compile_time_per_call(self):
+        query = select([t])
+        first, second = [query.compile(dialect=self.dialect)
+                         for i in range(2)]
+        assert first is not second
+        assert first.compile_time is not None
+        # the entry shared by the callers keeps none
+        eq_([c.compile_time
+             for c in self.dialect.compiled_cache.entries.values()], [None])
+
+    def test_column_keys(self):
+        ins = t.insert()
+        eq_(ins.compile(dialect=self.dialect, column_keys=["name"]).string,
+            'INSERT INTO t ("name") VALUES (%(name)s)')
+        eq_(ins.compile(dialect=self.dialect, column_keys=["id"]).string,
+            'INSERT INTO t (id) VALUES (%(id)s)')
+        eq_(self._counts(), (0, 2))
+
+    def test_least_recently_used(self):
+        dialect = MDBDialect(compiled_cache_size=2)
+        queries = [select([t]).where(t.c.id == i) for i in range(3)]
+        for i in (0, 1, 0, 2, 0, 1):
+            queries[i].compile(dialect=dialect)
+        eq_((dialect.compiled_cache.hits, dialect.compiled_cache.misses),
+            (2, 4))
+
+    def test_disabled(self):
+        dialect = MDBDialect(compiled_cache_size=None)
+        query = select([t])
+        assert query.compile(dialect=dialect) is not \
+            query.compile(dialect=dialect)
+        eq_(dialect.compiled_cache, None)
+
+    def test_dialect_compiler(self):
+        class Compiler(MDBCompiler):
+            def visit_select(self, select, **kw):
+                return "/* compiled */ " + MDBCompiler.visit_select(
+                    self, select, **kw)
+
+        class Dialect(MDBDialect):
+            statement_compiler = Compiler
+
+        dialect = Dialect()
+        eq_(dialect.statement_compiler, Compiler)
+        compiled = [select([t]).compile(dialect=dialect) for i in range(2)]
+        eq_([type(c) for c in compiled], [Compiler] * 2)
+        eq_(compiled[0].string, '/* compiled */ SELECT t.id, t."name" \n'
+            'FROM t')
+        eq_((dialect.compiled_cache.hits, dialect.compiled_cache.misses),
+            (1, 1))
@@ -0,0 +1,113 @@
+from sqlalchemy import MetaData, Table, Column, Integer, Index, exc
+from sqlalchemy.schema import CreateTable, CreateIndex
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import ddl
+from sqlalchemy_monetdb.base import MDBDialect
+
+import fakedbapi
+
+
+def ddl_statements(dbapi):
+    """The statements but the existence checks executed on `dbapi`."""
+
+    statements = [" ".join(s.split()) for s in dbapi.statements]
+    return [s for s in statements if not s.startswith("SELECT")]
+
+
+def compile(element):
+    return " ".join(str(element.compile(dialect=MDBDialect())).split())
+
+
+class CreateTableTest(fixtures.TestBase):
+    def test_kinds(self):
+        for kind in ("merge", "replica", "unlogged"):
+            t = Table("t", MetaData(), Column("id", Integer),
+                      monetdb_kind=kind)
+            eq_(compile(CreateTable(t)),
+                "CREATE %s TABLE t ( id INTEGER )" % kind.upper())
+
+    def test_remote(self):
+        t = Table("t", MetaData(), Column("id", Integer),
+                  monetdb_kind="remote",
+                  monetdb_remote="mapi:monetdb://node1:50000/demo")
+        eq_(compile(CreateTable(t)), "CREATE REMOTE TABLE t ( id INTEGER ) "
+                                     "ON 'mapi:monetdb://node1:50000/demo'")
+        t = Table("t", MetaData(), Column("id", Integer),
+                  monetdb_kind="remote")
+        assert_raises(exc.CompileError, compile, CreateTable(t))
+
+    def test_temporary(self):
+        t = Table("t", MetaData(), Column("id", Integer),
+                  prefixes=["LOCAL TEMPORARY"],
+                  monetdb_on_commit="preserve_rows")
+        eq_(compile(CreateTable(t)), "CREATE LOCAL TEMPORARY TABLE t "
+                                     "( id INTEGER ) ON COMMIT PRESERVE ROWS")
+
+    def test_invalid(self):
+        for kw in ({"monetdb_kind": "view"}, {"monetdb_on_commit": "keep"},
+                   {"monetdb_kind": "merge", "prefixes": ["TEMPORARY"]}):
+            t = Table("t", MetaData(), Column("id", Integer), **kw)
+            assert_raises(exc.CompileError, compile, CreateTable(t))
+
+
+class CreateIndexTest(fixtures.TestBase):
+    def setup(self):
+        self.t = Table("t", MetaData(), Column("id", Integer),
+                       Column("x", Integer))
+
+    def test_types(self):
+        eq_(compile(CreateIndex(Index("ix", self.t.c.id,
+                                      monetdb_type="ordered"))),
+            "CREATE ORDERED INDEX ix ON t (id)")
+        eq_(compile(CreateIndex(Index("ix", self.t.c.x,
+                                      monetdb_type="imprints"))),
+            "CREATE IMPRINTS INDEX ix ON t (x)")
+        eq_(compile(CreateIndex(Index("ix", self.t.c.id, self.t.c.x,
+                                      unique=True))),
+            "CREATE UNIQUE INDEX ix ON t (id, x)")
+
+    def test_single_column(self):
+        for index in (Index("ix", self.t.c.id, self.t.c.x,
+                            monetdb_type="imprints"),
+                      Index("ix", self.t.c.id, unique=True,
+                            monetdb_type="ordered"),
+                      Index("ix", self.t.c.id, monetdb_type="bitmap")):
+            assert_raises(exc.CompileError, compile, CreateIndex(index))
+
+
+class PartitionTest(fixtures.TestBase):
+    def test_statements(self):
+        facts = Table("facts", MetaData(), Column("id", Integer),
+                      monetdb_kind="merge")
+        part = Table("facts_2014", facts.metadata, Column("id", Integer))
+        eq_(compile(ddl.AddPartition(facts, part)),
+            "ALTER TABLE facts ADD TABLE facts_2014")
+        eq_(compile(ddl.DropPartition(facts, part)),
+            "ALTER TABLE facts DROP TABLE facts_2014")
+
+    def test_create_drop_all(self):
+        metadata = MetaData()
+        # named to sort before its partitions
+        facts = Table("a_facts", metadata, Column("id", Integer),
+                      monetdb_kind="merge")
+        parts = [Table("facts_%d" % year, metadata, Column("id", Integer))
+                 for year in (2014, 2015)]
+        ddl.add_partitions(facts, *parts)
+
+        # on an empty schema
+        dbapi = fakedbapi.FakeDBAPI([("SELECT", fakedbapi.Reply(["name"]))])
+        engine = fakedbapi.create_engine(dbapi)
+        metadata.create_all(engine)
+        statements = ddl_statements(dbapi)
+        eq_(sorted(statements[:2]), [
+            "CREATE TABLE facts_2014 ( id INTEGER )",
+            "CREATE TABLE facts_2015 ( id INTEGER )"])
+        eq_(statements[2:], [
+            "CREATE MERGE TABLE a_facts ( id INTEGER )",
+            "ALTER TABLE a_facts ADD TABLE facts_2014",
+            "ALTER TABLE a_facts ADD TABLE facts_2015"])
+
+        del dbapi.executed[:]
+        metadata.drop_all(engine, checkfirst=False)
+        eq_(ddl_statements(dbapi)[0], "DROP TABLE a_facts")
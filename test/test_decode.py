@@ -0,0 +1,149 @@
+import datetime
+import decimal
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, select
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import decode
+
+import fakedbapi
+
+
+HEADER = "\n".join([
+    "% sys.t,\tsys.t,\tsys.t,\tsys.t,\tsys.t,\tsys.t,\tsys.t # table_name",
+    "% id,\tname,\tamount,\tflag,\tday,\tcreated,\tat # name",
+    "% int,\tvarchar,\tdecimal,\tboolean,\tdate,\ttimestamp,\ttime # type",
+])
+
+
+def tuples(start, stop):
+    return ["[ %d,\t\"name %d\",\t%d.25,\t%s,\t%s,\t"
+            "2014-01-02 03:04:%02d.000006,\t03:04:05\t]" % (
+                i, i, i, "true" if i % 2 else "false",
+                "NULL" if i == 3 else "2014-01-%02d" % (i % 28 + 1), i % 60)
+            for i in range(start, stop)]
+
+
+class MapiConnection(fakedbapi.Connection):
+    """Answers a select with a result of `rowcount` rows of the DBAPI, of
+    which the first block holds `first`, and Xexport commands with the
+    others."""
+
+    mapi = True
+
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.commands = []
+
+    def execute(self, statement):
+        self.dbapi.executed.append((statement, None))
+        return "\n".join(["&1 0 %d 7 %d" % (self.dbapi.rowcount,
+                                             self.dbapi.first),
+                          HEADER] + tuples(0, self.dbapi.first))
+
+    def command(self, command):
+        self.commands.append(command)
+        if command.startswith("Xexport"):
+            offset, amount = [int(v) for v in command.split()[2:]]
+            return "\n".join(["&6 0 7 %d %d" % (amount, offset)] +
+                             tuples(offset, offset + amount))
+        return ""
+
+
+class DecodeDBAPI(fakedbapi.FakeDBAPI):
+    """Hands out a single connection."""
+
+    def __init__(self, rowcount, first):
+        fakedbapi.FakeDBAPI.__init__(self)
+        self.rowcount = rowcount
+        self.first = first
+        self.connection = MapiConnection(self)
+
+    def connect(self, *args, **kwargs):
+        return self.connection
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)))
+
+
+class DecodeTest(fixtures.TestBase):
+    def test_converters(self):
+        eq_([convert(value) for convert, value in zip(
+            decode.converters([(None, "int"), (None, "varchar"),
+                               (None, "varchar"), (None, "decimal"),
+                               (None, "boolean"), (None, "date"),
+                               (None, "timestamp"), (None, "timestamp"),
+                               (None, "time"), (None, "blob")]),
+            ["42", '"a"', '"say \\"hi\\"\\n"', "1.50", "true",
+             "2014-01-02", "2014-01-02 03:04:05.000006",
+             "2014-01-02 03:04:05.1234", "03:04:05.5", "0102"])],
+            [42, "a", 'say "hi"\n', decimal.Decimal("1.50"), True,
+             datetime.date(2014, 1, 2),
+             datetime.datetime(2014, 1, 2, 3, 4, 5, 6),
+             datetime.datetime(2014, 1, 2, 3, 4, 5, 123400),
+             datetime.time(3, 4, 5, 500000), "0102"])
+
+    def test_other_types(self):
+        convert, = decode.converters([(None, "timestamptz")])
+        eq_(convert("2014-01-02 03:04:05.000000+01:00"),
+            datetime.datetime(2014, 1, 2, 4, 4, 5))
+
+    def test_rows(self):
+        connection = DecodeDBAPI(4, 4).connection
+        result = decode.RowResult(connection, connection.execute("SELECT"))
+        eq_(result.fetchone(),
+            (0, "name 0", decimal.Decimal("0.25"), False,
+             datetime.date(2014, 1, 1),
+             datetime.datetime(2014, 1, 2, 3, 4, 0, 6),
+             datetime.time(3, 4, 5)))
+        eq_([row[4] for row in result.fetchmany(3)],
+            [datetime.date(2014, 1, 2), datetime.date(2014, 1, 3), None])
+        eq_(result.fetchall(), [])
+
+    def test_blocks(self):
+        connection = DecodeDBAPI(250, 100).connection
+        result = decode.RowResult(connection, connection.execute("SELECT"))
+        result.export_size = 100
+        eq_(len(result.fetchmany(150)), 150)
+        eq_(connection.commands, ["Xexport 0 100 100"])
+        eq_([row[0] for row in result.fetchall()], list(range(150, 250)))
+        result.close()
+        eq_(connection.commands, ["Xexport 0 100 100",
+                                  "Xexport 0 200 50", "Xclose 0"])
+
+    def test_delimiter_in_string(self):
+        connection = DecodeDBAPI(1, 1).connection
+        result = decode.RowResult(connection, "\n".join([
+            "&1 0 1 7 1", HEADER,
+            '[ 1,\t"a,\tb",\t1.25,\ttrue,\tNULL,\tNULL,\tNULL\t]']))
+        eq_(result.fetchall(),
+            [(1, "a,\tb", decimal.Decimal("1.25"), True, None, None, None)])
+
+    def test_row_length(self):
+        connection = DecodeDBAPI(1, 1).connection
+        result = decode.RowResult(connection, "\n".join([
+            "&1 0 1 7 1", HEADER, '[ 1,\t"a,\tb"\t]']))
+        assert_raises(fakedbapi.InterfaceError, result.fetchall)
+
+
+class EngineTest(fixtures.TestBase):
+    def _engine(self, **kw):
+        self.dbapi = DecodeDBAPI(3, 3)
+        return fakedbapi.create_engine(self.dbapi, **kw)
+
+    def test_fast_decode(self):
+        engine = self._engine(fast_decode=True)
+        rows = engine.execute(select([t]).where(t.c.id > 5)).fetchall()
+        eq_([(row[0], row[1]) for row in rows],
+            [(0, "name 0"), (1, "name 1"), (2, "name 2")])
+        eq_(self.dbapi.statements,
+            ["SELECT t.id, t.\"name\" \nFROM t \nWHERE t.id > 5"])
+
+    def test_execution_option(self):
+        engine = self._engine()
+        conn = engine.connect().execution_options(fast_decode=True)
+        eq_(conn.execute(select([t])).rowcount, 3)
+        eq_(len(self.dbapi.statements), 1)
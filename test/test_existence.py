@@ -0,0 +1,158 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, \
+    Sequence, DDL
+from sqlalchemy.testing import fixtures, eq_
+
+import fakedbapi
+
+
+class Cursor(fakedbapi.Cursor):
+    def execute(self, statement, parameters=None):
+        fakedbapi.Cursor.execute(self, statement, parameters)
+        words = statement.split()
+        if words[0] in ("CREATE", "DROP") and words[1] in ("TABLE",
+                                                           "SEQUENCE"):
+            names = self.connection.dbapi.names[words[1].lower() + "s"]
+            if words[0] == "CREATE":
+                names.add(words[2])
+                self.connection.created.append((names, words[2]))
+            else:
+                names.remove(words[2])
+                self.connection.dropped.append((names, words[2]))
+
+
+class Connection(fakedbapi.Connection):
+    cursor_class = Cursor
+
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        # (names, name) created or dropped since the last commit
+        self.created = []
+        self.dropped = []
+
+    def commit(self):
+        self.created, self.dropped = [], []
+
+    def rollback(self):
+        for names, name in self.created:
+            names.discard(name)
+        for names, name in self.dropped:
+            names.add(name)
+        self.commit()
+
+
+class CatalogDBAPI(fakedbapi.FakeDBAPI):
+    """Keeps the names of the tables and sequences created, answering the
+    existence queries."""
+
+    connection_class = Connection
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(self, [("SELECT", self._names)])
+        self.names = {"tables": set(), "sequences": set()}
+        self.queries = []
+
+    def _names(self, statement, parameters):
+        kind = "tables" if "sys.tables" in statement else "sequences"
+        self.queries.append((kind, "name" in parameters))
+        return fakedbapi.Reply(
+            ["name"], [(name,) for name in sorted(self.names[kind])
+                       if parameters.get("name", name) == name],
+            types=["varchar"])
+
+
+def make_metadata(count):
+    metadata = MetaData()
+    for i in range(count):
+        Table("t%d" % i, metadata,
+              Column("id", Integer, Sequence("t%d_id_seq" % i),
+                     primary_key=True),
+              Column("name", String(40), index=True))
+    Sequence("standalone", metadata=metadata)
+    return metadata
+
+
+class ExistenceTest(fixtures.TestBase):
+    def setup(self):
+        self.dbapi = CatalogDBAPI()
+        self.engine = fakedbapi.create_engine(self.dbapi)
+
+    def test_single_lookup(self):
+        self.dbapi.names["tables"].add("t0")
+        dialect = self.engine.dialect
+        assert dialect.has_table(self.engine.connect(), "t0")
+        assert not dialect.has_table(self.engine.connect(), "t1")
+        assert not dialect.has_sequence(self.engine.connect(), "s")
+        eq_(self.dbapi.queries, [("tables", True), ("tables", True),
+                                 ("sequences", True)])
+
+    def test_create_all_constant_queries(self):
+        metadata = make_metadata(50)
+        metadata.create_all(self.engine)
+        eq_(len(self.dbapi.names["tables"]), 50)
+        eq_(len(self.dbapi.names["sequences"]), 51)
+        eq_(self.dbapi.queries, [("tables", True), ("tables", False),
+                                 ("sequences", True), ("sequences", False)])
+
+        # nothing to create, only the standalone sequence is checked
+        del self.dbapi.queries[:]
+        metadata.create_all(self.engine)
+        eq_(len(self.dbapi.queries), 3)
+
+        del self.dbapi.queries[:]
+        metadata.drop_all(self.engine)
+        eq_(self.dbapi.names, {"tables": set(), "sequences": set()})
+        eq_(len(self.dbapi.queries), 4)
+
+    def test_follows_ddl(self):
+        conn = self.engine.connect()
+        dialect = self.engine.dialect
+        metadata = make_metadata(2)
+        trans = conn.begin()
+        assert not dialect.has_table(conn, "t0")
+        assert not dialect.has_table(conn, "t1")
+        metadata.tables["t0"].create(conn)
+        assert dialect.has_table(conn, "t0")
+        metadata.tables["t0"].drop(conn)
+        assert not dialect.has_table(conn, "t0")
+        trans.commit()
+        eq_(len(self.dbapi.queries), 2)
+
+    def test_other_connection_drops(self):
+        conn = self.engine.connect()
+        metadata = make_metadata(2)
+        metadata.create_all(conn)
+        metadata.tables["t0"].drop(self.engine.connect())
+        assert not self.engine.dialect.has_table(conn, "t0")
+
+    def test_transaction_ends(self):
+        conn = self.engine.connect()
+        dialect = self.engine.dialect
+        trans = conn.begin()
+        assert not dialect.has_table(conn, "t0")
+        assert not dialect.has_table(conn, "t1")
+        trans.commit()
+        # created by another session
+        self.dbapi.names["tables"].add("t1")
+        assert dialect.has_table(conn, "t1")
+
+    def test_rolled_back_create(self):
+        conn = self.engine.connect()
+        dialect = self.engine.dialect
+        metadata = make_metadata(1)
+        trans = conn.begin()
+        assert not dialect.has_table(conn, "t0")
+        assert not dialect.has_table(conn, "t0")
+        metadata.tables["t0"].create(conn)
+        assert dialect.has_table(conn, "t0")
+        trans.rollback()
+        assert not dialect.has_table(conn, "t0")
+
+    def test_other_ddl_discards_names(self):
+        conn = self.engine.connect()
+        dialect = self.engine.dialect
+        dialect.has_table(conn, "t0")
+        dialect.has_table(conn, "t0")
+        conn.execute(DDL("ALTER TABLE t0 RENAME TO t1"))
+        dialect.has_table(conn, "t0")
+        eq_(self.dbapi.queries, [("tables", True), ("tables", False),
+                                 ("tables", True)])
@@ -0,0 +1,131 @@
+import datetime
+import decimal
+import io
+import struct
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, \
+    Numeric, Date, DateTime, select, exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import blob
+
+import fakedbapi
+
+
+class Mapi(object):
+    def __init__(self, dbapi):
+        self.dbapi = dbapi
+        self.reply = io.BytesIO()
+
+    def _putblock(self, block):
+        self.dbapi.sent.append(block)
+        data, size = self.dbapi.output, self.dbapi.block_size
+        blocks = []
+        for start in range(0, len(data), size):
+            piece = data[start:start + size]
+            last = start + size >= len(data)
+            blocks.append(struct.pack("<H", len(piece) << 1 | last) + piece)
+        self.reply = io.BytesIO(b"".join(blocks))
+
+    def _getbytes(self, count):
+        return self.reply.read(count)
+
+
+class Connection(fakedbapi.Connection):
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.mapi = Mapi(dbapi)
+
+
+class ExportDBAPI(fakedbapi.FakeDBAPI):
+    """Answers every statement sent over MAPI with the `output` of COPY
+    INTO STDOUT, in blocks of `block_size` bytes."""
+
+    connection_class = Connection
+
+    def __init__(self, output, block_size=blob.BLOCK_SIZE):
+        fakedbapi.FakeDBAPI.__init__(self)
+        self.output = output
+        self.block_size = block_size
+        self.sent = []
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)),
+          Column("amount", Numeric(12, 2)),
+          Column("day", Date),
+          Column("created", DateTime))
+
+OUTPUT = (b'1|"a"|1.50|2014-01-02|2014-01-02 03:04:05.000006\n'
+          b'2|"b|\\"c\\"\\n"|||\n'
+          b'3|""|0.00|2014-12-31|2014-12-31 23:59:59.000000\n'
+          b'&2 3 -1\n')
+
+
+class ExportTest(fixtures.TestBase):
+    def _conn(self, output=OUTPUT, block_size=blob.BLOCK_SIZE):
+        self.dbapi = ExportDBAPI(output, block_size)
+        engine = fakedbapi.create_engine(self.dbapi)
+        return engine.connect().execution_options(export=True)
+
+    def test_statement(self):
+        conn = self._conn()
+        conn.execute(select([t.c.id]).where(t.c.id > 1)).close()
+        eq_(self.dbapi.sent, [
+            "sCOPY SELECT t.id \nFROM t \nWHERE t.id > 1 INTO STDOUT USING "
+            "DELIMITERS '|', '\\n', '\"' NULL AS '';"])
+
+    def test_copy_to_file(self):
+        out = io.BytesIO()
+        eq_(self._conn().execute(select([t])).copy_to(out), 3)
+        eq_(out.getvalue(), OUTPUT[:OUTPUT.index(b"&")])
+
+    def test_copy_to_callback(self):
+        chunks = []
+        result = self._conn(block_size=20).execute(select([t]))
+        eq_(result.copy_to(chunks.append), 3)
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.endswith(b"\n")
+        eq_(b"".join(chunks), OUTPUT[:OUTPUT.index(b"&")])
+        assert result.closed
+
+    def test_batches(self):
+        result = self._conn(block_size=30).execute(select([t]))
+        batches = list(result.batches(2))
+        eq_(len(batches), 2)
+        eq_(batches[0]["id"], [1, 2])
+        eq_(batches[0]["name"], ["a", 'b|"c"\n'])
+        eq_(batches[0]["amount"], [decimal.Decimal("1.50"), None])
+        eq_(batches[0]["day"], [datetime.date(2014, 1, 2), None])
+        eq_(batches[0]["created"],
+            [datetime.datetime(2014, 1, 2, 3, 4, 5, 6), None])
+        eq_(batches[1]["name"], [""])
+        eq_(batches[1]["created"],
+            [datetime.datetime(2014, 12, 31, 23, 59, 59)])
+
+    def test_labels(self):
+        result = self._conn(b"1|2\n&2 1 -1\n").execute(
+            select([t.c.id.label("x"), (t.c.id + 1).label("y")]))
+        eq_(list(result.batches()), [{"x": [1], "y": [2]}])
+
+    def test_error(self):
+        result = self._conn(b"!42000!COPY INTO: no such table\n").execute(
+            select([t]))
+        assert_raises(fakedbapi.OperationalError, result.copy_to,
+                      io.BytesIO())
+
+    def test_close_reads_output(self):
+        result = self._conn(block_size=10).execute(select([t]))
+        result.close()
+        eq_(result.context.export_output.done, True)
+
+    def test_rows_not_fetched(self):
+        result = self._conn().execute(select([t]))
+        assert_raises(exc.InvalidRequestError, result.fetchall)
+
+    def test_select_only(self):
+        assert_raises(exc.InvalidRequestError, self._conn().execute,
+                      t.delete())
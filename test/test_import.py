@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+from sqlalchemy.testing import fixtures, eq_
+
+
+CODE = """
+import sys
+import sqlalchemy_monetdb
+print('sqlalchemy_monetdb.base' in sys.modules)
+import sqlalchemy as sa
+from sqlalchemy.dialects import registry
+registry.register('monetdb', 'sqlalchemy_monetdb.base', 'MDBDialect')
+engine = sa.create_engine('monetdb://', strategy='mock',
+                          executor=lambda *args, **kwargs: None)
+print(str(sa.select([sa.literal_column('1')]).compile(engine)))
+print('monetdb' in sys.modules)
+"""
+
+
+class ImportTest(fixtures.TestBase):
+    def test_lazy(self):
+        # in a fresh interpreter, with the modules of this one
+        out = subprocess.check_output(
+            [sys.executable, "-c", "import sys; sys.path[:0] = %r\n%s" % (
+                sys.path, CODE)], universal_newlines=True)
+        eq_(out.split("\n"), ["False", "SELECT 1", "False", ""])
@@ -0,0 +1,113 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, select
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb.instrument import Instrumentation, RingBufferSink, \
+    CallbackSink
+
+import fakedbapi
+
+
+def plan(statement, parameters):
+    if "broken" in statement:
+        return fakedbapi.Error("no plan")
+    return fakedbapi.Reply(["mal"], [("function user.s1_1():void;",),
+                                     ("end user.s1_1;",)], ["clob"])
+
+
+class PlanDBAPI(fakedbapi.FakeDBAPI):
+    """Answers SELECT with three rows and EXPLAIN and TRACE with the lines
+    of a plan."""
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(self, [
+            ("EXPLAIN", plan), ("TRACE", plan),
+            ("SELECT", fakedbapi.Reply(
+                ["id", "name"], [(i, "name %d" % i) for i in range(3)],
+                ["int", "varchar"]))],
+            default=fakedbapi.Reply(rowcount=1))
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)))
+
+
+class InstrumentationTest(fixtures.TestBase):
+    def _engine(self, **kwargs):
+        self.dbapi = PlanDBAPI()
+        self.sink = RingBufferSink(10)
+        return fakedbapi.create_engine(
+            self.dbapi, instrumentation=Instrumentation([self.sink], **kwargs))
+
+    def test_select_record(self):
+        engine = self._engine()
+        rows = engine.execute(select([t]).where(t.c.id > 0)).fetchall()
+        eq_(len(rows), 3)
+        record, = self.sink
+        eq_(record.statement, 'SELECT t.id, t."name" \nFROM t \n'
+            'WHERE t.id > %(id_1)s')
+        eq_(record.parameters, {"id_1": 0})
+        eq_(record.rowcount, 3)
+        assert record.compile_time > 0
+        assert record.execute_time > 0
+        assert record.fetch_time > 0
+        eq_(record.plan, None)
+
+    def test_fetchmany_and_text(self):
+        engine = self._engine()
+        result = engine.execute("SELECT 1")
+        eq_(len(result.fetchmany(2) + result.fetchmany(2)), 3)
+        result.fetchmany(2)
+        eq_(engine.execute(select([t])).first(), (0, "name 0"))
+        text, first = self.sink
+        eq_((text.compile_time, text.rowcount), (None, 3))
+        eq_(first.rowcount, 1)
+
+    def test_dml_record(self):
+        engine = self._engine()
+        engine.execute(t.insert(), [{"id": 1, "name": "x"},
+                                    {"id": 2, "name": "y"}])
+        record, = self.sink
+        eq_(record.rowcount, 2)
+        eq_(len(record.parameters), 2)
+        eq_(record.fetch_time, 0.0)
+
+    def test_slow_query_plan(self):
+        engine = self._engine(slow_threshold=0)
+        engine.execute(select([t])).fetchall()
+        engine.execute(t.insert(), id=1, name="x")
+        select_record, insert_record = self.sink
+        eq_(select_record.plan, ["function user.s1_1():void;",
+                                 "end user.s1_1;"])
+        eq_(insert_record.plan, None)
+        eq_([s.split()[0] for s in self.dbapi.statements],
+            ["SELECT", "EXPLAIN", "INSERT"])
+
+    def test_trace_and_failed_plan(self):
+        engine = self._engine(slow_threshold=0, plan_statement="TRACE")
+        engine.execute("SELECT broken").fetchall()
+        eq_(list(self.sink)[0].plan, None)
+        eq_(self.dbapi.statements, ["SELECT broken", "TRACE SELECT broken"])
+
+    def test_not_sampled(self):
+        engine = self._engine(slow_threshold=0, sample_rate=0)
+        engine.execute(select([t])).fetchall()
+        eq_(len(self.dbapi.statements), 1)
+
+    def test_sinks(self):
+        records = []
+        engine = self._engine()
+        engine.dialect.instrumentation.add_sink(CallbackSink(records.append))
+        engine.execute(select([t])).fetchall()
+        eq_(records, list(self.sink))
+
+    def test_ring_buffer_size(self):
+        engine = self._engine()
+        for i in range(15):
+            engine.execute("SELECT %d" % i).fetchall()
+        eq_([r.statement for r in self.sink],
+            ["SELECT %d" % i for i in range(5, 15)])
+
+    def test_bad_plan_statement(self):
+        assert_raises(ValueError, Instrumentation, plan_statement="PLAN")
@@ -0,0 +1,136 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, select, \
+    exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb.base import MDBDialect
+from sqlalchemy_monetdb.dml import merge
+
+import fakedbapi
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(20)),
+          Column("total", Integer))
+staging = Table("staging", metadata,
+                Column("id", Integer),
+                Column("total", Integer))
+
+
+class RecordingCursor(object):
+    rowcount = -1
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, operation, parameters=None):
+        self.statements.append((operation, parameters))
+
+    def executemany(self, operation, seq_of_parameters):
+        self.statements.extend((operation, p) for p in seq_of_parameters)
+
+
+class MergeTest(fixtures.TestBase):
+    def setup(self):
+        self.dialect = MDBDialect()
+
+    def _compile(self, stmt, **kw):
+        return stmt.compile(dialect=self.dialect, **kw)
+
+    def test_upsert_parameters(self):
+        compiled = self._compile(merge(t), column_keys=["id", "name"])
+        eq_(compiled.string,
+            'MERGE INTO t USING (SELECT %(id)s AS id, %(name)s AS "name") '
+            'AS merge_source ON t.id = merge_source.id '
+            'WHEN MATCHED THEN UPDATE SET "name" = merge_source."name" '
+            'WHEN NOT MATCHED THEN INSERT (id, "name") '
+            'VALUES (merge_source.id, merge_source."name")')
+        eq_(compiled.construct_params({"id": 1, "name": "x"}),
+            {"id": 1, "name": "x"})
+
+    def test_unknown_parameter(self):
+        assert_raises(exc.CompileError, self._compile, merge(t),
+                      column_keys=["id", "nope"])
+
+    def test_select_source(self):
+        stmt = merge(t, select([staging.c.id, staging.c.total]).where(
+            staging.c.total > 5))
+        stmt = stmt.when_matched_update(
+            {t.c.total: t.c.total + stmt.source.c.total})
+        stmt = stmt.when_not_matched_insert()
+        eq_(str(self._compile(stmt)),
+            'MERGE INTO t USING (SELECT staging.id AS id, staging.total AS '
+            'total \nFROM staging \nWHERE staging.total > %(total_1)s) AS '
+            'merge_source ON t.id = merge_source.id '
+            'WHEN MATCHED THEN UPDATE SET total = (t.total + '
+            'merge_source.total) '
+            'WHEN NOT MATCHED THEN INSERT (id, total) '
+            'VALUES (merge_source.id, merge_source.total)')
+
+    def test_table_source_delete(self):
+        stmt = merge(t, staging, on=t.c.id == staging.c.id)
+        eq_(str(self._compile(stmt.when_matched_delete())),
+            "MERGE INTO t USING staging ON t.id = staging.id "
+            "WHEN MATCHED THEN DELETE")
+
+    def test_insert_only_with_values(self):
+        stmt = merge(t).when_not_matched_insert({"id": merge(t).source.c.id,
+                                                 t.c.name: "new"})
+        compiled = self._compile(stmt, column_keys=["id"])
+        eq_(compiled.string,
+            "MERGE INTO t USING (SELECT %(id)s AS id) AS merge_source "
+            "ON t.id = merge_source.id WHEN NOT MATCHED THEN INSERT "
+            "(id, \"name\") VALUES (merge_source.id, %(param_1)s)")
+        eq_(compiled.construct_params({"id": 1}),
+            {"id": 1, "param_1": "new"})
+
+    def test_no_primary_key(self):
+        assert_raises(exc.ArgumentError, merge, staging)
+
+    def test_executemany_batches(self):
+        dialect = MDBDialect(insert_batch_size=2)
+
+        class context(object):
+            compiled = merge(t).compile(dialect=dialect,
+                                        column_keys=["id", "name"])
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, context.compiled.string,
+                               [{"id": i, "name": "x%d" % i}
+                                for i in range(5)], context)
+        eq_(len(cursor.statements), 3)
+        statement, params = cursor.statements[0]
+        eq_(statement,
+            'MERGE INTO t USING (SELECT %(merge_0_id)s AS id, '
+            '%(merge_0_name)s AS "name" UNION ALL '
+            'SELECT %(merge_1_id)s, %(merge_1_name)s) AS merge_source '
+            'ON t.id = merge_source.id '
+            'WHEN MATCHED THEN UPDATE SET "name" = merge_source."name" '
+            'WHEN NOT MATCHED THEN INSERT (id, "name") '
+            'VALUES (merge_source.id, merge_source."name")')
+        eq_(params, {"merge_0_id": 0, "merge_0_name": "x0",
+                     "merge_1_id": 1, "merge_1_name": "x1",
+                     "id": 0, "name": "x0"})
+        eq_(cursor.statements[2][1]["merge_0_id"], 4)
+
+    def test_rowcount_of_batches(self):
+        def merged(statement, parameters):
+            return fakedbapi.Reply(rowcount=len(
+                [key for key in parameters if key.endswith("_id")]))
+        engine = fakedbapi.create_engine(
+            fakedbapi.FakeDBAPI(default=merged), insert_batch_size=2)
+        result = engine.execute(merge(t), [{"id": i, "name": "x%d" % i}
+                                           for i in range(5)])
+        eq_(result.rowcount, 5)
+
+    def test_executemany_select_source(self):
+        dialect = MDBDialect()
+        stmt = merge(t, select([staging]).where(
+            staging.c.total > staging.c.id))
+
+        class context(object):
+            compiled = stmt.compile(dialect=dialect)
+        cursor = RecordingCursor()
+        dialect.do_executemany(cursor, context.compiled.string,
+                               [{}, {}], context)
+        eq_(cursor.statements, [(context.compiled.string, {})] * 2)
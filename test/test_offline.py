@@ -0,0 +1,103 @@
+import datetime
+import decimal
+import io
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, \
+    String, Date, DateTime, Numeric, Boolean, Float, LargeBinary, \
+    Sequence, bindparam, select, text, exc
+from sqlalchemy.dialects import registry
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import offline
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, Sequence("t_seq"), primary_key=True),
+          Column("name", String(40)),
+          Column("data", LargeBinary),
+          Column("day", Date),
+          Column("at", DateTime),
+          Column("amount", Numeric(12, 2)),
+          Column("flag", Boolean),
+          Column("ratio", Float))
+
+
+def flat(statements):
+    return [" ".join(s.split()) for s in statements]
+
+
+class LiteralTest(fixtures.TestBase):
+    def _literal(self, value, type_=None):
+        compiled = select([t]).compile(dialect=offline.MDBOfflineDialect())
+        return compiled.render_literal_value(value, type_ or String())
+
+    def test_values(self):
+        eq_([self._literal(v) for v in [
+            None, "it's \\ 100%", True, 42, decimal.Decimal("1.50"), 0.5,
+            datetime.date(2014, 1, 2), datetime.time(3, 4, 5, 6),
+            datetime.datetime(2014, 1, 2, 3, 4, 5),
+            datetime.timedelta(minutes=-1, microseconds=5)]],
+            ["NULL", "'it''s \\\\ 100%'", "true", "42", "1.50", "0.5",
+             "DATE '2014-01-02'", "TIME '03:04:05.000006'",
+             "TIMESTAMP '2014-01-02 03:04:05'",
+             "INTERVAL '-59.999995' SECOND"])
+
+    def test_blob(self):
+        eq_(self._literal(b"\x00\xff", LargeBinary()), "BLOB '00ff'")
+        eq_(self._literal(io.BytesIO(b"ab"), LargeBinary()), "BLOB '6162'")
+        eq_(self._literal(1, Boolean()), "true")
+
+
+class ScriptTest(fixtures.TestBase):
+    def setup(self):
+        self.script = offline.Script()
+
+    def test_ddl(self):
+        metadata.create_all(self.script.engine)
+        metadata.drop_all(self.script.engine)
+        eq_([s.split("(")[0] for s in flat(self.script.statements)],
+            ["CREATE SEQUENCE t_seq AS INTEGER", "CREATE TABLE t ",
+             "DROP SEQUENCE t_seq", "DROP TABLE t"])
+
+    def test_executemany(self):
+        self.script.execute(t.insert(), [
+            {"id": i, "name": "n%d" % i, "day": datetime.date(2014, 1, i)}
+            for i in (1, 2)])
+        eq_(self.script.statements, [
+            "INSERT INTO t (id, \"name\", \"day\") "
+            "VALUES (%d, 'n%d', DATE '2014-01-0%d')" % (i, i, i)
+            for i in (1, 2)])
+        eq_(self.script.dialect.compiled_cache.misses, 1)
+
+    def test_shared_cache(self):
+        query = select([t.c.id]).where(
+            (t.c.id % 2 == 1) & (t.c.at < bindparam("at")))
+        for i in range(3):
+            self.script.execute(query.limit(i + 1),
+                                at=datetime.datetime(2014, 1, i + 1))
+        eq_(self.script.statements[2],
+            "SELECT t.id \nFROM t \nWHERE t.id % 2 = 1 AND "
+            "t.at < TIMESTAMP '2014-01-03 00:00:00'\nLIMIT 3")
+        eq_((self.script.dialect.compiled_cache.hits,
+             self.script.dialect.compiled_cache.misses), (2, 1))
+
+    def test_text(self):
+        self.script.execute(text("SELECT :x"), x="a")
+        self.script.execute("SELECT 1")
+        assert_raises(exc.ArgumentError, self.script.execute, "SELECT %s", 1)
+        eq_(self.script.sql, "SELECT 'a';\nSELECT 1;\n")
+
+    def test_mock_strategy(self):
+        registry.register("monetdb.offline", "sqlalchemy_monetdb.offline",
+                          "MDBOfflineDialect")
+        engine = create_engine("monetdb+offline://", strategy="mock",
+                               executor=self.script)
+        engine.execute(t.delete().where(t.c.flag == False))  # noqa
+        eq_(self.script.statements, ["DELETE FROM t WHERE t.flag = false"])
+
+    def test_no_connection(self):
+        engine = create_engine("monetdb://",
+                               module=offline.MDBOfflineDialect.dbapi(),
+                               _initialize=False)
+        assert_raises(exc.DBAPIError, engine.connect)
@@ -0,0 +1,144 @@
+import datetime
+import decimal
+import re
+import threading
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, select, \
+    exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import parallel
+from sqlalchemy_monetdb.base import MDBDialect
+
+import fakedbapi
+
+
+STATISTICS_COLUMNS = [
+    "table_name", "name", "type", "type_digits", "type_scale", "row_count",
+    "columnsize", "heapsize", "hashes", "imprints", "sorted", "unique",
+    "nils", "minval", "maxval"]
+
+
+class PartitionDBAPI(fakedbapi.FakeDBAPI):
+    """Answers the catalog queries of column_bounds(), selecting the ids of
+    `ids` matching the range conditions of a partition."""
+
+    def __init__(self, ids, statistics=None):
+        catalog = fakedbapi.Reply(["id"], [(1,)])
+        fakedbapi.FakeDBAPI.__init__(self, [
+            ("sys.statistics", self._statistics),
+            ("FROM sys", catalog),
+            ("current_schema", catalog),
+            ("min(", self._bounds)], default=self._partition)
+        self.ids = ids
+        self.statistics = statistics
+        self.queries = []
+        self.threads = set()
+        self.fail = False
+
+    def _statistics(self, statement, parameters):
+        minval, maxval = self.statistics or (None, None)
+        return fakedbapi.Reply(STATISTICS_COLUMNS, [
+            ("t", "id", "int", 32, 0, 3, 12, 0, 0, 0, False, None, None,
+             minval, maxval),
+            ("t", "name", "varchar", 40, 0, 3, 24, 100, 0, 0, False,
+             None, None, None, None)])
+
+    def _bounds(self, statement, parameters):
+        ids = [i for i in self.ids if i is not None]
+        return fakedbapi.Reply(["min_1", "max_1"], [(min(ids), max(ids))])
+
+    def _partition(self, statement, parameters):
+        query = statement % dict((k, repr(v)) for k, v in
+                                 (parameters or {}).items())
+        self.queries.append(query)
+        self.threads.add(threading.current_thread())
+        if self.fail:
+            return fakedbapi.Error("partition failed")
+        low = re.search(r"t.id >= (\d+)", query)
+        high = re.search(r"t.id < (\d+)", query)
+        ids = [i for i in self.ids if
+               (i is None and "IS NULL" in query) or i is not None and
+               (low is None or i >= int(low.group(1))) and
+               (high is None or i < int(high.group(1)))]
+        if "ORDER BY" in query:
+            ids.sort(key=lambda i: (i is not None, i))
+        return fakedbapi.Reply(["id", "name"],
+                               [(i, "name %s" % i) for i in ids])
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)))
+
+
+class SplitTest(fixtures.TestBase):
+    def test_integers(self):
+        eq_(parallel.split_range(0, 100, 4), [25, 50, 75])
+        eq_(parallel.split_range(0, 2, 4), [1])
+        eq_(parallel.split_range(5, 5, 4), [])
+
+    def test_decimals(self):
+        eq_(parallel.split_range(decimal.Decimal("0"), decimal.Decimal("1"),
+                                 4),
+            [decimal.Decimal("0.25"), decimal.Decimal("0.5"),
+             decimal.Decimal("0.75")])
+
+    def test_dates(self):
+        eq_(parallel.split_range(datetime.date(2014, 1, 1),
+                                 datetime.date(2014, 1, 31), 3),
+            [datetime.date(2014, 1, 11), datetime.date(2014, 1, 21)])
+
+    def test_partitions(self):
+        queries = parallel.partitions(select([t.c.name]), t.c.id, [10, 20])
+        eq_([str(q.compile(dialect=MDBDialect())).split("WHERE ")[1]
+             for q in queries],
+            ["t.id < %(id_1)s OR t.id IS NULL",
+             "t.id >= %(id_1)s AND t.id < %(id_2)s",
+             "t.id >= %(id_1)s"])
+
+
+class ExecuteTest(fixtures.TestBase):
+    def _engine(self, ids, statistics=None):
+        self.dbapi = PartitionDBAPI(ids, statistics)
+        return fakedbapi.create_engine(self.dbapi)
+
+    def test_all_rows(self):
+        ids = [None] + list(range(1000))
+        engine = self._engine(ids)
+        rows = list(parallel.execute(engine, select([t]), t.c.id, 4))
+        eq_(sorted(rows, key=lambda r: (r.id is not None, r.id)),
+            [(i, "name %s" % i) for i in ids])
+        eq_(len(self.dbapi.queries), 4)
+        eq_(len(self.dbapi.threads), 4)
+
+    def test_ordered(self):
+        ids = [7, None, 3, 999, 500, 42, 250]
+        engine = self._engine(ids)
+        rows = list(parallel.execute(engine, select([t]), t.c.id, 3,
+                                     ordered=True))
+        eq_([r.id for r in rows], [None, 3, 7, 42, 250, 500, 999])
+        for query in self.dbapi.queries:
+            assert query.endswith("ORDER BY t.id"), query
+
+    def test_statistics(self):
+        engine = self._engine([1, 2, 3], statistics=("0", "300"))
+        list(parallel.execute(engine, select([t]), t.c.id, 3))
+        eq_(sorted(re.findall(r"t.id < (\d+)", " ".join(
+            self.dbapi.queries))), ["100", "200"])
+
+    def test_stale_statistics(self):
+        engine = self._engine([-5, 0, 50, 400], statistics=("0", "100"))
+        rows = list(parallel.execute(engine, select([t]), t.c.id, 2))
+        eq_(sorted(r.id for r in rows), [-5, 0, 50, 400])
+
+    def test_error(self):
+        engine = self._engine([1, 2, 3])
+        self.dbapi.fail = True
+        assert_raises(exc.DBAPIError, list,
+                      parallel.execute(engine, select([t]), t.c.id, 2))
+
+    def test_unsupported_column(self):
+        assert_raises(exc.ArgumentError, parallel.execute,
+                      self._engine([1]), select([t]), t.c.name)
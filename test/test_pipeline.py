@@ -0,0 +1,153 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, \
+    Sequence, select, exc
+from sqlalchemy.engine.base import Connection
+from sqlalchemy.testing import fixtures, eq_
+
+import fakedbapi
+
+
+class MapiConnection(fakedbapi.Connection):
+    """Keeps the messages sent to the server, one per round trip, failing
+    the statements that have "fail" in them; the server stops at the first
+    that fails."""
+
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.messages = []
+
+    def execute(self, query):
+        self.messages.append(query)
+        replies = []
+        for statement in query.split(";\n"):
+            if "fail" in statement:
+                if not replies:
+                    # the DBAPI raises replies starting with an error
+                    raise self.OperationalError("42000!failed: " + statement)
+                replies.append("!42000!failed: " + statement)
+                break
+            replies.append("&2 1 -1")
+        return "\n".join(replies)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.messages.append("COMMIT")
+
+    def rollback(self):
+        self.messages.append("ROLLBACK")
+
+
+class Cursor(fakedbapi.Cursor):
+    """Sends its statements through the connection, as the DBAPI does."""
+
+    def execute(self, statement, parameters=None):
+        if parameters:
+            statement = statement % parameters
+        self.connection.execute(statement)
+        fakedbapi.Cursor.execute(self, statement)
+
+
+class PipelineDBAPI(fakedbapi.FakeDBAPI):
+    """Hands out a single connection."""
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(
+            self, [("SELECT", fakedbapi.Reply(["id"], types=["int"]))],
+            default=fakedbapi.Reply(rowcount=1, lastrowid=42))
+        self.connection = MapiConnection(self)
+
+    def connect(self, *args, **kwargs):
+        return self.connection
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, Sequence("t_seq"), primary_key=True),
+          Column("name", String(40)))
+serial = Table("serial", metadata,
+               Column("id", Integer, primary_key=True),
+               Column("name", String(40)))
+
+
+class PipelineTest(fixtures.TestBase):
+    def setup(self):
+        self.dbapi = PipelineDBAPI()
+        self.engine = fakedbapi.create_engine(self.dbapi, pipeline_size=4)
+        self.conn = self.engine.connect()
+        self.messages = self.dbapi.connection.messages
+
+    def teardown(self):
+        self.conn.close()
+
+    def test_commit_flushes(self):
+        trans = self.conn.begin()
+        self.conn.execute(t.insert(), id=1, name="a")
+        self.conn.execute(t.update().where(t.c.id == 1), name="b")
+        result = self.conn.execute(t.delete().where(t.c.id == 2))
+        eq_(result.rowcount, -1)
+        eq_(self.messages, [])
+        trans.commit()
+        eq_(self.messages, [
+            "INSERT INTO t (id, \"name\") VALUES (1, 'a');\n"
+            "UPDATE t SET \"name\"='b' WHERE t.id = 1;\n"
+            "DELETE FROM t WHERE t.id = 2", "COMMIT"])
+        assert not self.engine.dialect.supports_sane_rowcount
+
+    def test_select_flushes(self):
+        trans = self.conn.begin()
+        self.conn.execute(t.insert(), id=1, name="a")
+        self.conn.execute(select([t.c.id])).fetchall()
+        eq_(self.messages, ["INSERT INTO t (id, \"name\") VALUES (1, 'a')",
+                            "SELECT t.id \nFROM t"])
+        trans.commit()
+        eq_(len(self.messages), 3)
+
+    def test_pipeline_size(self):
+        trans = self.conn.begin()
+        self.conn.execute(t.update().where(t.c.id == 1),
+                          [{"name": str(i)} for i in range(5)])
+        eq_(len(self.messages), 1)
+        trans.commit()
+        eq_([m.count(";\n") + 1 for m in self.messages[:-1]], [4, 1])
+
+    def test_error_of_statement(self):
+        for names, failed in ((["a", "fail"], 1), (["fail", "b"], 0)):
+            del self.messages[:]
+            trans = self.conn.begin()
+            for i, name in enumerate(names):
+                self.conn.execute(t.insert(), id=i, name=name)
+            try:
+                trans.commit()
+            except exc.OperationalError as e:
+                eq_(e.params, {"id": failed, "name": "fail"})
+                assert "statement %d of 2" % (failed + 1) in str(e.orig), \
+                    str(e.orig)
+            else:
+                assert False, "no error"
+            trans.rollback()
+            eq_(len(self.messages), 2)
+
+    def test_rollback_discards(self):
+        trans = self.conn.begin()
+        self.conn.execute(t.insert(), id=1, name="a")
+        trans.rollback()
+        eq_(self.messages, ["ROLLBACK"])
+
+    def test_not_pipelined(self):
+        trans = self.conn.begin()
+        # the generated primary key is read from the cursor
+        eq_(self.conn.execute(serial.insert(), name="a").inserted_primary_key,
+            [42])
+        self.conn.execution_options(pipeline=False).execute(
+            t.delete().where(t.c.id == 1))
+        eq_(len(self.messages), 2)
+        trans.commit()
+
+    def test_bare_connection(self):
+        # as the dialect sets up its first connection, which isn't a pool
+        # record's yet
+        conn = Connection(self.engine, self.dbapi.connect())
+        conn.execute(t.insert().execution_options(autocommit=False),
+                     id=1, name="a")
+        eq_(len(self.messages), 1)
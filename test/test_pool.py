@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.base import MDBQueuePool
+
+import fakedbapi
+
+
+class MockConnection(object):
+    replysize = 100
+
+    def __init__(self):
+        self.closed = False
+        self.pings = 0
+
+    def set_replysize(self, replysize):
+        if self.closed:
+            raise IOError("Server closed connection")
+        self.pings += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PrePingTest(fixtures.TestBase):
+    def setup(self):
+        self.connections = []
+
+    def _creator(self):
+        connection = MockConnection()
+        self.connections.append(connection)
+        return connection
+
+    def test_ping_on_checkout(self):
+        p = MDBQueuePool(self._creator)
+        p.connect().close()
+        p.connect().close()
+        eq_(len(self.connections), 1)
+        eq_(self.connections[0].pings, 2)
+
+    def test_replaces_dead_connection(self):
+        p = MDBQueuePool(self._creator)
+        p.connect().close()
+        self.connections[0].closed = True
+        c = p.connect()
+        eq_(len(self.connections), 2)
+        assert c.connection is self.connections[1]
+
+    def test_recreate_pings_once(self):
+        p = MDBQueuePool(self._creator).recreate()
+        p.connect().close()
+        eq_(self.connections[0].pings, 1)
+
+    def test_no_ping(self):
+        p = MDBQueuePool(self._creator, monetdb_pre_ping=False)
+        p.connect().close()
+        eq_(self.connections[0].pings, 0)
+
+    def test_engine_argument(self):
+        for monetdb_pre_ping, pings in ((True, 1), (False, 0)):
+            dbapi = fakedbapi.FakeDBAPI()
+            engine = create_engine("monetdb://", module=dbapi,
+                                   monetdb_pre_ping=monetdb_pre_ping,
+                                   _initialize=False)
+            engine.connect().close()
+            # the ping sets the reply size the connection has
+            eq_(dbapi.connections[0].replysizes, [100] * pings)
+
+    def test_defaults(self):
+        p = MDBQueuePool(self._creator)
+        eq_((p.size(), p._max_overflow, p._recycle), (5, 10, 3600))
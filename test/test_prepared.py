@@ -0,0 +1,162 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, \
+    Sequence, select, func
+from sqlalchemy.testing import fixtures, eq_
+
+import fakedbapi
+
+
+class Cursor(fakedbapi.Cursor):
+    def execute(self, statement, parameters=None):
+        self.connection.dbapi.sent.append(
+            statement % parameters if parameters else statement)
+        fakedbapi.Cursor.execute(self, statement, parameters)
+
+
+class Connection(fakedbapi.Connection):
+    cursor_class = Cursor
+
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.prepared = 0
+
+    def execute(self, query):
+        # the raw MAPI query of python-monetdb's connection
+        self.dbapi.sent.append(query)
+        if query.startswith("PREPARE"):
+            self.prepared += 1
+            return "&5 %d 1 6 1\n%% .prepare # table_name\n" % self.prepared
+        return "&3\n"
+
+    def commit(self):
+        self.dbapi.sent.append("COMMIT")
+
+    def rollback(self):
+        self.dbapi.sent.append("ROLLBACK")
+
+
+class PreparingDBAPI(fakedbapi.FakeDBAPI):
+    """Numbers the statements prepared through the MAPI connection and
+    records what is sent."""
+
+    connection_class = Connection
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(self, default=fakedbapi.Reply(rowcount=1))
+        self.sent = []
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(40)))
+sequenced = Table("sequenced", metadata,
+                  Column("id", Integer, Sequence("s"), primary_key=True),
+                  Column("name", String(40)))
+computed = Table("computed", metadata,
+                 Column("id", Integer, default=func.next_id(),
+                        primary_key=True),
+                 Column("name", String(40)))
+
+
+class PreparedStatementTest(fixtures.TestBase):
+    def setup(self):
+        self.dbapi = PreparingDBAPI()
+
+    def _engine(self, size=10, **kwargs):
+        return fakedbapi.create_engine(self.dbapi, prepared_cache_size=size,
+                                       **kwargs)
+
+    def _sent(self):
+        sent = [s for s in self.dbapi.sent if s not in ("COMMIT",
+                                                        "ROLLBACK")]
+        del self.dbapi.sent[:]
+        return sent
+
+    def test_prepared_once(self):
+        conn = self._engine().connect()
+        stmt = t.update().where(t.c.id == 5).values(name="x")
+        conn.execute(stmt)
+        conn.execute(stmt, id_1=6, name="y")
+        eq_(self._sent(), [
+            'PREPARE UPDATE t SET "name"=? WHERE t.id = ?',
+            "EXEC 1(x, 5)",
+            "EXEC 1(y, 6)"])
+
+    def test_executemany(self):
+        conn = self._engine().connect()
+        conn.execute(t.update().where(t.c.id == 5),
+                     [{"name": "a"}, {"name": "b"}])
+        eq_(self._sent(), ['PREPARE UPDATE t SET "name"=? WHERE t.id = ?',
+                           "EXEC 1(a, 5)", "EXEC 1(b, 5)"])
+
+    def test_escaped_percent(self):
+        conn = self._engine().connect()
+        conn.execute(t.delete().where(t.c.id % 2 == 0))
+        eq_(self._sent()[0], "PREPARE DELETE FROM t WHERE t.id % ? = ?")
+
+    def test_deallocate_least_recently_used(self):
+        conn = self._engine(size=2).connect()
+        conn.execute(t.delete().where(t.c.id == 1))
+        conn.execute(t.delete().where(t.c.name == "x"))
+        conn.execute(t.delete().where(t.c.id == 1))
+        conn.execute(t.update().values(name="y"))
+        sent = self._sent()
+        eq_([s.split(" ", 1)[0] for s in sent],
+            ["PREPARE", "EXEC", "PREPARE", "EXEC", "EXEC", "PREPARE",
+             "DEALLOCATE", "EXEC"])
+        eq_(sent[6], "DEALLOCATE PREPARE 2")
+
+    def test_rollback_forgets_pending(self):
+        conn = self._engine().connect()
+        committed = t.delete().where(t.c.id == 1)
+        rolled_back = t.delete().where(t.c.name == "x")
+        conn.execute(committed)
+        trans = conn.begin()
+        conn.execute(rolled_back)
+        trans.rollback()
+        conn.execute(committed)
+        conn.execute(rolled_back)
+        eq_([s.split(" ", 1)[0] for s in self._sent()],
+            ["PREPARE", "EXEC", "PREPARE", "EXEC", "EXEC", "PREPARE",
+             "EXEC"])
+
+    def test_recycled_connection(self):
+        engine = self._engine()
+        stmt = t.delete().where(t.c.id == 1)
+        conn = engine.connect()
+        conn.execute(stmt)
+        conn.invalidate()
+        conn.execute(stmt)
+        eq_(len(self.dbapi.connections), 2)
+        eq_([s.split(" ", 1)[0] for s in self._sent()],
+            ["PREPARE", "EXEC", "PREPARE", "EXEC"])
+
+    def test_disabled(self):
+        engine = self._engine(size=None)
+        engine.execute(t.delete().where(t.c.id == 1))
+        conn = self._engine().connect().execution_options(prepare=False)
+        conn.execute(t.delete().where(t.c.id == 1))
+        conn.execute("DELETE FROM t")
+        eq_(self._sent(), ["DELETE FROM t WHERE t.id = 1"] * 2 +
+            ["DELETE FROM t"])
+
+    def test_select(self):
+        conn = self._engine().connect()
+        conn.execute(select([t.c.name]).where(t.c.id > 1).limit(5))
+        eq_(self._sent(), ['PREPARE SELECT t."name" \nFROM t \n'
+                           'WHERE t.id > ?\nLIMIT ?', "EXEC 1(1, 5)"])
+
+    def test_defaults_not_prepared(self):
+        self.dbapi.responses.extend([
+            ("NEXT VALUE FOR", fakedbapi.Reply(["next_value"], [(7,), (8,)])),
+            ("next_id", fakedbapi.Reply(["next_id"], [(9,)]))])
+        conn = self._engine(sequence_block_size=2).connect()
+        conn.execute(sequenced.insert(), name="x")
+        conn.execute(computed.insert(), name="y")
+        eq_(self._sent(), [
+            "SELECT NEXT VALUE FOR s FROM sys.generate_series(0, 2)",
+            'PREPARE INSERT INTO sequenced (id, "name") VALUES (?, ?)',
+            "EXEC 1(7, x)",
+            "SELECT next_id() AS next_id_1",
+            'PREPARE INSERT INTO computed (id, "name") VALUES (?, ?)',
+            "EXEC 2(9, y)"])
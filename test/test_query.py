@@ -0,0 +1,75 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, Date, \
+    select, func, exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import query
+from sqlalchemy_monetdb.base import MDBDialect
+
+
+metadata = MetaData()
+t = Table("t", metadata,
+          Column("region", String(20)),
+          Column("year", Integer),
+          Column("amount", Integer),
+          Column("day", Date))
+
+
+class QueryTest(fixtures.TestBase):
+    def setup(self):
+        self.dialect = MDBDialect()
+
+    def _compile(self, statement):
+        compiled = statement.compile(dialect=self.dialect)
+        return " ".join(compiled.string.split()), compiled.params
+
+    def test_groupings(self):
+        for grouping, sql in [
+                (query.rollup(t.c.region, t.c.year),
+                 'ROLLUP(t.region, t."year")'),
+                (query.cube(t.c.region, (t.c.year, t.c.day)),
+                 'CUBE(t.region, (t."year", t."day"))'),
+                (query.grouping_sets((t.c.region, t.c.year), t.c.year, ()),
+                 'GROUPING SETS((t.region, t."year"), t."year", ())')]:
+            eq_(self._compile(select([t.c.region, func.sum(t.c.amount)])
+                              .group_by(grouping)),
+                ("SELECT t.region, sum(t.amount) AS sum_1 FROM t "
+                 "GROUP BY " + sql, {}))
+
+    def test_over(self):
+        eq_(self._compile(select([
+            query.over(func.sum(t.c.amount), order_by=t.c.day,
+                       rows=(-6, 0)),
+            query.over(func.rank(), partition_by=t.c.region,
+                       order_by=t.c.day, range_=(None, 2))]))[0],
+            'SELECT sum(t.amount) OVER (ORDER BY t."day" ROWS BETWEEN 6 '
+            'PRECEDING AND CURRENT ROW) AS anon_1, rank() OVER (PARTITION '
+            'BY t.region ORDER BY t."day" RANGE BETWEEN UNBOUNDED PRECEDING '
+            'AND 2 FOLLOWING) AS anon_2 FROM t')
+        assert_raises(exc.ArgumentError, query.over, func.rank(),
+                      rows=(0, -1))
+        assert_raises(exc.ArgumentError, query.over, func.rank(),
+                      rows=(None, 0), range_=(None, 0))
+
+    def test_sample(self):
+        eq_(self._compile(query.select([t.c.year]).limit(5)
+                          .sample(100, seed=4)),
+            ('SELECT t."year" FROM t LIMIT %(monetdb_limit_1)s '
+             'SAMPLE %(monetdb_sample_1)s SEED %(monetdb_seed_1)s',
+             {"monetdb_limit_1": 5, "monetdb_sample_1": 100,
+              "monetdb_seed_1": 4}))
+        eq_(self._compile(select([query.select([t.c.year])
+                                  .sample(0.5).alias()])),
+            ('SELECT anon_1."year" FROM (SELECT t."year" AS "year" FROM t '
+             'SAMPLE %(monetdb_sample_1)s) AS anon_1',
+             {"monetdb_sample_1": 0.5}))
+        for size in (0, 1.5, -1):
+            assert_raises(exc.ArgumentError, query.select([t]).sample, size)
+
+    def test_samples_share_entry(self):
+        base = query.select([t]).where(t.c.year > 2000)
+        eq_([base.sample(size).compile(dialect=self.dialect)
+             .params["monetdb_sample_1"] for size in (10, 20, 0.1)],
+            [10, 20, 0.1])
+        eq_(self._compile(base)[1], {"year_1": 2000})
+        cache = self.dialect.compiled_cache
+        eq_((cache.hits, cache.misses), (2, 2))
@@ -0,0 +1,262 @@
+import collections
+import gc
+import os
+import shutil
+import tempfile
+import weakref
+
+from sqlalchemy import MetaData, Table, exc
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import cache
+from sqlalchemy_monetdb.base import MDBDialect, MDBInspector
+
+import fakedbapi
+
+
+ColumnRow = collections.namedtuple(
+    "ColumnRow", "table_name name type default null type_digits type_scale")
+KeyRow = collections.namedtuple("KeyRow", "table_name name")
+ForeignKeyRow = collections.namedtuple(
+    "ForeignKeyRow", "table_name name fkcolumn_name pktable_schema "
+                     "pktable_name pkcolumn_name key_seq")
+IndexRow = collections.namedtuple(
+    "IndexRow", "table_name name column_name index_type key_type")
+TableRow = collections.namedtuple("TableRow", "table_name type query")
+StatisticsRow = collections.namedtuple(
+    "StatisticsRow", "table_name name type type_digits type_scale row_count "
+                     "columnsize heapsize hashes imprints sorted unique nils "
+                     "minval maxval")
+
+
+Engine = collections.namedtuple("Engine", "url")
+
+
+class Result(list):
+    def scalar(self):
+        return self[0][0] if self else None
+
+    def first(self):
+        return self[0] if self else None
+
+
+class CatalogConnection(object):
+    """Answers the catalog queries of the dialect for a schema of
+    `count` tables, each referring to the previous one."""
+
+    def __init__(self, count, url="monetdb://localhost/demo"):
+        self.count = count
+        self.queries = []
+        self.fingerprint = (count, 1)
+        self.engine = Engine(make_url(url))
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        tables = ["t%d" % i for i in range(self.count)]
+        if "table_id" in (params or {}):
+            tables = [tables[params["table_id"]]]
+        if "COUNT(*) FROM sys.tables" in query:
+            return Result([self.fingerprint])
+        if "sys.storage" in query:
+            return Result(row for t in tables for row in [
+                StatisticsRow(t, "id", "int", 32, 0, 1000, 4000, 0, 8192, 0,
+                              True, 1000, 0, "1", "1000"),
+                StatisticsRow(t, "name", "varchar", 20, 0, 1000, 1000, 9000,
+                              0, 512, False, None, None, None, None)])
+        if "current_schema" in query:
+            return Result([("sys",)])
+        if "FROM sys.schemas" in query:
+            return Result([(1,)])
+        if "FROM sys.tables" in query and "name = %(name)s" in query:
+            name = params["name"]
+            return Result([(int(name[1:]),)] if name in tables else [])
+        if "FROM sys.columns" in query:
+            return Result(row for t in tables for row in [
+                ColumnRow(t, "id", "int", None, "false", 32, 0),
+                ColumnRow(t, "name", "varchar", None, "true", 20, 0)])
+        if "keys.type = 0" in query:
+            return Result(KeyRow(t, "id") for t in tables)
+        if "fkkey" in query:
+            return Result(ForeignKeyRow(t, "%s_fk" % t, "id", "sys",
+                                        "t%d" % (int(t[1:]) - 1), "id", 0)
+                          for t in tables if t != "t0")
+        if "sys.idxs" in query:
+            return Result(row for t in tables for row in [
+                IndexRow(t, "%s_idx" % t, "name", 4, None),
+                IndexRow(t, "%s_pkey" % t, "id", 0, 0)])
+        if "tables.query" in query:
+            return Result(TableRow(t, 3 if t == "t1" else 0, None)
+                          for t in tables)
+        raise AssertionError(query)
+
+
+class CatalogDBAPI(fakedbapi.FakeDBAPI):
+    """Answers the statements of cursors from a CatalogConnection."""
+
+    def __init__(self, catalog):
+        fakedbapi.FakeDBAPI.__init__(self, default=self._catalog)
+        self.catalog = catalog
+
+    def _catalog(self, statement, parameters):
+        rows = list(self.catalog.execute(statement, parameters))
+        fields = getattr(rows[0], "_fields", None) if rows else None
+        return fakedbapi.Reply(list(fields or ["value"]), rows)
+
+
+class SchemaReflectionTest(fixtures.TestBase):
+    def _reflect(self, connection, table_name, **kw):
+        dialect = MDBDialect()
+        return (dialect.get_columns(connection, table_name, **kw),
+                dialect.get_primary_keys(connection, table_name, **kw),
+                dialect.get_foreign_keys(connection, table_name, **kw),
+                dialect.get_indexes(connection, table_name, **kw))
+
+    def test_one_query_per_kind(self):
+        connection = CatalogConnection(100)
+        info_cache = {}
+        for i in range(100):
+            self._reflect(connection, "t%d" % i, info_cache=info_cache)
+        # the current schema and its id, then columns, keys, foreign keys
+        # and indexes
+        eq_(len(connection.queries), 6)
+
+    def test_same_result_as_single_table(self):
+        connection = CatalogConnection(3)
+        # compare the repr, reflected types don't compare equal
+        eq_(repr(self._reflect(connection, "t2", info_cache={})),
+            repr(self._reflect(connection, "t2")))
+
+    def test_foreign_keys(self):
+        columns, pk, fks, indexes = self._reflect(
+            CatalogConnection(3), "t2", info_cache={})
+        eq_([c["name"] for c in columns], ["id", "name"])
+        eq_(pk, ["id"])
+        eq_(fks, [{"name": "t2_fk", "referred_schema": "sys",
+                   "referred_table": "t1", "constrained_columns": ["id"],
+                   "referred_columns": ["id"]}])
+        eq_(indexes, [{"name": "t2_idx", "unique": False,
+                       "column_names": ["name"],
+                       "dialect_options": {"monetdb_type": "imprints"}},
+                      {"name": "t2_pkey", "unique": True,
+                       "column_names": ["id"]}])
+
+    def test_table_options(self):
+        connection = CatalogConnection(3)
+        dialect, info_cache = MDBDialect(), {}
+        eq_([dialect.get_table_options(connection, "t%d" % i,
+                                       info_cache=info_cache)
+             for i in range(3)],
+            [{}, {"monetdb_kind": "merge"}, {}])
+
+    def test_no_such_table(self):
+        assert_raises(exc.NoSuchTableError, MDBDialect().get_columns,
+                      CatalogConnection(3), "t9", info_cache={})
+
+    def test_inspector_per_transaction(self):
+        catalog = CatalogConnection(3)
+        engine = fakedbapi.create_engine(CatalogDBAPI(catalog))
+        conn = engine.connect()
+        for name in ("t0", "t1", "t2"):
+            Table(name, MetaData(), autoload=True, autoload_with=conn)
+        queries = len(catalog.queries)
+        Table("t1", MetaData(), autoload=True, autoload_with=conn)
+        eq_(len(catalog.queries), queries)
+
+        # the catalog may have been changed by other sessions since
+        conn.begin().commit()
+        Table("t1", MetaData(), autoload=True, autoload_with=conn)
+        assert len(catalog.queries) > queries
+        conn.close()
+
+
+class StatisticsTest(fixtures.TestBase):
+    def test_column_statistics(self):
+        columns = MDBDialect().get_column_statistics(CatalogConnection(3),
+                                                     "t1")
+        eq_(columns, [
+            {"name": "id", "rows": 1000, "size": 4000, "hash_size": 8192,
+             "imprints_size": 0, "sorted": True, "unique": 1000, "nils": 0,
+             "min": 1, "max": 1000},
+            {"name": "name", "rows": 1000, "size": 10000, "hash_size": 0,
+             "imprints_size": 512, "sorted": False, "unique": None,
+             "nils": None, "min": None, "max": None}])
+
+    def test_table_statistics(self):
+        eq_(MDBDialect().get_table_statistics(CatalogConnection(3), "t1"), {
+            "rows": 1000, "size": 14000, "hash_size": 8192,
+            "imprints_size": 512, "hashed_columns": ["id"],
+            "imprinted_columns": ["name"]})
+
+    def test_one_query_per_schema(self):
+        connection = CatalogConnection(100)
+        dialect, info_cache = MDBDialect(), {}
+        for i in range(100):
+            dialect.get_table_statistics(connection, "t%d" % i,
+                                         info_cache=info_cache)
+        # the current schema and its id, the columns and the statistics
+        eq_(len(connection.queries), 4)
+
+    def test_inspector(self):
+        class Engine(object):
+            dialect = MDBDialect()
+
+        connection = CatalogConnection(3)
+        connection.engine = Engine()
+        insp = MDBInspector(connection)
+        eq_(insp.get_table_statistics("t2")["rows"], 1000)
+        eq_(insp.get_column_statistics("t0")[0]["max"], 1000)
+        eq_(sum("sys.storage" in q for q in connection.queries), 1)
+
+
+class ReflectionCacheTest(fixtures.TestBase):
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "reflection.cache")
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def _columns(self, connection):
+        dialect = MDBDialect(reflection_cache_path=self.path)
+        dialect.default_schema_name = "sys"
+        columns = [dialect.get_columns(connection, "t%d" % i, info_cache={})
+                   for i in range(connection.count)]
+        dialect.reflection_cache.save()
+        return [[c["name"] for c in table] for table in columns]
+
+    def test_served_from_file(self):
+        eq_(self._columns(CatalogConnection(3)), [["id", "name"]] * 3)
+        connection = CatalogConnection(3)
+        eq_(self._columns(connection), [["id", "name"]] * 3)
+        # only the fingerprint of the catalog is queried
+        eq_(len(connection.queries), 3)
+
+    def test_stale_when_catalog_changes(self):
+        self._columns(CatalogConnection(3))
+        connection = CatalogConnection(3)
+        connection.fingerprint = (3, 2)
+        self._columns(connection)
+        assert len(connection.queries) > 3
+
+    def test_per_database(self):
+        self._columns(CatalogConnection(3))
+        # the same fingerprint in another database
+        connection = CatalogConnection(3, "monetdb://localhost/other")
+        self._columns(connection)
+        assert len(connection.queries) > 3
+        connection = CatalogConnection(3)
+        self._columns(connection)
+        eq_(len(connection.queries), 3)
+
+    def test_saved_at_exit(self):
+        dialect = MDBDialect(reflection_cache_path=self.path)
+        dialect.reflection_cache.modified = True
+        cache._save_reflection_caches()
+        assert os.path.exists(self.path)
+
+        # the caches of discarded dialects aren't kept until then
+        reflection_cache = weakref.ref(dialect.reflection_cache)
+        del dialect
+        gc.collect()
+        assert reflection_cache() is None
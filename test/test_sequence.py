@@ -0,0 +1,90 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, Sequence
+from sqlalchemy.testing import fixtures, eq_
+
+import fakedbapi
+
+
+class SequenceDBAPI(fakedbapi.FakeDBAPI):
+    """Generates the values of sequences as the server would for a
+    sequence with START WITH 10 INCREMENT BY 5."""
+
+    def __init__(self):
+        fakedbapi.FakeDBAPI.__init__(self, [
+            ("generate_series", self._values),
+            ("NEXT VALUE FOR", self._values)],
+            default=fakedbapi.Reply(rowcount=1))
+        self.next_value = 10
+
+    def _values(self, statement, parameters):
+        if "generate_series" in statement:
+            count = int(statement.rsplit(" ", 1)[1].rstrip(")"))
+        else:
+            count = 1
+        values = [(self.next_value + 5 * i,) for i in range(count)]
+        self.next_value += 5 * count
+        return fakedbapi.Reply(["next_value"], values)
+
+
+def make_table(block_size=None):
+    seq = Sequence("s", start=10, increment=5)
+    if block_size is not None:
+        seq.info["monetdb_block_size"] = block_size
+    return Table("t", MetaData(),
+                 Column("id", Integer, seq, primary_key=True),
+                 Column("name", String(20)))
+
+
+class SequenceBlockTest(fixtures.TestBase):
+    def setup(self):
+        self.dbapi = SequenceDBAPI()
+
+    def _engine(self, **kwargs):
+        return fakedbapi.create_engine(self.dbapi, **kwargs)
+
+    def _reservations(self):
+        return [s for s in self.dbapi.statements if "generate_series" in s]
+
+    def test_block_size_per_sequence(self):
+        t = make_table(block_size=3)
+        conn = self._engine().connect()
+        eq_([conn.execute(t.insert(), name="x").inserted_primary_key[0]
+             for i in range(4)],
+            [10, 15, 20, 25])
+        eq_(self._reservations(),
+            ["SELECT NEXT VALUE FOR s FROM sys.generate_series(0, 3)"] * 2)
+        eq_([p["id"] for s, p in self.dbapi.executed if "INSERT" in s],
+            [10, 15, 20, 25])
+
+    def test_executemany(self):
+        t = make_table()
+        engine = self._engine(sequence_block_size=50)
+        result = engine.execute(t.insert(),
+                                [{"name": str(i)} for i in range(100)])
+        eq_(len(self._reservations()), 2)
+        eq_([p["id"] for s, p in self.dbapi.executed if "INSERT" in s],
+            list(range(10, 510, 5)))
+        eq_(result.rowcount, 100)
+
+    def test_inline_without_blocks(self):
+        t = make_table()
+        self._engine().execute(t.insert(), name="x")
+        eq_(self.dbapi.statements,
+            ["INSERT INTO t (id, \"name\") VALUES "
+             "((SELECT NEXT VALUE FOR s), %(name)s)"])
+
+    def test_blocks_are_per_connection(self):
+        t = make_table()
+        engine = self._engine(sequence_block_size=2)
+        first, second = engine.connect(), engine.connect()
+        eq_(first.execute(t.insert(), name="x").inserted_primary_key, [10])
+        eq_(first.execute(t.insert(), name="x").inserted_primary_key, [15])
+        eq_(second.execute(t.insert(), name="x").inserted_primary_key, [20])
+        eq_(len(self._reservations()), 2)
+
+    def test_rollback_discards_blocks(self):
+        t = make_table()
+        conn = self._engine(sequence_block_size=2).connect()
+        trans = conn.begin()
+        conn.execute(t.insert(), name="x")
+        trans.rollback()
+        eq_(conn.execute(t.insert(), name="x").inserted_primary_key, [20])
@@ -0,0 +1,124 @@
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+import fakedbapi
+
+
+class Cursor(fakedbapi.Cursor):
+    """Fetches the rows block by block, as python-monetdb does."""
+
+    def execute(self, statement, parameters=None):
+        fakedbapi.Cursor.execute(self, statement, parameters)
+        self.offset = 0
+        self._store(self.connection.replysize)
+
+    def _store(self, amount):
+        # the rows of a single reply, replacing the previous block
+        stop = min(self.rowcount, self.offset + amount)
+        self.rows = [(i, "name %d" % i) for i in range(self.offset, stop)]
+        self.offset = stop
+        self.connection.largest_block = max(self.connection.largest_block,
+                                            len(self.rows))
+
+    def fetchone(self):
+        if not self.rows and self.offset < self.rowcount:
+            self._store(self.arraysize)
+        return fakedbapi.Cursor.fetchone(self)
+
+    def fetchmany(self, size=None):
+        rows = []
+        for i in range(size or self.arraysize):
+            row = self.fetchone()
+            if row is None:
+                break
+            rows.append(row)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(self.rowcount)
+
+
+class Connection(fakedbapi.Connection):
+    cursor_class = Cursor
+
+    def __init__(self, dbapi):
+        fakedbapi.Connection.__init__(self, dbapi)
+        self.largest_block = 0
+
+
+class StreamingDBAPI(fakedbapi.FakeDBAPI):
+    """Answers every query with `rowcount` rows."""
+
+    connection_class = Connection
+
+    def __init__(self, rowcount):
+        fakedbapi.FakeDBAPI.__init__(
+            self, [("broken", lambda statement, parameters:
+                    fakedbapi.Error("syntax error in: " + statement))],
+            default=fakedbapi.Reply(["id", "name"], types=["int", "varchar"],
+                                    rowcount=rowcount))
+
+
+class StreamResultsTest(fixtures.TestBase):
+    def _engine(self, rowcount, **kwargs):
+        self.dbapi = StreamingDBAPI(rowcount)
+        return fakedbapi.create_engine(self.dbapi, **kwargs)
+
+    def test_reply_size(self):
+        engine = self._engine(2500, stream_reply_size=1000)
+        conn = engine.connect().execution_options(stream_results=True)
+        batches = list(conn.execute("SELECT id, name FROM t").batches())
+        eq_([len(batch) for batch in batches], [1000, 1000, 500])
+        eq_(batches[2][-1], (2499, "name 2499"))
+        connection = self.dbapi.connections[0]
+        eq_(connection.replysizes, [1000, 100])
+        eq_(connection.largest_block, 1000)
+
+    def test_reply_size_option(self):
+        engine = self._engine(250)
+        conn = engine.connect().execution_options(stream_results=True,
+                                                  reply_size=100)
+        result = conn.execute("SELECT id, name FROM t")
+        eq_([len(batch) for batch in result.batches(30)],
+            [30] * 8 + [10])
+        eq_(self.dbapi.connections[0].largest_block, 100)
+
+    def test_failed_statement(self):
+        engine = self._engine(10, stream_reply_size=5)
+        conn = engine.connect().execution_options(stream_results=True)
+        assert_raises(exc.DBAPIError, conn.execute, "SELECT broken")
+        connection = self.dbapi.connections[0]
+        eq_(connection.replysizes, [5, 100])
+        eq_(connection.replysize, 100)
+
+    def test_not_streaming(self):
+        engine = self._engine(10)
+        eq_(len(engine.execute("SELECT id, name FROM t").fetchall()), 10)
+        eq_(self.dbapi.connections[0].replysizes, [])
+
+    def test_memory_is_bounded(self):
+        if tracemalloc is None:
+            return
+
+        def peak(rowcount):
+            engine = self._engine(rowcount, stream_reply_size=1000)
+            conn = engine.connect().execution_options(stream_results=True)
+            tracemalloc.start()
+            try:
+                count = 0
+                for batch in conn.execute("SELECT id, name FROM t").batches():
+                    count += len(batch)
+                eq_(count, rowcount)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                conn.close()
+
+        small, large = peak(10000), peak(200000)
+        # twenty times the rows, about the same peak
+        assert large < small * 2, (small, large)